@@ -3,25 +3,108 @@ from .taskplanner import TaskPlannerAgent
 from .researcher import ResearcherAgent
 from .prdwriter import PRDWriterAgent
 from .toolfinder import ToolFinderAgent
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
 import sys
 import os
+import threading
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from llm_module import create_llm_function
 
+AGENT_CLASSES = {
+    "chiefmind": ChiefMindAgent,
+    "taskplanner": TaskPlannerAgent,
+    "researcher": ResearcherAgent,
+    "prdwriter": PRDWriterAgent,
+    "toolfinder": ToolFinderAgent,
+}
+
+# 每种Agent在池中最多保留的空闲实例数
+AGENT_POOL_SIZE = int(os.getenv("AGENT_POOL_SIZE", "4"))
+
 class AgentFactory:
-    def __init__(self, llm=None):
+    """Agent工厂：缓存Agent实例，避免每个请求重复构建crewai Agent。
+
+    - get_agent 返回按类型共享的实例，适用于只调用 *_async 等无状态方法的场景；
+    - acquire 从池中借出独占实例，适用于交给crewai Crew执行（Crew执行期间会修改Agent状态）。
+    """
+
+    _shared: Optional["AgentFactory"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, llm=None, pool_size: int = None):
         self.llm = llm or create_llm_function()
+        self.pool_size = AGENT_POOL_SIZE if pool_size is None else pool_size
+        self._lock = threading.Lock()
+        self._instances: Dict[str, Any] = {}
+        self._pools: Dict[str, List[Any]] = {agent_type: [] for agent_type in AGENT_CLASSES}
+        self._metrics = {
+            agent_type: {"constructed": 0, "construct_ms": 0.0, "pool_hits": 0, "pool_misses": 0, "in_use": 0}
+            for agent_type in AGENT_CLASSES
+        }
+
+    @classmethod
+    def shared(cls) -> "AgentFactory":
+        """进程内共享的工厂实例"""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    def _construct(self, agent_type: str):
+        agent_class = AGENT_CLASSES.get(agent_type)
+        if agent_class is None:
+            raise ValueError(f"Unknown agent type: {agent_type}")
+        started = time.perf_counter()
+        agent = agent_class(self.llm)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            metrics = self._metrics[agent_type]
+            metrics["constructed"] += 1
+            metrics["construct_ms"] += elapsed_ms
+        return agent
 
     def get_agent(self, agent_type: str):
-        if agent_type == "chiefmind":
-            return ChiefMindAgent(self.llm)
-        elif agent_type == "taskplanner":
-            return TaskPlannerAgent(self.llm)
-        elif agent_type == "researcher":
-            return ResearcherAgent(self.llm)
-        elif agent_type == "prdwriter":
-            return PRDWriterAgent(self.llm)
-        elif agent_type == "toolfinder":
-            return ToolFinderAgent(self.llm)
-        else:
-            raise ValueError(f"Unknown agent type: {agent_type}") 
\ No newline at end of file
+        """返回该类型的共享实例（首次调用时构建）"""
+        agent = self._instances.get(agent_type)
+        if agent is None:
+            agent = self._construct(agent_type)
+            with self._lock:
+                agent = self._instances.setdefault(agent_type, agent)
+        return agent
+
+    @contextmanager
+    def acquire(self, agent_type: str):
+        """从池中借出一个独占实例，用完自动归还；池为空时新建"""
+        if agent_type not in AGENT_CLASSES:
+            raise ValueError(f"Unknown agent type: {agent_type}")
+        with self._lock:
+            pool = self._pools[agent_type]
+            agent = pool.pop() if pool else None
+            metrics = self._metrics[agent_type]
+            metrics["pool_hits" if agent is not None else "pool_misses"] += 1
+            metrics["in_use"] += 1
+        try:
+            if agent is None:
+                agent = self._construct(agent_type)
+            yield agent
+        finally:
+            with self._lock:
+                metrics["in_use"] -= 1
+                if agent is not None and len(self._pools[agent_type]) < self.pool_size:
+                    self._pools[agent_type].append(agent)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """各类型Agent的构建次数、平均构建耗时及池命中情况"""
+        with self._lock:
+            result = {}
+            for agent_type, metrics in self._metrics.items():
+                constructed = metrics["constructed"]
+                result[agent_type] = {
+                    **metrics,
+                    "avg_construct_ms": metrics["construct_ms"] / constructed if constructed else 0.0,
+                    "idle": len(self._pools[agent_type]),
+                }
+            return result
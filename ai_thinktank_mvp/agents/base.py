@@ -1,12 +1,15 @@
 from crewai import Agent
+import sys
 import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from llm_router import resolve_model
 
 class BaseAgent(Agent):
     """基础Agent，所有自定义Agent继承自此类。"""
     
-    def __init__(self, role: str, goal: str, backstory: str, llm=None, **kwargs):
-        # 获取LLM配置
-        model_name = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+    def __init__(self, role: str, goal: str, backstory: str, llm=None, agent_type: str = None, **kwargs):
+        # 按Agent类型选择模型（见 llm_router），与直连LLM调用保持一致
+        model_name = resolve_model(agent_type)
         
         super().__init__(
             role=role,
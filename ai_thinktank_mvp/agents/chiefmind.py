@@ -3,7 +3,8 @@ import json
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from llm_module import create_llm_function
+from llm_module import create_llm_function, create_async_llm_function
+from llm_structured import complete_json, complete_json_async, extract_json, StructuredOutputError
 from typing import Dict, Any, Literal
 
 class ChiefMindAgent(BaseAgent):
@@ -11,14 +12,16 @@ class ChiefMindAgent(BaseAgent):
         super().__init__(
             role="ChiefMind",
             goal="作为AI参谋团的头脑，负责需求分析、结果整合和项目评估",
-            backstory="你是一个经验丰富的AI项目顾问，擅长通过对话理解用户需求，协调多个AI专家协作，并提供综合建议。"
+            backstory="你是一个经验丰富的AI项目顾问，擅长通过对话理解用户需求，协调多个AI专家协作，并提供综合建议。",
+            agent_type="chiefmind"
         )
         # 保留LLM函数用于直接调用
         import sys
         import os
         sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-        from llm_module import create_llm_function
-        self._llm_function = create_llm_function()
+        from llm_module import create_llm_function, create_async_llm_function
+        self._llm_function = create_llm_function("chiefmind")
+        self._async_llm_function = create_async_llm_function("chiefmind")
 
     def _build_requirement_analysis_prompt(self, user_goal: str, user_context: str = "") -> str:
         """构建需求分析prompt"""
@@ -53,7 +56,8 @@ class ChiefMindAgent(BaseAgent):
 你是一位资深的项目评估专家，需要对整个项目的完成情况进行综合评估。
 
 项目目标：{project_goals}
-各任务产出：{json.dumps(all_outputs, ensure_ascii=False, indent=2)}
+各任务产出：
+{self._format_stage_outputs(all_outputs)}
 
 请进行以下评估：
 1. 各任务完成质量评估（需求分析、任务规划、市场调研、PRD撰写、工具选型）
@@ -74,19 +78,39 @@ class ChiefMindAgent(BaseAgent):
 输出格式：Markdown格式的评估报告
 """
 
+    def _format_stage_outputs(self, all_outputs: Dict[str, str]) -> str:
+        """按阶段分节列出产出（不做缩进的JSON转义，避免换行和引号被转义后膨胀prompt）"""
+        return "\n\n".join(f"### {name}\n{output}" for name, output in all_outputs.items())
+
+    def _parse_requirements_result(self, result) -> Dict[str, Any]:
+        """将需求分析的LLM输出解析为dict（容忍代码块和前后说明文字）"""
+        parsed = extract_json(result)
+        if not isinstance(parsed, dict):
+            return {"error": f"LLM response is not valid JSON: {str(result)[:200]}..."}
+        return parsed
+
     def analyze_requirements(self, user_goal: str, user_context: str = "") -> Dict[str, Any]:
         """需求分析方法"""
         if self._llm_function is not None:
             prompt = self._build_requirement_analysis_prompt(user_goal, user_context)
-            result = self._llm_function(prompt)
-            
+            # 结构化提取使用确定性采样，相同需求可直接命中响应缓存
+            try:
+                result = complete_json(self._llm_function, prompt, temperature=0)
+            except StructuredOutputError as e:
+                result = e.raw
+            return self._parse_requirements_result(result)
+        else:
+            return {"error": "LLM function is not available"}
+
+    async def analyze_requirements_async(self, user_goal: str, user_context: str = "", on_token=None) -> Dict[str, Any]:
+        """需求分析方法（异步）"""
+        if self._async_llm_function is not None:
+            prompt = self._build_requirement_analysis_prompt(user_goal, user_context)
             try:
-                if isinstance(result, str):
-                    return json.loads(result)
-                else:
-                    return {"error": f"LLM response is not valid JSON: {str(result)[:200]}..."}
-            except json.JSONDecodeError:
-                return {"error": f"LLM response is not valid JSON: {str(result)[:200]}..."}
+                result = await complete_json_async(self._async_llm_function, prompt, on_token=on_token, temperature=0)
+            except StructuredOutputError as e:
+                result = e.raw
+            return self._parse_requirements_result(result)
         else:
             return {"error": "LLM function is not available"}
 
@@ -96,4 +120,12 @@ class ChiefMindAgent(BaseAgent):
             prompt = self._build_evaluation_prompt(project_goals, all_outputs)
             return self._llm_function(prompt)
         else:
-            return "LLM function is not available" 
\ No newline at end of file
+            return "LLM function is not available"
+
+    async def evaluate_project_async(self, project_goals: str, all_outputs: Dict[str, str], on_token=None) -> str:
+        """项目评估方法（异步）"""
+        if self._async_llm_function is not None:
+            prompt = self._build_evaluation_prompt(project_goals, all_outputs)
+            return await self._async_llm_function(prompt, on_token=on_token)
+        else:
+            return "LLM function is not available"
@@ -2,7 +2,7 @@ from .base import BaseAgent
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from llm_module import create_llm_function
+from llm_module import create_llm_function, create_async_llm_function
 from typing import Dict, Any
 
 class PRDWriterAgent(BaseAgent):
@@ -10,9 +10,11 @@ class PRDWriterAgent(BaseAgent):
         super().__init__(
             role="PRDWriter",
             goal="根据任务树和用户需求撰写高质量的PRD文档",
-            backstory="你是一个资深产品经理AI，擅长将需求转化为结构化的产品需求文档。"
+            backstory="你是一个资深产品经理AI，擅长将需求转化为结构化的产品需求文档。",
+            agent_type="prdwriter"
         )
-        self._llm_function = create_llm_function()
+        self._llm_function = create_llm_function("prdwriter")
+        self._async_llm_function = create_async_llm_function("prdwriter")
 
     def _build_prd_writing_prompt(self, requirements: str, market_report: str) -> str:
         """构建PRD撰写prompt"""
@@ -79,4 +81,12 @@ class PRDWriterAgent(BaseAgent):
             prompt = self._build_prd_writing_prompt(requirements, market_report)
             return self._llm_function(prompt)
         else:
-            return "LLM function is not available" 
\ No newline at end of file
+            return "LLM function is not available"
+
+    async def write_prd_async(self, requirements: str, market_report: str, on_token=None) -> str:
+        """PRD撰写方法（异步）"""
+        if self._async_llm_function is not None:
+            prompt = self._build_prd_writing_prompt(requirements, market_report)
+            return await self._async_llm_function(prompt, on_token=on_token)
+        else:
+            return "LLM function is not available"
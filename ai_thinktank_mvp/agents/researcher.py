@@ -2,7 +2,7 @@ from .base import BaseAgent
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from llm_module import create_llm_function
+from llm_module import create_llm_function, create_async_llm_function
 from typing import Dict, Any
 
 class ResearcherAgent(BaseAgent):
@@ -10,9 +10,11 @@ class ResearcherAgent(BaseAgent):
         super().__init__(
             role="Researcher",
             goal="为项目提供详实的市场调研和洞察分析",
-            backstory="你是一个AI市场调研专家，能够快速收集、分析并总结行业信息和趋势。"
+            backstory="你是一个AI市场调研专家，能够快速收集、分析并总结行业信息和趋势。",
+            agent_type="researcher"
         )
-        self._llm_function = create_llm_function()
+        self._llm_function = create_llm_function("researcher")
+        self._async_llm_function = create_async_llm_function("researcher")
 
     def _build_market_research_prompt(self, project_scope: str, target_market: str = "") -> str:
         """构建市场调研prompt"""
@@ -67,4 +69,12 @@ class ResearcherAgent(BaseAgent):
             prompt = self._build_market_research_prompt(project_scope, target_market)
             return self._llm_function(prompt)
         else:
-            return "LLM function is not available" 
\ No newline at end of file
+            return "LLM function is not available"
+
+    async def conduct_market_research_async(self, project_scope: str, target_market: str = "", on_token=None) -> str:
+        """市场调研方法（异步）"""
+        if self._async_llm_function is not None:
+            prompt = self._build_market_research_prompt(project_scope, target_market)
+            return await self._async_llm_function(prompt, on_token=on_token)
+        else:
+            return "LLM function is not available"
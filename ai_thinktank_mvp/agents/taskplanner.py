@@ -4,7 +4,8 @@ import json
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from llm_module import create_llm_function, chat_completion
+from llm_module import create_llm_function, create_async_llm_function, chat_completion
+from llm_structured import complete_json, complete_json_async, StructuredOutputError
 from typing import Literal, Any
 
 class TaskPlannerAgent(BaseAgent):
@@ -12,14 +13,16 @@ class TaskPlannerAgent(BaseAgent):
         super().__init__(
             role="TaskPlanner",
             goal="将用户需求拆解为任务树",
-            backstory="你是一个善于结构化思考的AI，负责将项目目标拆解为阶段、任务和子任务。"
+            backstory="你是一个善于结构化思考的AI，负责将项目目标拆解为阶段、任务和子任务。",
+            agent_type="taskplanner"
         )
         # 保留LLM函数用于直接调用
         import sys
         import os
         sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-        from llm_module import create_llm_function
-        self._llm_function = create_llm_function()
+        from llm_module import create_llm_function, create_async_llm_function
+        self._llm_function = create_llm_function("taskplanner")
+        self._async_llm_function = create_async_llm_function("taskplanner")
 
     def _build_prompt(self, user_goal: str, output_format: str) -> str:
         return f"""
@@ -51,35 +54,31 @@ class TaskPlannerAgent(BaseAgent):
         if self._llm_function is not None:
             prompt = self._build_prompt(user_goal, output_format)
             # 直接调用LLM函数
-            if callable(self._llm_function):
-                result = self._llm_function(prompt)
-            else:
+            if not callable(self._llm_function):
                 return {"error": "LLM is not callable"}
+            if output_format == "markdown":
+                return self._llm_function(prompt)
             
-            if output_format in ["dict", "json"]:
-                try:
-                    # 确保result是字符串
-                    if not isinstance(result, str):
-                        result = str(result)
-                    
-                    # 尝试直接解析JSON
-                    return json.loads(result)
-                except json.JSONDecodeError:
-                    # 如果JSON解析失败，尝试提取JSON部分
-                    try:
-                        # 查找可能的JSON内容
-                        import re
-                        result_str = str(result)
-                        json_match = re.search(r'\{.*\}', result_str, re.DOTALL)
-                        if json_match:
-                            json_str = json_match.group()
-                            return json.loads(json_str)
-                        else:
-                            # 如果找不到JSON，返回原始内容作为错误信息
-                            return {"error": f"LLM response is not valid JSON. Raw response: {result_str[:200]}..."}
-                    except:
-                        return {"error": f"LLM response is not valid JSON. Raw response: {str(result)[:200]}..."}
-            else:
-                return result
+            # JSON格式：请求JSON模式，解析失败时进行一次修复重试
+            try:
+                return complete_json(self._llm_function, prompt)
+            except StructuredOutputError as e:
+                return {"error": f"LLM response is not valid JSON. Raw response: {str(e.raw)[:200]}..."}
         else:
-            return {"error": "LLM function is not available"}
\ No newline at end of file
+            return {"error": "LLM function is not available"}
+
+    async def plan_tasks_async(self, user_goal: str, output_format: Literal["dict", "json", "markdown"] = "dict", on_token=None):
+        """任务拆解方法（异步）"""
+        if output_format not in ["dict", "json", "markdown"]:
+            output_format = "dict"
+
+        if self._async_llm_function is not None:
+            prompt = self._build_prompt(user_goal, output_format)
+            if output_format == "markdown":
+                return await self._async_llm_function(prompt, on_token=on_token)
+            try:
+                return await complete_json_async(self._async_llm_function, prompt, on_token=on_token)
+            except StructuredOutputError as e:
+                return {"error": f"LLM response is not valid JSON. Raw response: {str(e.raw)[:200]}..."}
+        else:
+            return {"error": "LLM function is not available"}
@@ -2,7 +2,7 @@ from .base import BaseAgent
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from llm_module import create_llm_function
+from llm_module import create_llm_function, create_async_llm_function
 from typing import Dict, Any
 
 class ToolFinderAgent(BaseAgent):
@@ -10,9 +10,11 @@ class ToolFinderAgent(BaseAgent):
         super().__init__(
             role="ToolFinder",
             goal="为项目推荐合适的工具和技术方案",
-            backstory="你是一个AI技术选型专家，能够根据项目需求分析并推荐最佳工具和技术路径。"
+            backstory="你是一个AI技术选型专家，能够根据项目需求分析并推荐最佳工具和技术路径。",
+            agent_type="toolfinder"
         )
-        self._llm_function = create_llm_function()
+        self._llm_function = create_llm_function("toolfinder")
+        self._async_llm_function = create_async_llm_function("toolfinder")
 
     def _build_tool_selection_prompt(self, project_scope: str, feature_specs: str) -> str:
         """构建工具选型prompt"""
@@ -74,4 +76,12 @@ class ToolFinderAgent(BaseAgent):
             prompt = self._build_tool_selection_prompt(project_scope, feature_specs)
             return self._llm_function(prompt)
         else:
-            return "LLM function is not available" 
\ No newline at end of file
+            return "LLM function is not available"
+
+    async def select_tools_async(self, project_scope: str, feature_specs: str, on_token=None) -> str:
+        """工具选型方法（异步）"""
+        if self._async_llm_function is not None:
+            prompt = self._build_tool_selection_prompt(project_scope, feature_specs)
+            return await self._async_llm_function(prompt, on_token=on_token)
+        else:
+            return "LLM function is not available"
@@ -0,0 +1,112 @@
+import gzip
+
+# 可选依赖：安装 brotli 时优先使用br编码（同等CPU开销下压缩率高于gzip）
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 不压缩的响应类型：SSE需要逐条推送，压缩会缓冲事件；图片等已压缩内容再压缩没有收益
+SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip")
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """解析 Accept-Encoding，返回 编码 -> q值"""
+    encodings = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def merge_vary(headers: list) -> list:
+    """把 Accept-Encoding 合并进已有的 Vary 头（多个 Vary 头合并为一个，已包含或为 * 时不重复添加）"""
+    values = [v.decode("latin-1") for k, v in headers if k == b"vary"]
+    fields = [field.strip() for value in values for field in value.split(",") if field.strip()]
+    if not any(field == "*" or field.lower() == "accept-encoding" for field in fields):
+        fields.append("Accept-Encoding")
+    return [(k, v) for k, v in headers if k != b"vary"] + [(b"vary", ", ".join(fields).encode("latin-1"))]
+
+
+def choose_encoding(header: str, brotli_enabled: bool = True) -> str:
+    """按客户端支持情况选择 br / gzip，都不支持时返回空字符串"""
+    encodings = parse_accept_encoding(header or "")
+    wildcard = encodings.get("*", 0.0)
+    for name in (("br", "gzip") if brotli_enabled and brotli is not None else ("gzip",)):
+        if encodings.get(name, wildcard) > 0:
+            return name
+    return ""
+
+
+class CompressionMiddleware:
+    """响应压缩（ASGI中间件）：按 Accept-Encoding 选择 br 或 gzip，只压缩超过阈值的一次性响应体。
+
+    分多次发送的流式响应（SSE等）原样透传，避免压缩缓冲打断逐条推送。"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 brotli_enabled: bool = True):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli_enabled = brotli_enabled
+
+    def compress(self, encoding: str, body: bytes) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict((k.lower(), v) for k, v in scope.get("headers", []))
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"), self.brotli_enabled)
+        if not encoding:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                # 等拿到响应体后再决定是否压缩
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough or start is None:
+                await send(message)
+                return
+
+            response_headers = [(k.lower(), v) for k, v in start.get("headers", [])]
+            content_type = next((v for k, v in response_headers if k == b"content-type"), b"").decode("latin-1")
+            body = message.get("body", b"")
+            compressible = (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and not any(k == b"content-encoding" for k, _ in response_headers)
+                and not content_type.startswith(SKIP_CONTENT_TYPES)
+            )
+            if compressible:
+                body = self.compress(encoding, body)
+                response_headers = [(k, v) for k, v in merge_vary(response_headers) if k != b"content-length"]
+                response_headers += [(b"content-encoding", encoding.encode("latin-1")),
+                                     (b"content-length", str(len(body)).encode("latin-1"))]
+                message = {**message, "body": body}
+            else:
+                passthrough = True
+            await send({**start, "headers": response_headers})
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
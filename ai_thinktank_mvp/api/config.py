@@ -6,4 +6,22 @@ load_dotenv()
 # 统一使用小爱的OpenAI接口
 OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://xiaoai.plus/v1")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "sk-xxx")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo") 
\ No newline at end of file
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")  # 与 llm_router.DEFAULT_MODEL 保持一致
+
+# 后台工作流队列
+WORKFLOW_WORKERS = int(os.getenv("WORKFLOW_WORKERS", "4"))
+WORKFLOW_QUEUE_SIZE = int(os.getenv("WORKFLOW_QUEUE_SIZE", "32"))
+WORKFLOW_WORKER_MODE = os.getenv("WORKFLOW_WORKER_MODE", "thread")
+# 未指定引擎的请求使用的工作流引擎：crewai 或 direct（与 crewai_workflow.WORKFLOW_ENGINE 保持一致）
+WORKFLOW_ENGINE = os.getenv("WORKFLOW_ENGINE", "crewai").lower()
+
+# 启动行为
+DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "true").lower() in ("1", "true", "yes", "on")
+WORKFLOW_PRELOAD = os.getenv("WORKFLOW_PRELOAD", "false").lower() in ("1", "true", "yes", "on")
+
+# 响应压缩：超过阈值的响应按 Accept-Encoding 使用 br（需安装 brotli）或 gzip 压缩
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes", "on")
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "4"))
+RESPONSE_BROTLI = os.getenv("RESPONSE_BROTLI", "true").lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,34 @@
+from typing import Optional
+
+
+def make_etag(*parts) -> str:
+    """弱ETag：内容相同但压缩编码不同的响应视为同一版本"""
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，支持多个ETag及 *）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def cached_json(request, etag: str, build):
+    """If-None-Match 命中时返回304（不执行 build），否则返回带ETag的JSON响应。
+    Cache-Control: no-cache 要求客户端每次都带ETag重新验证，状态变化后立即可见"""
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, Response
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(build()), headers=headers)
@@ -1,10 +1,41 @@
+from contextlib import asynccontextmanager
+import sys
+import threading
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from .config import OPENAI_API_BASE, OPENAI_API_KEY
-from agents.agent_factory import AgentFactory
-from models.database import Base, engine
+from .config import (
+    OPENAI_API_BASE, OPENAI_API_KEY, DB_AUTO_CREATE, WORKFLOW_PRELOAD,
+    RESPONSE_COMPRESSION, RESPONSE_COMPRESSION_MIN_BYTES, RESPONSE_GZIP_LEVEL, RESPONSE_BROTLI_QUALITY, RESPONSE_BROTLI
+)
+from .compression import CompressionMiddleware
+
+def preload_workflow_stack():
+    """导入crewai及Agent/工作流模块（较慢），供后台预热使用"""
+    from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+    import ai_thinktank_mvp.workflows.crewai_workflow  # noqa: F401
+    AgentFactory.shared()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 建表放到启动阶段，生产环境可关闭并改用 alembic upgrade head
+    if DB_AUTO_CREATE:
+        from ai_thinktank_mvp.models.database import init_db
+        init_db()
+
+    # 重量级模块默认在首次工作流请求时才导入；开启预热时在后台线程导入，不阻塞健康检查
+    if WORKFLOW_PRELOAD:
+        threading.Thread(target=preload_workflow_stack, name="workflow-preload", daemon=True).start()
+
+    yield
 
-app = FastAPI(title="AI Think Tank MVP API")
+    workflow_api.shutdown_job_queue()
+    # 写完单写入队列中剩余的写操作
+    if "ai_thinktank_mvp.models.write_queue" in sys.modules:
+        from ai_thinktank_mvp.models.write_queue import shutdown_write_queue
+        shutdown_write_queue()
+
+app = FastAPI(title="AI Think Tank MVP API", lifespan=lifespan)
 
 # 添加CORS中间件
 app.add_middleware(
@@ -13,13 +44,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
-# 初始化数据库
-Base.metadata.create_all(bind=engine)
-
-# 初始化Agent工厂
-agent_factory = AgentFactory()
+# 压缩较大的JSON响应（工作流结果可达数十KB）；SSE等流式响应不压缩
+if RESPONSE_COMPRESSION:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_level=RESPONSE_GZIP_LEVEL,
+        brotli_quality=RESPONSE_BROTLI_QUALITY,
+        brotli_enabled=RESPONSE_BROTLI
+    )
 
 @app.get("/ping")
 def ping():
@@ -27,13 +63,57 @@ def ping():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy", "message": "AI Think Tank MVP API is running"}
+    return {
+        "status": "healthy",
+        "message": "AI Think Tank MVP API is running",
+        "workflow_loaded": "ai_thinktank_mvp.workflows.crewai_workflow" in sys.modules
+    }
+
+@app.get("/metrics/llm")
+def llm_metrics():
+    """LLM连接池统计（新建/复用连接数）、响应缓存命中统计、消息解析路径统计、各Agent的token用量、JSON解析统计、重试/对冲统计、模型路由状态及限流排队统计"""
+    from llm_module import get_connection_stats, get_cache_stats, get_token_stats, get_reliability_stats, get_routing_stats, get_rate_limit_metrics
+    from llm_structured import get_structured_stats
+    from ai_thinktank_mvp.utils.message_parser import get_parse_stats
+    return {
+        "connections": get_connection_stats(),
+        "cache": get_cache_stats(),
+        "parser": get_parse_stats(),
+        "tokens": get_token_stats(),
+        "structured_output": get_structured_stats(),
+        "reliability": get_reliability_stats(),
+        "routing": get_routing_stats(),
+        "rate_limit": get_rate_limit_metrics()
+    }
 
-# 包含工作流API路由
+@app.get("/metrics/agents")
+def agent_metrics():
+    """Agent构建次数、平均构建耗时及实例池命中统计"""
+    # Agent栈尚未加载时不为了统计而导入crewai
+    if "ai_thinktank_mvp.agents.agent_factory" not in sys.modules:
+        return {}
+    from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+    return AgentFactory.shared().metrics()
+
+@app.get("/metrics/db")
+def db_metrics():
+    """数据库类型及单写入队列统计（写操作数、事务数、平均每个事务合并的写操作数、排队数）"""
+    from ai_thinktank_mvp.models.database import engine
+    stats = {"dialect": engine.dialect.name, "pool": engine.pool.status()}
+    if "ai_thinktank_mvp.models.write_queue" in sys.modules:
+        from ai_thinktank_mvp.models.write_queue import get_write_queue
+        write_queue = get_write_queue()
+        stats["write_queue"] = write_queue.stats() if write_queue is not None else {"enabled": False}
+    return stats
+
+# 包含工作流API路由（路由模块本身很轻，crewai等在首次使用时才导入）
 from . import workflow_api
 app.include_router(workflow_api.router)
 
-# 预留：项目/任务相关API路由
-# from . import project_api, task_api
-# app.include_router(project_api.router)
-# app.include_router(task_api.router) 
\ No newline at end of file
+# 项目列表/检索API路由
+from . import project_api
+app.include_router(project_api.router)
+
+# 预留：任务相关API路由
+# from . import task_api
+# app.include_router(task_api.router)
@@ -0,0 +1,38 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ai_thinktank_mvp.api.workflow_api import get_db
+
+router = APIRouter(prefix="/projects", tags=["项目"])
+
+def _list(db: Session, status: Optional[str], q: Optional[str], cursor: Optional[str], limit: int, fields: Optional[str]):
+    from ai_thinktank_mvp.models.project_query import list_projects, parse_fields
+    try:
+        return list_projects(db, status=status, query=q, cursor=cursor, limit=limit, fields=parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("")
+def list_projects(
+    status: Optional[str] = Query(None, description="按状态过滤：queued / running / completed / failed"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，默认 id,name,status,created_at"),
+    db: Session = Depends(get_db)
+):
+    """按创建时间倒序分页列出项目（游标分页，只查询所选字段）"""
+    return _list(db, status, None, cursor, limit, fields)
+
+@router.get("/search")
+def search_projects(
+    q: str = Query(..., min_length=1, description="检索词，空格分隔的多个词需全部命中"),
+    status: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """全文检索项目名称、目标及各阶段产出，结果按创建时间倒序分页"""
+    return _list(db, status, q, cursor, limit, fields)
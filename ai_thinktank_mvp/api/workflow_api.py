@@ -1,30 +1,75 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Literal, Optional
+import asyncio
+import json
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
-from ai_thinktank_mvp.api.config import OPENAI_API_BASE, OPENAI_API_KEY
-from ai_thinktank_mvp.agents.agent_factory import AgentFactory
-from ai_thinktank_mvp.models.database import SessionLocal
-from ai_thinktank_mvp.workflows.crewai_workflow import AIThinkTankWorkflow
+from ai_thinktank_mvp.api.config import (
+    OPENAI_API_BASE, OPENAI_API_KEY,
+    WORKFLOW_WORKERS, WORKFLOW_QUEUE_SIZE, WORKFLOW_WORKER_MODE, WORKFLOW_ENGINE
+)
+from ai_thinktank_mvp.api.http_cache import cached_json, make_etag
+from ai_thinktank_mvp.workflows.job_queue import WorkflowJobQueue, QueueFullError
+
+# crewai、Agent、数据库模型等重量级模块均在首次使用时导入，缩短API进程冷启动时间
+# 数据库访问都是同步调用：不需要 await 的接口定义为普通函数（由FastAPI放到线程池执行），
+# 异步接口中的数据库读写通过 asyncio.to_thread 执行，不阻塞事件循环
 
 def get_db():
+    from ai_thinktank_mvp.models.database import SessionLocal
     db = SessionLocal()  
     try:
         yield db
     finally:
         db.close()
 
+def get_workflow(db: Session):
+    """创建工作流管理器（首次调用时导入crewai及Agent栈）"""
+    from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+    from ai_thinktank_mvp.workflows.crewai_workflow import AIThinkTankWorkflow
+    return AIThinkTankWorkflow(AgentFactory.shared(), db)
+
 router = APIRouter(prefix="/workflow", tags=["工作流"])
 
+_job_queue: Optional[WorkflowJobQueue] = None
+
+def get_job_queue() -> WorkflowJobQueue:
+    """后台工作流队列（首次使用时创建）"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = WorkflowJobQueue(
+            workers=WORKFLOW_WORKERS,
+            queue_size=WORKFLOW_QUEUE_SIZE,
+            mode=WORKFLOW_WORKER_MODE
+        )
+    return _job_queue
+
+def shutdown_job_queue():
+    if _job_queue is not None:
+        _job_queue.shutdown()
+
 class ChatWorkflowRequest(BaseModel):
     message: str = Field(..., description="用户聊天消息")
+    reuse_similar: bool = Field(True, description="是否复用近重复历史需求的工作流结果")
+    engine: Optional[Literal["crewai", "direct"]] = Field(
+        None, description="执行引擎：crewai 或 direct（直接调用Agent），默认取 WORKFLOW_ENGINE 配置"
+    )
 
 class WorkflowResponse(BaseModel):
     project_id: Optional[int] = None
     workflow_result: str
     individual_outputs: Dict[str, Any]
+    reused_from: Optional[int] = None
+    similarity: Optional[float] = None
+
+class WorkflowJobResponse(BaseModel):
+    project_id: Optional[int] = None
+    status: str
+    workflow_result: Optional[str] = None
+    individual_outputs: Dict[str, Any] = {}
 
 @router.post("/chat", response_model=WorkflowResponse)
 async def execute_chat_workflow(
@@ -35,22 +80,31 @@ async def execute_chat_workflow(
     try:
         from ai_thinktank_mvp.utils.message_parser import MessageParser
         
-        # 解析用户消息
+        # 解析用户消息（异步，不阻塞事件循环）
         parser = MessageParser()
-        parsed = parser.parse_message(request.message)
+        parsed = await parser.parse_message_async(request.message)
         
-        # 初始化Agent工厂
-        agent_factory = AgentFactory() 
+        # 创建工作流管理器（共享Agent工厂）
+        workflow = get_workflow(db)
+        # 未指定引擎时使用 WORKFLOW_ENGINE 配置
+        engine = (request.engine or WORKFLOW_ENGINE).lower()
         
-        # 创建工作流管理器
-        workflow = AIThinkTankWorkflow(agent_factory, db)
-        
-        # 智能判断是否应该执行完整工作流
-        if workflow.should_execute_workflow(request.message):
-            # 执行完整工作流
-            result = workflow.execute_full_workflow(
+        # 智能判断是否应该执行完整工作流（解析时已一并完成意图判断）
+        if parsed["should_execute"] and engine == "crewai":
+            # crewai引擎在线程中执行同步工作流
+            result = await asyncio.to_thread(
+                workflow.execute_full_workflow,
+                parsed["user_goal"],
+                parsed["user_context"],
+                reuse_similar=request.reuse_similar,
+                engine="crewai"
+            )
+        elif parsed["should_execute"]:
+            # 异步执行完整工作流（直接调用各Agent）
+            result = await workflow.execute_full_workflow_async(
                 user_goal=parsed["user_goal"],
-                user_context=parsed["user_context"]
+                user_context=parsed["user_context"],
+                reuse_similar=request.reuse_similar
             )
         else:
             # 执行简单对话
@@ -63,24 +117,268 @@ async def execute_chat_workflow(
         return WorkflowResponse(
             project_id=result.get("project_id", 0),
             workflow_result=result.get("workflow_result", "工作流执行完成"),
-            individual_outputs=result.get("individual_outputs", {})
+            individual_outputs=result.get("individual_outputs", {}),
+            reused_from=result.get("reused_from"),
+            similarity=result.get("similarity")
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"聊天工作流执行失败: {str(e)}")
 
-@router.get("/status/{project_id}")
-async def get_workflow_status(project_id: int, db: Session = Depends(get_db)):
-    """获取工作流执行状态"""
+@router.post("/submit", response_model=WorkflowJobResponse, status_code=202)
+async def submit_chat_workflow(
+    request: ChatWorkflowRequest,
+    db: Session = Depends(get_db)
+):
+    """提交工作流到后台队列，立即返回项目ID，通过 /workflow/status/{project_id} 轮询进度"""
+    from ai_thinktank_mvp.utils.message_parser import MessageParser
+    
+    workflow = get_workflow(db)
+    parser = MessageParser()
+    parsed = await parser.parse_message_async(request.message)
+    
+    # 非项目需求直接返回简单对话结果
+    if not parsed["should_execute"]:
+        result = workflow.execute_simple_chat(request.message)
+        return WorkflowJobResponse(
+            status="completed",
+            workflow_result=result["workflow_result"],
+            individual_outputs=result["individual_outputs"]
+        )
+    
+    # 近重复需求直接复用历史结果，不占用队列
+    if request.reuse_similar:
+        similar = await asyncio.to_thread(workflow.find_similar_result, parsed["user_goal"], parsed["user_context"])
+        if similar is not None:
+            result = await asyncio.to_thread(
+                workflow.reuse_result, parsed["user_goal"], similar, user_context=parsed["user_context"]
+            )
+            return WorkflowJobResponse(
+                project_id=result["project_id"],
+                status="completed",
+                workflow_result=result["workflow_result"],
+                individual_outputs=result["individual_outputs"]
+            )
+    
+    try:
+        # submit 会在当前线程中创建项目记录
+        project_id = await asyncio.to_thread(
+            get_job_queue().submit,
+            lambda: workflow.create_project(parsed["user_goal"], parsed["user_context"]),
+            parsed["user_goal"],
+            parsed["user_context"],
+            reuse_similar=request.reuse_similar,
+            engine=request.engine
+        )
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="工作流队列已满，请稍后重试")
+    
+    return WorkflowJobResponse(project_id=project_id, status="queued")
+
+@router.post("/resume/{project_id}", response_model=WorkflowJobResponse, status_code=202)
+def resume_workflow(
+    project_id: int,
+    engine: Optional[Literal["crewai", "direct"]] = None,
+    db: Session = Depends(get_db)
+):
+    """断点续跑：将未完成的项目重新提交到后台队列，只重新执行缺失或失败的阶段"""
     from ai_thinktank_mvp.models.project import Project
     
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="项目不存在")
+    if project.status == "completed":
+        raise HTTPException(status_code=409, detail="项目已完成，无需续跑")
+    
+    workflow = get_workflow(db)
+    completed = sorted(workflow.load_checkpoints(project_id))
+    
+    def requeue() -> int:
+        workflow._set_project_status(project_id, "queued")
+        return project_id
+    
+    try:
+        get_job_queue().submit(
+            requeue,
+            project.description or "",
+            project.user_context or "",
+            reuse_similar=False,
+            engine=engine
+        )
+    except QueueFullError:
+        raise HTTPException(status_code=429, detail="工作流队列已满，请稍后重试")
+    
+    return WorkflowJobResponse(
+        project_id=project_id,
+        status="queued",
+        individual_outputs={"checkpointed_stages": completed}
+    )
+
+@router.post("/stream")
+async def stream_chat_workflow(request: ChatWorkflowRequest):
+    """以Server-Sent Events流式返回工作流执行过程。
+
+    事件类型：project（项目ID）、stage_start / stage_finish（阶段开始/结束）、
+    token（带阶段和Agent标签的增量文本）、result（简单对话回复）、done、error。
+    """
+    from ai_thinktank_mvp.utils.message_parser import MessageParser
+    
+    async def event_stream():
+        from ai_thinktank_mvp.models.database import SessionLocal
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        db = SessionLocal()
+        
+        async def run():
+            try:
+                workflow = get_workflow(db)
+                parsed = await MessageParser().parse_message_async(request.message)
+                if parsed["should_execute"]:
+                    result = await workflow.execute_full_workflow_async(
+                        user_goal=parsed["user_goal"],
+                        user_context=parsed["user_context"],
+                        on_event=queue.put_nowait,
+                        reuse_similar=request.reuse_similar
+                    )
+                    queue.put_nowait({"type": "done", "project_id": result["project_id"]})
+                else:
+                    result = workflow.execute_simple_chat(request.message)
+                    queue.put_nowait({"type": "result", "content": result["workflow_result"]})
+                    queue.put_nowait({"type": "done", "project_id": None})
+            except Exception as e:
+                queue.put_nowait({"type": "error", "detail": f"聊天工作流执行失败: {str(e)}"})
+            finally:
+                db.close()
+                queue.put_nowait(None)
+        
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                data = json.dumps(event, ensure_ascii=False, default=str)
+                yield f"event: {event['type']}\ndata: {data}\n\n"
+        finally:
+            # 客户端断开时取消仍在执行的工作流
+            if not task.done():
+                task.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/status/{project_id}")
+def get_workflow_status(project_id: int, request: Request, db: Session = Depends(get_db)):
+    """获取工作流执行状态（含各阶段进度）。
+    响应带ETag（项目版本号），轮询时携带 If-None-Match，状态未变化则返回304且不查询阶段"""
+    from ai_thinktank_mvp.models.project import Project, Task
+    
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    
+    def build():
+        stages = db.query(Task).filter(
+            Task.project_id == project_id,
+            Task.parent_id.is_(None)
+        ).order_by(Task.id).all()
+        return {
+            "project_id": project.id,
+            "name": project.name,
+            "status": project.status, 
+            "created_at": project.created_at,
+            "version": project.version,
+            "prompt_tokens": project.prompt_tokens or 0,
+            "completion_tokens": project.completion_tokens or 0,
+            "stages": [
+                {
+                    "stage": task.name,
+                    "agent": task.agent,
+                    "status": task.status,
+                    "has_output": task.output_id is not None
+                }
+                for task in stages
+            ]
+        }
+    
+    return cached_json(request, make_etag("status", project.id, project.version), build)
+
+@router.get("/result/{project_id}")
+def get_workflow_result(project_id: int, request: Request, db: Session = Depends(get_db)):
+    """获取项目的最终结果（评估阶段产出），带ETag；各阶段产出通过 /result/{project_id}/{stage} 单独获取"""
+    from ai_thinktank_mvp.models.project import Project, Task
+    
+    project = db.get(Project, project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    
+    def build():
+        stages = db.query(Task).filter(
+            Task.project_id == project_id,
+            Task.parent_id.is_(None)
+        ).order_by(Task.id).all()
+        evaluation = next((task for task in stages if task.name == "evaluation"), None)
+        return {
+            "project_id": project.id,
+            "status": project.status,
+            "workflow_result": evaluation.output.content if evaluation is not None and evaluation.output else None,
+            "stages": [task.name for task in stages if task.output_id is not None]
+        }
+    
+    return cached_json(request, make_etag("result", project.id, project.version), build)
+
+@router.get("/result/{project_id}/{stage}")
+def get_stage_output(project_id: int, stage: str, request: Request, db: Session = Depends(get_db)):
+    """获取单个阶段的产出。ETag取自产出的内容哈希，内容未变时返回304且不解压内容"""
+    from ai_thinktank_mvp.models.project import Task
+    
+    task = db.query(Task).filter(
+        Task.project_id == project_id,
+        Task.parent_id.is_(None),
+        Task.name == stage
+    ).first()
+    if task is None:
+        raise HTTPException(status_code=404, detail="阶段不存在")
+    if task.output is None:
+        raise HTTPException(status_code=404, detail="该阶段尚无产出")
+    
+    output = task.output
+    etag = make_etag("stage", project_id, stage, task.status, output.content_hash or f"output{output.id}")
+    return cached_json(request, etag, lambda: {
+        "project_id": project_id,
+        "stage": task.name,
+        "agent": task.agent,
+        "status": task.status,
+        "type": output.type,
+        "content": output.content
+    })
+
+@router.get("/tasks/{project_id}")
+def get_task_tree(project_id: int, request: Request, path: Optional[str] = None, db: Session = Depends(get_db)):
+    """获取项目的任务树（单次查询）；指定 path 时只返回该节点的子树及其祖先节点"""
+    from ai_thinktank_mvp.models.project import Project
+    from ai_thinktank_mvp.models import task_tree
+    
+    project = db.get(Project, project_id)
+    if project is None:
+        raise HTTPException(status_code=404, detail="项目不存在")
+    
+    def build():
+        tree = task_tree.load_task_tree(db, project_id, path)
+        if path:
+            if not tree:
+                raise HTTPException(status_code=404, detail="任务节点不存在")
+            return {
+                "project_id": project_id,
+                "ancestors": task_tree.load_ancestors(db, project_id, path),
+                "tasks": tree
+            }
+        if not tree:
+            # 未持久化任务树的项目从任务规划检查点即时展开
+            tree = get_workflow(db).load_task_tree(project_id)
+        return {"project_id": project_id, "tasks": tree}
     
-    return {
-        "project_id": project.id,
-        "name": project.name,
-        "status": project.status, 
-        "created_at": project.created_at
-    }
\ No newline at end of file
+    return cached_json(request, make_etag("tasks", project_id, project.version, path or ""), build)
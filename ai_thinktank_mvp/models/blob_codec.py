@@ -0,0 +1,57 @@
+from typing import Tuple
+import hashlib
+import os
+import zlib
+
+# 可选依赖：安装 zstandard 时使用zstd压缩（更快、压缩率更高），否则使用标准库zlib
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 压缩算法：auto 优先zstd，zstd / zlib 指定算法，none 不压缩
+OUTPUT_COMPRESSION = os.getenv("OUTPUT_COMPRESSION", "auto").lower()
+OUTPUT_COMPRESSION_LEVEL = int(os.getenv("OUTPUT_COMPRESSION_LEVEL", "6"))
+# 小于该字节数的内容不压缩（压缩头开销大于收益）
+OUTPUT_COMPRESSION_MIN_BYTES = int(os.getenv("OUTPUT_COMPRESSION_MIN_BYTES", "256"))
+
+CODECS = ("raw", "zlib", "zstd")
+
+
+def content_hash(text: str) -> str:
+    """内容地址：UTF-8编码后的SHA-256十六进制摘要"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _codec_for(size: int) -> str:
+    if OUTPUT_COMPRESSION == "none" or size < OUTPUT_COMPRESSION_MIN_BYTES:
+        return "raw"
+    if OUTPUT_COMPRESSION == "zlib" or zstandard is None:
+        return "zlib"
+    return "zstd"
+
+
+def compress(text: str) -> Tuple[str, bytes]:
+    """压缩文本，返回 (算法, 数据)"""
+    raw = text.encode("utf-8")
+    codec = _codec_for(len(raw))
+    if codec == "zstd":
+        return codec, zstandard.ZstdCompressor(level=OUTPUT_COMPRESSION_LEVEL).compress(raw)
+    if codec == "zlib":
+        return codec, zlib.compress(raw, min(OUTPUT_COMPRESSION_LEVEL, 9))
+    return codec, raw
+
+
+def decompress(codec: str, data: bytes) -> str:
+    """按存储时的算法解压（与当前 OUTPUT_COMPRESSION 配置无关）"""
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed outputs: pip install zstandard")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    elif codec == "raw":
+        raw = data
+    else:
+        raise ValueError(f"Unknown blob codec: {codec}")
+    return bytes(raw).decode("utf-8")
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, LargeBinary, Index, event
+from sqlalchemy.orm import relationship, deferred, Session
 from .database import Base
+from . import blob_codec
 import datetime
 
 class Project(Base):
@@ -8,9 +9,19 @@ class Project(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(128), nullable=False)
     description = Column(Text)
+    user_context = Column(Text)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     status = Column(String(32), default="pending")
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    # 项目或其任务每次变更时递增，作为状态/结果接口的ETag
+    version = Column(Integer, default=1, nullable=False)
     tasks = relationship("Task", back_populates="project")
+    # 列表按 (created_at, id) 键集分页，可按状态过滤
+    __table_args__ = (
+        Index("ix_projects_created_at_id", "created_at", "id"),
+        Index("ix_projects_status_created_at_id", "status", "created_at", "id"),
+    )
 
 class Task(Base):
     __tablename__ = 'tasks'
@@ -23,14 +34,105 @@ class Task(Base):
     agent = Column(String(64))
     output_id = Column(Integer, ForeignKey('agent_outputs.id'), nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # TaskPlanner任务树节点的物化路径（见 task_tree.py），工作流阶段任务为空
+    path = Column(String(255))
+    depth = Column(Integer)
+    position = Column(Integer)
     project = relationship("Project", back_populates="tasks")
     parent = relationship("Task", remote_side=[id], backref="subtasks")
     output = relationship("AgentOutput", back_populates="task", uselist=False)
+    __table_args__ = (Index("ix_tasks_project_path", "project_id", "path"),)
+
+class ContentBlob(Base):
+    """按内容哈希去重、压缩存储的产出文本，相同内容只存一份"""
+    __tablename__ = 'content_blobs'
+    hash = Column(String(64), primary_key=True)
+    codec = Column(String(16), nullable=False)
+    size = Column(Integer)
+    # 压缩数据延迟加载，只有读取内容时才查询
+    data = deferred(Column(LargeBinary, nullable=False))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
 
 class AgentOutput(Base):
     __tablename__ = 'agent_outputs'
     id = Column(Integer, primary_key=True, index=True)
-    content = Column(Text)
+    # 旧数据的明文内容；新写入的内容保存在 content_blobs 中，通过 content_hash 引用
+    legacy_content = Column("content", Text)
+    content_hash = Column(String(64), ForeignKey('content_blobs.hash'), index=True)
     type = Column(String(32))
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    task = relationship("Task", back_populates="output", uselist=False) 
\ No newline at end of file
+    task = relationship("Task", back_populates="output", uselist=False)
+    blob = relationship("ContentBlob")
+
+    @property
+    def content(self):
+        """产出文本：首次读取时才加载并解压，之后缓存在实例上"""
+        if self.content_hash is None:
+            return self.legacy_content
+        cached = self.__dict__.get("_content_cache")
+        if cached is not None and cached[0] == self.content_hash:
+            return cached[1]
+        text = blob_codec.decompress(self.blob.codec, self.blob.data)
+        self._content_cache = (self.content_hash, text)
+        return text
+
+    @content.setter
+    def content(self, text):
+        if text is None:
+            self.content_hash = None
+            self.legacy_content = None
+            return
+        digest = blob_codec.content_hash(text)
+        self.content_hash = digest
+        self.legacy_content = None
+        self._content_cache = (digest, text)
+        # flush前再写入 content_blobs（已存在相同哈希时不重复写入）
+        self._pending_blob = text
+
+@event.listens_for(Session, "before_flush")
+def _store_pending_blobs(session, flush_context, instances):
+    """为新写入的产出内容创建压缩blob，相同内容只写一份"""
+    added = set()
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, AgentOutput) or obj.__dict__.get("_pending_blob") is None:
+            continue
+        text = obj.__dict__.pop("_pending_blob")
+        digest = obj.content_hash
+        if digest in added:
+            continue
+        with session.no_autoflush:
+            exists = session.get(ContentBlob, digest) is not None
+        if not exists:
+            _insert_blob(session, digest, text)
+        added.add(digest)
+
+def _insert_blob(session, digest: str, text: str):
+    """写入blob；其他会话并发写入了相同内容时忽略冲突（SQLite / PostgreSQL 使用 ON CONFLICT DO NOTHING）"""
+    codec, data = blob_codec.compress(text)
+    values = {"hash": digest, "codec": codec, "size": len(text.encode("utf-8")), "data": data}
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        session.add(ContentBlob(**values))
+        return
+    connection.execute(insert(ContentBlob.__table__).values(**values).on_conflict_do_nothing(index_elements=["hash"]))
+
+@event.listens_for(Session, "before_flush")
+def _bump_project_versions(session, flush_context, instances):
+    """项目或其任务有变更时递增项目版本号"""
+    projects = {}
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Project) and obj not in session.new and session.is_modified(obj):
+            projects[obj.id] = obj
+        elif isinstance(obj, Task) and obj.project_id is not None and session.is_modified(obj):
+            projects.setdefault(obj.project_id, None)
+    for project_id, project in projects.items():
+        if project is None:
+            with session.no_autoflush:
+                project = session.get(Project, project_id)
+        if project is not None:
+            project.version = (project.version or 0) + 1
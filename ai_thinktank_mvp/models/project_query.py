@@ -0,0 +1,96 @@
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import datetime
+import json
+
+# 列表接口可选的字段；stages 为各阶段状态（额外一次查询，不加载产出内容）
+PROJECT_FIELDS = ("id", "name", "description", "user_context", "status", "created_at",
+                  "prompt_tokens", "completion_tokens", "stages")
+DEFAULT_FIELDS = ("id", "name", "status", "created_at")
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """解析逗号分隔的字段列表；id 总是返回（用于游标）"""
+    if not fields:
+        return list(DEFAULT_FIELDS)
+    selected = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in PROJECT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [field for field in dict.fromkeys(selected) if field != "id"]
+
+
+def encode_cursor(created_at: datetime.datetime, project_id: int) -> str:
+    """游标为最后一条记录的 (created_at, id)，编码为URL安全的字符串"""
+    payload = json.dumps([created_at.isoformat(), project_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, project_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.datetime.fromisoformat(created_at), int(project_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def list_projects(session, status: str = None, query: str = None, cursor: str = None,
+                  limit: int = DEFAULT_LIMIT, fields: List[str] = None) -> Dict[str, Any]:
+    """按创建时间倒序分页列出项目（键集分页：按 (created_at, id) 定位下一页，不使用OFFSET）。
+
+    只查询所选字段，不加载阶段任务及产出内容；query 非空时通过全文检索索引过滤。
+    返回 {"items": [...], "next_cursor": 下一页游标或None}"""
+    from sqlalchemy import and_, or_
+    from .project import Project
+    from .search import matching_project_ids
+
+    fields = fields or list(DEFAULT_FIELDS)
+    limit = max(1, min(limit, MAX_LIMIT))
+    columns = [getattr(Project, field) for field in fields if field != "stages"]
+    # 游标需要 created_at，未选择时额外查询但不返回
+    if "created_at" not in fields:
+        columns.append(Project.created_at)
+
+    q = session.query(*columns)
+    if status:
+        q = q.filter(Project.status == status)
+    if query:
+        matched = matching_project_ids(session, query)
+        if matched is not None:
+            q = q.filter(Project.id.in_(matched))
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        q = q.filter(or_(
+            Project.created_at < created_at,
+            and_(Project.created_at == created_at, Project.id < last_id)
+        ))
+    rows = q.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [{field: row._mapping[field] for field in fields if field != "stages"} for row in rows]
+    if "stages" in fields and items:
+        stages = project_stages(session, [item["id"] for item in items])
+        for item in items:
+            item["stages"] = stages.get(item["id"], [])
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def project_stages(session, project_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """一次查询取出多个项目的阶段状态"""
+    from .project import Task
+
+    rows = session.query(Task.project_id, Task.name, Task.agent, Task.status, Task.output_id).filter(
+        Task.project_id.in_(project_ids),
+        Task.parent_id.is_(None)
+    ).order_by(Task.project_id, Task.id)
+    stages: Dict[int, List[Dict[str, Any]]] = {}
+    for project_id, name, agent, status, output_id in rows:
+        stages.setdefault(project_id, []).append(
+            {"stage": name, "agent": agent, "status": status, "has_output": output_id is not None}
+        )
+    return stages
@@ -0,0 +1,143 @@
+from typing import List, Optional, Tuple
+import os
+import threading
+
+# 项目全文检索索引：SQLite 使用 FTS5 虚拟表（trigram分词，中文无需分词即可做子串匹配，检索词至少3个字符），
+# PostgreSQL 使用 tsvector + GIN 索引；其他数据库退化为对项目名称/目标的 LIKE 查询
+SEARCH_ENABLED = os.getenv("PROJECT_SEARCH_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+SQLITE_TOKENIZER = os.getenv("PROJECT_SEARCH_TOKENIZER", "trigram")
+# PostgreSQL 文本检索配置，中文可安装 zhparser 等分词扩展后改为对应配置名
+PG_SEARCH_CONFIG = os.getenv("PROJECT_SEARCH_PG_CONFIG", "simple")
+# 每个项目写入索引的产出文本上限（字符数）
+MAX_INDEXED_CHARS = int(os.getenv("PROJECT_SEARCH_MAX_CHARS", "200000"))
+
+TABLE = "project_search"
+MIN_TRIGRAM_CHARS = 3
+
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def create_statements(dialect: str) -> List[str]:
+    """创建检索索引的DDL（可重复执行）"""
+    if dialect == "sqlite":
+        return [f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(name, description, outputs, tokenize='{SQLITE_TOKENIZER}')"]
+    if dialect == "postgresql":
+        return [
+            f"CREATE TABLE IF NOT EXISTS {TABLE} (project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE, document TSVECTOR NOT NULL)",
+            f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_document ON {TABLE} USING GIN (document)",
+        ]
+    return []
+
+
+def _key(connection):
+    return connection.dialect.name, str(connection.engine.url)
+
+
+def ensure_search_index(connection):
+    """创建检索索引（启动时或首次写入时调用，每个数据库只执行一次）"""
+    key = _key(connection)
+    if key in _ready:
+        return
+    from sqlalchemy import text
+    with _ready_lock:
+        if key not in _ready:
+            for statement in create_statements(connection.dialect.name):
+                connection.execute(text(statement))
+            _ready.add(key)
+
+
+def search_index_exists(connection) -> bool:
+    """只读检查检索索引是否已创建（读请求不执行DDL）"""
+    if not SEARCH_ENABLED:
+        return False
+    key = _key(connection)
+    if key in _ready:
+        return True
+    from sqlalchemy import text
+    if connection.dialect.name == "sqlite":
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": TABLE}).first() is not None
+    elif connection.dialect.name == "postgresql":
+        exists = connection.execute(text("SELECT to_regclass(:name)"), {"name": TABLE}).scalar() is not None
+    else:
+        exists = False
+    if exists:
+        _ready.add(key)
+    return exists
+
+
+def split_terms(query: str) -> List[str]:
+    return [term for term in query.split() if term]
+
+
+def fts5_match(terms: List[str]) -> Optional[str]:
+    """把检索词转成 FTS5 MATCH 表达式：每个词作为短语（转义双引号），多个词之间为 AND；
+    不足3个字符的词无法走trigram索引，返回的表达式中不包含它们"""
+    phrases = ['"' + term.replace('"', '""') + '"' for term in terms if len(term) >= MIN_TRIGRAM_CHARS]
+    return " ".join(phrases) or None
+
+
+def _document(name: str, description: str, outputs: str) -> Tuple[str, str, str]:
+    return name or "", description or "", (outputs or "")[:MAX_INDEXED_CHARS]
+
+
+def index_project(session, project_id: int, name: str, description: str, outputs: str = ""):
+    """在当前事务中写入/替换项目的检索文档"""
+    from sqlalchemy import text
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if not SEARCH_ENABLED or dialect not in ("sqlite", "postgresql"):
+        return
+    ensure_search_index(connection)
+    name, description, outputs = _document(name, description, outputs)
+    if dialect == "sqlite":
+        connection.execute(text(f"DELETE FROM {TABLE} WHERE rowid = :id"), {"id": project_id})
+        connection.execute(
+            text(f"INSERT INTO {TABLE} (rowid, name, description, outputs) VALUES (:id, :name, :description, :outputs)"),
+            {"id": project_id, "name": name, "description": description, "outputs": outputs}
+        )
+    else:
+        connection.execute(
+            text(
+                f"INSERT INTO {TABLE} (project_id, document) VALUES (:id, "
+                "setweight(to_tsvector(CAST(:config AS regconfig), :name || ' ' || :description), 'A') || "
+                "setweight(to_tsvector(CAST(:config AS regconfig), :outputs), 'B')) "
+                "ON CONFLICT (project_id) DO UPDATE SET document = EXCLUDED.document"
+            ),
+            {"id": project_id, "config": PG_SEARCH_CONFIG, "name": name, "description": description, "outputs": outputs}
+        )
+
+
+def matching_project_ids(session, query: str):
+    """返回匹配检索词（全部命中）的项目ID子查询，供列表查询作为过滤条件；检索词为空时返回None"""
+    from sqlalchemy import and_, literal_column, or_, select, table, text
+    from .project import Project
+
+    terms = split_terms(query)
+    if not terms:
+        return None
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if not search_index_exists(connection):
+        # 未建立检索索引时只匹配项目名称和目标
+        conditions = [or_(Project.name.contains(term), Project.description.contains(term)) for term in terms]
+        return select(Project.id).where(and_(*conditions))
+
+    if dialect == "postgresql":
+        return select(literal_column("project_id")).select_from(table(TABLE)).where(
+            text("document @@ plainto_tsquery(CAST(:search_config AS regconfig), :search_query)").bindparams(
+                search_config=PG_SEARCH_CONFIG, search_query=" ".join(terms)
+            )
+        )
+
+    conditions = []
+    match = fts5_match(terms)
+    if match:
+        conditions.append(text(f"{TABLE} MATCH :search_match").bindparams(search_match=match))
+    # 短词逐列做子串查找（全表扫描FTS内容，但只在检索词很短时发生）
+    for index, term in enumerate(t for t in terms if len(t) < MIN_TRIGRAM_CHARS):
+        key = f"search_term_{index}"
+        conditions.append(text(
+            f"(instr(name, :{key}) > 0 OR instr(description, :{key}) > 0 OR instr(outputs, :{key}) > 0)"
+        ).bindparams(**{key: term}))
+    return select(literal_column("rowid")).select_from(table(TABLE)).where(and_(*conditions))
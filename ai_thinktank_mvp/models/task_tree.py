@@ -0,0 +1,172 @@
+from typing import Any, Dict, List, Optional
+import json
+
+# 任务树的物化路径：每级为4位补零的兄弟序号，用 "." 连接，如 0002.0001.0003。
+# 同一项目内按路径排序即为先序遍历；子树是路径前缀区间，可直接走 (project_id, path) 索引
+PATH_SEP = "."
+SEGMENT_WIDTH = 4
+PATH_MAX_LENGTH = 255
+
+# TaskPlanner输出的JSON结构不固定，按以下字段名依次识别子节点、名称和说明
+CHILDREN_KEYS = ("stages", "phases", "tasks", "subtasks", "children", "steps", "阶段", "任务", "子任务")
+NAME_KEYS = ("name", "title", "stage", "phase", "task", "名称", "阶段名称", "任务名称", "标题")
+DESCRIPTION_KEYS = ("description", "desc", "details", "detail", "purpose", "reason", "描述", "说明", "内容", "目的")
+
+
+def segment(position: int) -> str:
+    return str(position).zfill(SEGMENT_WIDTH)
+
+
+def child_path(parent_path: Optional[str], position: int) -> str:
+    return f"{parent_path}{PATH_SEP}{segment(position)}" if parent_path else segment(position)
+
+
+def parent_path(path: str) -> Optional[str]:
+    head, sep, _ = path.rpartition(PATH_SEP)
+    return head if sep else None
+
+
+def ancestor_paths(path: str) -> List[str]:
+    """由近到远的各级祖先路径（不含自身）"""
+    segments = path.split(PATH_SEP)
+    return [PATH_SEP.join(segments[:i]) for i in range(len(segments) - 1, 0, -1)]
+
+
+def subtree_bounds(path: str):
+    """子孙节点的路径区间 (lower, upper)，满足 lower < 子孙路径 < upper。
+    用区间比较而非 LIKE，任何数据库都能使用索引（"/" 是 "." 之后的下一个字符）"""
+    return path + PATH_SEP, path + chr(ord(PATH_SEP) + 1)
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return "\n".join(_text(item) for item in value if _text(item))
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _split_node(node: Any):
+    """把一个JSON节点拆成 (名称, 说明, 子节点列表)"""
+    if isinstance(node, dict):
+        children = next((node[key] for key in CHILDREN_KEYS if isinstance(node.get(key), (list, dict))), [])
+        node_name = next((_text(node[key]) for key in NAME_KEYS if isinstance(node.get(key), str)), None)
+        description = next((_text(node[key]) for key in DESCRIPTION_KEYS if node.get(key)), "")
+        if isinstance(children, dict):
+            children = [_named(key, value) for key, value in children.items()]
+        return node_name or "", description, children
+    return _text(node), "", []
+
+
+def _named(key: str, value: Any) -> Any:
+    """{"阶段名": [...]} / {"阶段名": "说明"} 形式的节点"""
+    if isinstance(value, dict):
+        return value if any(k in value for k in NAME_KEYS) else {"name": key, **value}
+    if isinstance(value, list):
+        return {"name": key, "children": value}
+    return {"name": key, "description": value}
+
+
+def _top_level(plan: Any) -> List[Any]:
+    if isinstance(plan, list):
+        return plan
+    if not isinstance(plan, dict) or set(plan) == {"error"}:
+        return []
+    for key in CHILDREN_KEYS:
+        if isinstance(plan.get(key), list):
+            return plan[key]
+    # 只有一个外层包装键时（如 {"task_tree": {...}}）向内展开
+    if len(plan) == 1:
+        (key, value), = plan.items()
+        if isinstance(value, (dict, list)) and key not in NAME_KEYS:
+            return _top_level(value)
+    return [_named(key, value) for key, value in plan.items() if key not in NAME_KEYS + DESCRIPTION_KEYS]
+
+
+def flatten_plan(plan: Any) -> List[Dict[str, Any]]:
+    """把TaskPlanner的JSON任务树展开为按路径先序排列的节点列表，
+    每个节点包含 path / depth / position / name / description"""
+    nodes = []
+
+    def visit(items: List[Any], parent: Optional[str], depth: int):
+        position = 0
+        for item in items:
+            name, description, children = _split_node(item)
+            if not name:
+                continue
+            position += 1
+            path = child_path(parent, position)
+            if len(path) > PATH_MAX_LENGTH:
+                return
+            nodes.append({"path": path, "depth": depth, "position": position,
+                          "name": name[:128], "description": description})
+            visit(children, path, depth + 1)
+
+    visit(_top_level(plan), None, 1)
+    return nodes
+
+
+def build_tree(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """由按路径排序的扁平节点一次遍历还原嵌套树；父节点不在结果中的节点作为根"""
+    roots, by_path = [], {}
+    for row in rows:
+        node = {**row, "children": []}
+        by_path[row["path"]] = node
+        parent = by_path.get(parent_path(row["path"]))
+        (parent["children"] if parent is not None else roots).append(node)
+    return roots
+
+
+def _tree_columns(Task):
+    return Task.id, Task.path, Task.depth, Task.name, Task.description, Task.status
+
+
+def replace_plan(session, project_id: int, root_task_id: int, plan: Any) -> int:
+    """在当前事务中用新的任务树替换项目已有的规划节点，返回写入的节点数。
+
+    逐层批量插入：同一层的节点一次flush（SQLAlchemy合并为批量INSERT），
+    取回自增ID后再写下一层的 parent_id，树深度通常只有3~4层。"""
+    from .project import Task
+
+    session.query(Task).filter(Task.project_id == project_id, Task.path.isnot(None)).delete(synchronize_session=False)
+    nodes = flatten_plan(plan)
+    ids = {None: root_task_id}
+    for depth in range(1, max((node["depth"] for node in nodes), default=0) + 1):
+        level = [node for node in nodes if node["depth"] == depth]
+        tasks = [
+            Task(project_id=project_id, parent_id=ids[parent_path(node["path"])], agent="taskplanner",
+                 name=node["name"], description=node["description"], path=node["path"],
+                 depth=node["depth"], position=node["position"], status="pending")
+            for node in level
+        ]
+        session.add_all(tasks)
+        session.flush()
+        ids.update((task.path, task.id) for task in tasks)
+    return len(nodes)
+
+
+def load_task_tree(session, project_id: int, root_path: str = None) -> List[Dict[str, Any]]:
+    """单次查询加载项目的任务树（或 root_path 对应的子树，含根节点）并还原为嵌套结构"""
+    from .project import Task
+
+    query = session.query(*_tree_columns(Task)).filter(Task.project_id == project_id)
+    if root_path:
+        lower, upper = subtree_bounds(root_path)
+        query = query.filter((Task.path == root_path) | ((Task.path > lower) & (Task.path < upper)))
+    else:
+        query = query.filter(Task.path.isnot(None))
+    rows = [dict(row._mapping) for row in query.order_by(Task.path)]
+    return build_tree(rows)
+
+
+def load_ancestors(session, project_id: int, path: str) -> List[Dict[str, Any]]:
+    """单次查询返回节点的各级祖先，从根到父节点排列"""
+    from .project import Task
+
+    paths = ancestor_paths(path)
+    if not paths:
+        return []
+    query = session.query(*_tree_columns(Task)).filter(Task.project_id == project_id, Task.path.in_(paths))
+    return [dict(row._mapping) for row in query.order_by(Task.path)]
@@ -0,0 +1,153 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import queue
+import threading
+import time
+
+# 单写入队列：auto 时仅在SQLite上启用（SQLite同一时刻只允许一个写事务）
+DB_WRITE_QUEUE = os.getenv("DB_WRITE_QUEUE", "auto").lower()
+# 每个事务最多合并的写操作数，以及收到第一个写操作后最多等待多少毫秒凑批
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))
+DB_WRITE_BATCH_DELAY_MS = float(os.getenv("DB_WRITE_BATCH_DELAY_MS", "5"))
+
+WriteOp = Callable[[Any], Any]
+
+
+class DBWriteQueue:
+    """单写入线程：把多个会话提交的写操作合并到一个事务中提交。
+
+    写操作是接收 Session 的函数，在写线程自己的会话中按提交顺序执行，返回值（如新建记录的ID）
+    通过 Future 交回调用方。所有写入经同一个线程，SQLite上不会再出现并发写事务互相等锁；
+    某个事务失败时逐个重试其中的操作，只让出错的那个操作失败。
+    """
+
+    def __init__(self, session_factory: Callable[[], Any], batch_size: int = DB_WRITE_BATCH_SIZE,
+                 batch_delay: float = DB_WRITE_BATCH_DELAY_MS / 1000):
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self._queue: "queue.Queue[Optional[Tuple[WriteOp, Future]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {"ops": 0, "transactions": 0, "failed_ops": 0, "max_batch": 0}
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    def submit(self, op: WriteOp) -> Future:
+        """提交写操作，返回Future；不需要结果时可不等待（同一调用方的写操作按提交顺序执行）"""
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("DB write queue is closed"))
+            return future
+        self._queue.put((op, future))
+        return future
+
+    def write(self, op: WriteOp) -> Any:
+        """提交写操作并等待其所在事务提交"""
+        return self.submit(op).result()
+
+    def _next_batch(self) -> Tuple[List[Tuple[WriteOp, Future]], bool]:
+        item = self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.batch_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._commit(batch)
+            if stop:
+                # 关闭前写完已在队列中的操作
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if item is not None:
+                        self._commit([item])
+
+    def _commit(self, batch: List[Tuple[WriteOp, Future]]):
+        session = self.session_factory()
+        results = []
+        try:
+            for op, _ in batch:
+                results.append(op(session))
+                # 逐个flush，使操作可以返回新建记录的自增ID
+                session.flush()
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if len(batch) > 1:
+                for item in batch:
+                    self._commit([item])
+            else:
+                with self._lock:
+                    self._stats["failed_ops"] += 1
+                batch[0][1].set_exception(e)
+            return
+        finally:
+            session.close()
+        with self._lock:
+            self._stats["ops"] += len(batch)
+            self._stats["transactions"] += 1
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        stats["avg_batch"] = round(stats["ops"] / stats["transactions"], 2) if stats["transactions"] else 0.0
+        return stats
+
+    def close(self, timeout: float = 10):
+        """停止写线程，等待已提交的写操作完成"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_write_queue: Optional[DBWriteQueue] = None
+_write_queue_lock = threading.Lock()
+
+
+def write_queue_enabled() -> bool:
+    if DB_WRITE_QUEUE in ("1", "true", "yes", "on"):
+        return True
+    if DB_WRITE_QUEUE in ("0", "false", "no", "off"):
+        return False
+    from .database import IS_SQLITE
+    return IS_SQLITE
+
+
+def get_write_queue() -> Optional[DBWriteQueue]:
+    """返回进程内共享的写入队列，未启用时返回None"""
+    global _write_queue
+    if _write_queue is None and write_queue_enabled():
+        with _write_queue_lock:
+            if _write_queue is None:
+                from .database import SessionLocal
+                # 写线程的会话提交后不过期对象，操作返回的ORM属性在提交后仍可读取
+                _write_queue = DBWriteQueue(lambda: SessionLocal(expire_on_commit=False))
+    return _write_queue
+
+
+def shutdown_write_queue():
+    if _write_queue is not None:
+        _write_queue.close()
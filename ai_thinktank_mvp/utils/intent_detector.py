@@ -0,0 +1,151 @@
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 默认的项目意图关键词及权重
+DEFAULT_KEYWORDS = {
+    # 动作词
+    "开发": 1.0, "设计": 1.0, "创建": 1.0, "构建": 1.0, "制作": 1.0, "建立": 1.0, "实现": 1.0, "搭建": 1.0,
+    # 产品形态
+    "项目": 1.0, "应用": 1.0, "系统": 1.0, "平台": 1.0, "网站": 1.0, "软件": 1.0, "程序": 1.0,
+    "游戏": 1.0, "app": 1.0, "工具": 1.0, "服务": 1.0, "产品": 1.0, "小程序": 1.0,
+    # 弱信号
+    "功能": 0.5, "需求": 0.5, "想要": 0.5, "需要": 0.5, "希望": 0.5, "计划": 0.5,
+}
+
+# 出现时降低项目意图得分的关键词
+DEFAULT_NEGATIVE_KEYWORDS = {
+    "不想": 1.0, "不需要": 1.0, "取消": 1.0, "算了": 1.0,
+    "天气": 1.0, "笑话": 1.0, "你是谁": 1.0,
+}
+
+
+class AhoCorasick:
+    """Aho-Corasick多模式匹配自动机：一次扫描即可找出文本中出现的所有关键词"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(pattern)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """逐个产出 (结束位置, 关键词)"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                yield index, pattern
+
+
+class IntentDetector:
+    """基于加权关键词的项目意图检测器。
+
+    正向关键词（去重后）权重之和减去负向关键词权重之和即为得分，
+    得分达到 threshold 且消息长度超过 min_length 时判定为项目需求。
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, float]] = None,
+                 negative_keywords: Optional[Dict[str, float]] = None,
+                 threshold: float = 1.0, min_length: int = 5):
+        self.keywords = {k.lower(): float(v) for k, v in (keywords or DEFAULT_KEYWORDS).items()}
+        self.negative_keywords = {
+            k.lower(): float(v)
+            for k, v in (DEFAULT_NEGATIVE_KEYWORDS if negative_keywords is None else negative_keywords).items()
+        }
+        self.threshold = threshold
+        self.min_length = min_length
+        self._automaton = AhoCorasick(list(self.keywords) + list(self.negative_keywords))
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> "IntentDetector":
+        """从JSON配置文件（INTENT_CONFIG_PATH）加载，字段：keywords、negative_keywords、threshold、min_length"""
+        path = path or os.getenv("INTENT_CONFIG_PATH")
+        config: Dict[str, Any] = {}
+        if path:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+        return cls(
+            keywords=config.get("keywords"),
+            negative_keywords=config.get("negative_keywords"),
+            threshold=float(config.get("threshold", os.getenv("INTENT_THRESHOLD", "1.0"))),
+            min_length=int(config.get("min_length", os.getenv("INTENT_MIN_LENGTH", "5"))),
+        )
+
+    def detect(self, message: str) -> Dict[str, Any]:
+        """返回 should_execute、得分及命中的正向/负向关键词"""
+        text = (message or "").strip()
+        matched, negatives = set(), set()
+        for _, pattern in self._automaton.iter_matches(text.lower()):
+            if pattern in self.keywords:
+                matched.add(pattern)
+            if pattern in self.negative_keywords:
+                negatives.add(pattern)
+
+        score = sum(self.keywords[k] for k in matched) - sum(self.negative_keywords[k] for k in negatives)
+        is_long_enough = len(text) > self.min_length
+        result = {
+            "should_execute": score >= self.threshold and is_long_enough,
+            "score": score,
+            "matched": sorted(matched),
+            "negatives": sorted(negatives),
+        }
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "intent detected",
+                extra={"intent": result, "message_length": len(text), "long_enough": is_long_enough}
+            )
+        return result
+
+    def detect_many(self, messages: Iterable[str]) -> List[Dict[str, Any]]:
+        """批量检测（如回放聊天日志）"""
+        return [self.detect(message) for message in messages]
+
+
+_detector: Optional[IntentDetector] = None
+_detector_lock = threading.Lock()
+
+
+def get_intent_detector() -> IntentDetector:
+    """进程内共享的意图检测器，首次使用时按配置构建"""
+    global _detector
+    if _detector is None:
+        with _detector_lock:
+            if _detector is None:
+                _detector = IntentDetector.from_config()
+    return _detector
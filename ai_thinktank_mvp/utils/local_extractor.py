@@ -0,0 +1,98 @@
+from typing import Dict, Any, List, Optional
+import re
+
+from ai_thinktank_mvp.utils.intent_detector import get_intent_detector
+
+GREETINGS = ["你好", "您好", "hello", "hi", "嗨", "在吗", "谢谢", "早上好", "晚上好"]
+
+_CLAUSE_SPLIT = re.compile(r"[，,。.；;！!？?\n]+")
+
+# “我想做个X” / “开发一个X” 之类的目标句式
+_GOAL_PATTERN = re.compile(
+    r"^(?:我们|我)?(?:想要|想|要|希望|打算|计划|准备|需要)?(?:帮我)?"
+    r"(?:做|开发|设计|创建|构建|搭建|制作|实现|建立|搞|写)"
+    r"(?:个|一个|一款|一套|一下)?(?P<object>.+)$"
+)
+
+# 背景信息句式：身份、预算、团队规模、时间线
+_CONTEXT_PATTERNS = [
+    ("identity", re.compile(r"^(?:我|我们)(?:是|都是)(?P<value>.+)$")),
+    ("budget", re.compile(r"预算(?:大概|大约|约|有|是|在)?\s*[\d.]+\s*(?:万|千|亿|k|w|元|块)*")),
+    ("team", re.compile(r"(?:团队(?:有|共)?\s*\d+\s*(?:个)?人|\d+\s*(?:个)?人(?:的)?团队|\d+\s*(?:个)?(?:开发|程序员|工程师))")),
+    ("timeline", re.compile(r"(?:\d+|[一二三四五六七八九十两半]+)\s*(?:个)?(?:月|周|星期|天|年)(?:内|之内|以内)?(?:上线|完成|交付|发布)?|半年")),
+]
+
+
+def is_project_message(message: str) -> bool:
+    """消息是否像一个项目需求（由共享的意图检测器判断）"""
+    return get_intent_detector().detect(message)["should_execute"]
+
+
+class LocalMessageExtractor:
+    """基于规则的本地消息解析器，对简单消息无需调用LLM即可提取 user_goal / user_context。
+
+    返回结果带有 confidence，调用方在置信度不足时回退到LLM解析。
+    """
+
+    def _split_clauses(self, message: str) -> List[str]:
+        return [clause.strip() for clause in _CLAUSE_SPLIT.split(message) if clause.strip()]
+
+    def _match_goal(self, clause: str) -> Optional[str]:
+        match = _GOAL_PATTERN.match(clause)
+        if not match:
+            return None
+        obj = match.group("object").strip()
+        if len(obj) < 2:
+            return None
+        return f"开发一个{obj}"
+
+    def _match_context(self, clause: str) -> Optional[str]:
+        identity = _CONTEXT_PATTERNS[0][1].match(clause)
+        if identity:
+            return f"用户是{identity.group('value').strip()}"
+        for name, pattern in _CONTEXT_PATTERNS[1:]:
+            if pattern.search(clause):
+                if name == "timeline" and not clause.startswith(("计划", "希望", "打算", "预计")):
+                    return f"希望{clause}"
+                return clause
+        return None
+
+    def extract(self, user_message: str) -> Dict[str, Any]:
+        """提取 user_goal / user_context，同时判断是否应执行完整工作流"""
+        message = user_message.strip()
+        result = {
+            "user_goal": message,
+            "user_context": "",
+            "should_execute": is_project_message(message),
+            "confidence": 0.0,
+        }
+
+        # 非项目需求（问候、闲聊）不需要LLM解析
+        if not result["should_execute"]:
+            result["confidence"] = 0.95 if any(g in message.lower() for g in GREETINGS) else 0.9
+            return result
+
+        goal = None
+        context_parts = []
+        unrecognized = 0
+        for clause in self._split_clauses(message):
+            if goal is None:
+                goal = self._match_goal(clause)
+                if goal is not None:
+                    continue
+            context = self._match_context(clause)
+            if context is not None:
+                context_parts.append(context)
+            else:
+                unrecognized += 1
+
+        if goal is None:
+            # 有项目关键词但句式不规则，交给LLM
+            result["confidence"] = 0.3
+            return result
+
+        result["user_goal"] = goal
+        result["user_context"] = "，".join(context_parts)
+        # 每多一个无法识别的子句，置信度下降
+        result["confidence"] = max(0.9 - 0.2 * unrecognized, 0.1)
+        return result
@@ -2,14 +2,40 @@ from typing import Dict, Any
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from llm_module import create_llm_function
+from llm_module import create_llm_function, create_async_llm_function
+from llm_structured import complete_json, complete_json_async
+from ai_thinktank_mvp.utils.local_extractor import LocalMessageExtractor
 import json
+import threading
+
+# 本地规则解析的置信度达到该值时不再调用LLM
+LOCAL_PARSER_MIN_CONFIDENCE = float(os.getenv("LOCAL_PARSER_MIN_CONFIDENCE", "0.8"))
+
+# 解析路径统计：local 为本地规则解析，llm 为回退到LLM解析
+_parse_stats = {"local": 0, "llm": 0}
+_parse_stats_lock = threading.Lock()
+
+def _record_parse_path(path: str):
+    with _parse_stats_lock:
+        _parse_stats[path] += 1
+
+def get_parse_stats() -> Dict[str, Any]:
+    """返回各解析路径的调用次数及避免的LLM调用比例"""
+    with _parse_stats_lock:
+        stats = dict(_parse_stats)
+    total = stats["local"] + stats["llm"]
+    stats["llm_avoided_ratio"] = stats["local"] / total if total else 0.0
+    return stats
 
 class MessageParser:
     """智能消息解析器，从用户聊天内容中提取结构化信息"""
     
-    def __init__(self):
-        self.llm = create_llm_function()
+    def __init__(self, min_confidence: float = None):
+        # 解析是确定性任务，temperature=0 使相同消息可命中响应缓存
+        self.llm = create_llm_function("parser", temperature=0)
+        self.async_llm = create_async_llm_function("parser", temperature=0)
+        self.local_extractor = LocalMessageExtractor()
+        self.min_confidence = LOCAL_PARSER_MIN_CONFIDENCE if min_confidence is None else min_confidence
     
     def _build_parsing_prompt(self, user_message: str) -> str:
         """构建解析prompt，增加few-shot示例"""
@@ -50,28 +76,62 @@ class MessageParser:
 }}
 """
     
-    def parse_message(self, user_message: str) -> Dict[str, str]:
-        """解析用户消息"""
+    def _parse_result(self, result, user_message: str) -> Dict[str, str]:
+        """将解析出的JSON转换为user_goal/user_context"""
+        if isinstance(result, dict):
+            return {
+                "user_goal": result.get("user_goal") or user_message,
+                "user_context": result.get("user_context") or ""
+            }
+        else:
+            return {
+                "user_goal": user_message,
+                "user_context": ""
+            }
+    
+    def _finish(self, parsed: Dict[str, str], local: Dict[str, Any], path: str) -> Dict[str, Any]:
+        """合并解析结果与本地意图判断，并记录解析路径"""
+        _record_parse_path(path)
+        return {
+            "user_goal": parsed["user_goal"],
+            "user_context": parsed["user_context"],
+            "should_execute": local["should_execute"],
+            "parse_path": path
+        }
+    
+    def parse_message(self, user_message: str) -> Dict[str, Any]:
+        """解析用户消息：优先本地规则解析，置信度不足时回退到LLM"""
+        local = self.local_extractor.extract(user_message)
+        if local["confidence"] >= self.min_confidence:
+            return self._finish(local, local, "local")
+        
         try:
             prompt = self._build_parsing_prompt(user_message)
-            result = self.llm(prompt)
-            # 尝试解析JSON
-            if isinstance(result, str):
-                parsed = json.loads(result)
-                return {
-                    "user_goal": parsed.get("user_goal", user_message),
-                    "user_context": parsed.get("user_context", "")
-                }
-            else:
-                return {
-                    "user_goal": user_message,
-                    "user_context": ""
-                }
+            result = complete_json(self.llm, prompt)
+            parsed = self._parse_result(result, user_message)
         except Exception as e:
-            return {
+            parsed = {
+                "user_goal": user_message,
+                "user_context": ""
+            }
+        return self._finish(parsed, local, "llm")
+    
+    async def parse_message_async(self, user_message: str) -> Dict[str, Any]:
+        """解析用户消息（异步）：优先本地规则解析，置信度不足时回退到LLM"""
+        local = self.local_extractor.extract(user_message)
+        if local["confidence"] >= self.min_confidence:
+            return self._finish(local, local, "local")
+        
+        try:
+            prompt = self._build_parsing_prompt(user_message)
+            result = await complete_json_async(self.async_llm, prompt)
+            parsed = self._parse_result(result, user_message)
+        except Exception as e:
+            parsed = {
                 "user_goal": user_message,
                 "user_context": ""
             }
+        return self._finish(parsed, local, "llm")
     
     def extract_key_info(self, user_message: str) -> Dict[str, Any]:
         """提取关键信息，增加few-shot示例"""
@@ -120,9 +180,8 @@ class MessageParser:
 }}
 """
         try:
-            result = self.llm(analysis_prompt)
-            if isinstance(result, str):
-                key_info = json.loads(result)
+            key_info = complete_json(self.llm, analysis_prompt)
+            if isinstance(key_info, dict):
                 return {
                     **parsed,
                     **key_info
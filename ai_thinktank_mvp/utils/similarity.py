@@ -0,0 +1,148 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import random
+import re
+import threading
+
+# 不影响需求语义的口语前缀，归一化时只从目标开头依次去掉：
+# 先去掉任意个请求语（可叠加，如"我想请你帮我"），再去掉至多一个动作词和一个量词。
+# 只匹配开头，目标中间的"请假""UI设计""数据构建"等词保持不变
+REQUEST_PREFIXES = ["我想要", "我想", "我要", "我们想", "我们要", "想要", "希望", "请你帮我", "请帮我", "帮我", "麻烦"]
+ACTION_PREFIXES = [
+    "开发一个", "开发一款", "开发个", "开发", "做一个", "做一款", "做个", "搞一个", "搞个",
+    "设计一个", "设计", "创建一个", "创建", "构建一个", "构建", "实现一个",
+]
+MEASURE_PREFIXES = ["一个", "一款"]
+
+_PUNCTUATION = re.compile(r"[\s,.!?;:，。！？；：、\"'“”‘’()（）\[\]【】]+")
+# 字符n-gram长度
+SHINGLE_SIZE = 2
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _strip_prefix(text: str, phrases: List[str]) -> Tuple[str, bool]:
+    """去掉开头匹配的最长短语"""
+    for phrase in sorted(phrases, key=len, reverse=True):
+        if text.startswith(phrase):
+            return text[len(phrase):], True
+    return text, False
+
+
+def normalize_goal(text: str) -> str:
+    """归一化项目目标：小写、去标点空白、去开头的口语前缀"""
+    text = _PUNCTUATION.sub("", (text or "").lower())
+    stripped = True
+    while stripped:
+        text, stripped = _strip_prefix(text, REQUEST_PREFIXES)
+    text, _ = _strip_prefix(text, ACTION_PREFIXES)
+    text, _ = _strip_prefix(text, MEASURE_PREFIXES)
+    return text
+
+
+def context_key(user_context: str) -> str:
+    """用户背景的比较键：只去掉大小写、标点和空白差异（背景中的约束不做填充词归一化）"""
+    text = _PUNCTUATION.sub("", (user_context or "").lower())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest() if text else ""
+
+
+def is_reusable_goal(text: str) -> bool:
+    """归一化后过短的目标（如只剩填充词）信息量不足，不参与近重复匹配"""
+    return len(normalize_goal(text)) > SHINGLE_SIZE
+
+
+def shingles(text: str, n: int = SHINGLE_SIZE) -> Set[str]:
+    """字符n-gram集合（中文没有空格分词，按字符切分更稳定）"""
+    text = normalize_goal(text)
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash签名：用 num_perm 个随机线性哈希近似Jaccard相似度"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 42):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, items: Iterable[str]) -> Tuple[int, ...]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big")
+            for item in items
+        ]
+        if not hashes:
+            return tuple([_MAX_HASH] * self.num_perm)
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+
+class GoalSimilarityIndex:
+    """基于MinHash + LSH分桶的项目目标近重复索引，无需网络和向量模型。
+
+    group 用于限定只在相同分组（如相同用户背景）的文档之间匹配；归一化后为空的文本不入索引也不匹配。"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._hasher = MinHasher(num_perm)
+        self._buckets: List[Dict[Tuple[int, ...], Set[int]]] = [{} for _ in range(bands)]
+        self._shingles: Dict[int, Set[str]] = {}
+        self._groups: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._shingles)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def add(self, doc_id: int, text: str, group: str = ""):
+        items = shingles(text)
+        if not items:
+            return
+        signature = self._hasher.signature(items)
+        with self._lock:
+            self._shingles[doc_id] = items
+            self._groups[doc_id] = group
+            for band, key in self._band_keys(signature):
+                self._buckets[band].setdefault(key, set()).add(doc_id)
+
+    def query(self, text: str, threshold: Optional[float] = None, group: str = "") -> Optional[Tuple[int, float]]:
+        """返回同一分组内相似度最高且不低于阈值的 (doc_id, 相似度)，没有则返回None"""
+        threshold = self.threshold if threshold is None else threshold
+        items = shingles(text)
+        if not items:
+            return None
+        signature = self._hasher.signature(items)
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates |= self._buckets[band].get(key, set())
+            # LSH只负责召回候选，最终用精确Jaccard排序
+            scored = [
+                (jaccard(items, self._shingles[doc_id]), doc_id)
+                for doc_id in candidates if self._groups[doc_id] == group
+            ]
+        if not scored:
+            return None
+        similarity, doc_id = max(scored)
+        if similarity < threshold:
+            return None
+        return doc_id, similarity
@@ -0,0 +1,293 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import csv
+import json
+import os
+import threading
+from ai_thinktank_mvp.utils.similarity import context_key, normalize_goal
+
+# 输入记录中依次尝试的消息字段
+MESSAGE_FIELDS = ("message", "goal", "text")
+# 续跑时这些状态的条目不再处理；started / failed 的条目会重新执行（已完成的阶段从检查点恢复）
+FINISHED_STATUSES = ("completed", "skipped", "duplicate")
+
+
+def read_items(path: str, fmt: str = "auto") -> List[Dict[str, str]]:
+    """读取JSONL或CSV输入，返回 [{"id", "message"}]，未提供id时使用行号"""
+    if fmt == "auto":
+        fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unknown input format: {fmt}")
+    items = []
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f) if fmt == "csv" else (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows, 1):
+            if isinstance(row, str):
+                row = {"message": row}
+            message = next((row[field] for field in MESSAGE_FIELDS if row.get(field)), "")
+            if str(message).strip():
+                items.append({"id": str(row.get("id") or index), "message": str(message).strip()})
+    return items
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """读取已有的输出文件，返回每个id的最后一条记录（用于断点续跑）"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 进程被中断时最后一行可能不完整
+                continue
+            records[str(record.get("id"))] = record
+    return records
+
+
+def repair_tail(path: str):
+    """处理上次中断时未写完的最后一行：完整的JSON记录补上换行，否则截掉（可能断在多字节字符中间）。
+    以二进制方式读写，不对残缺的UTF-8解码"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        # 向前查找最后一个换行符
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            index = f.read(end - start).rfind(b"\n")
+            if index >= 0:
+                start += index + 1
+                break
+            end = start
+        else:
+            start = 0
+        f.seek(start)
+        try:
+            json.loads(f.read().decode("utf-8"))
+        except ValueError:
+            f.truncate(start)
+        else:
+            f.seek(0, os.SEEK_END)
+            f.write(b"\n")
+
+
+class ResultWriter:
+    """线程安全的JSONL结果写入器，每条记录写入后立即flush，中断后已写入的结果不会丢失"""
+
+    def __init__(self, path: str, restart: bool = False):
+        self._lock = threading.Lock()
+        if not restart:
+            repair_tail(path)
+        self._file = open(path, "w" if restart else "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def goal_key(goal: str, context: str = "") -> str:
+    """去重键：归一化后的目标（归一化后为空时使用原文）及用户背景，背景不同的相同目标分别执行"""
+    return f"{normalize_goal(goal) or goal}\n{context_key(context)}"
+
+
+def parse_message(message: str) -> Dict[str, Any]:
+    from ai_thinktank_mvp.utils.message_parser import MessageParser
+    return MessageParser().parse_message(message)
+
+
+def create_projects(goals: List[Tuple[str, str]]) -> List[int]:
+    """批量创建项目（一次事务）"""
+    from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+    from ai_thinktank_mvp.models.database import SessionLocal
+    from ai_thinktank_mvp.workflows.crewai_workflow import AIThinkTankWorkflow
+
+    db = SessionLocal()
+    try:
+        return AIThinkTankWorkflow(AgentFactory.shared(), db).create_projects(goals)
+    finally:
+        db.close()
+
+
+def run_workflow(user_goal: str, user_context: str, project_id: int, reuse_similar: bool = True,
+                 engine: str = None) -> Dict[str, Any]:
+    """在独立的数据库会话中执行一个已创建项目的完整工作流"""
+    from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+    from ai_thinktank_mvp.models.database import SessionLocal
+    from ai_thinktank_mvp.workflows.crewai_workflow import AIThinkTankWorkflow
+
+    db = SessionLocal()
+    try:
+        workflow = AIThinkTankWorkflow(AgentFactory.shared(), db)
+        return workflow.execute_full_workflow(
+            user_goal, user_context, project_id=project_id, reuse_similar=reuse_similar, engine=engine
+        )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class BatchRunner:
+    """批量执行工作流：消息解析 → 去重 → 批量创建项目 → 线程池执行，结果逐条写入JSONL。
+
+    输出文件同时是续跑状态：每个条目创建项目后先写一条 started 记录（含解析结果和项目ID），
+    完成后再写 completed / failed 记录。再次运行时跳过已完成的条目，未完成的条目沿用原项目，
+    已完成的阶段从检查点恢复。解析、建项目、执行三个步骤可替换，便于测试。
+    """
+
+    def __init__(self, output_path: str, workers: int = 4, engine: str = None, reuse_similar: bool = True,
+                 db_batch_size: int = 200, restart: bool = False,
+                 parse: Callable[[str], Dict[str, Any]] = None,
+                 create: Callable[[List[Tuple[str, str]]], List[int]] = None,
+                 execute: Callable[..., Dict[str, Any]] = None,
+                 on_record: Callable[[Dict[str, Any]], None] = None):
+        self.output_path = output_path
+        self.workers = max(1, workers)
+        self.engine = engine
+        self.reuse_similar = reuse_similar
+        self.db_batch_size = max(1, db_batch_size)
+        self.restart = restart
+        self.parse = parse or parse_message
+        self.create = create or create_projects
+        self.execute = execute or run_workflow
+        self.on_record = on_record
+        self._writer: Optional[ResultWriter] = None
+        self._summary: Dict[str, int] = {}
+
+    def _emit(self, record: Dict[str, Any]):
+        self._writer.write(record)
+        self._summary[record["status"]] = self._summary.get(record["status"], 0) + 1
+        if self.on_record is not None:
+            self.on_record(record)
+
+    def run(self, items: List[Dict[str, str]]) -> Dict[str, int]:
+        """处理全部条目，返回各状态的条目数"""
+        previous = {} if self.restart else load_results(self.output_path)
+        self._writer = ResultWriter(self.output_path, restart=self.restart)
+        self._summary = {"resumed_done": 0}
+        try:
+            pending = []
+            for item in items:
+                if previous.get(item["id"], {}).get("status") in FINISHED_STATUSES:
+                    self._summary["resumed_done"] += 1
+                else:
+                    pending.append(item)
+
+            # 已完成条目的目标也参与去重（上次中断时可能尚未写出重复条目的记录）
+            canonical: Dict[str, Dict[str, Any]] = {}
+            for record in previous.values():
+                if record.get("status") == "completed" and record.get("goal"):
+                    canonical.setdefault(goal_key(record["goal"], record.get("context", "")), record)
+
+            parsed = self._parse_all(pending, previous)
+            jobs, duplicates = self._deduplicate(parsed, canonical)
+            self._create_missing_projects(jobs)
+            results = self._execute_all(jobs)
+            self._emit_duplicates(duplicates, {**canonical, **results})
+        finally:
+            self._writer.close()
+        return dict(self._summary)
+
+    def _parse_all(self, items: List[Dict[str, str]], previous: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """解析消息（相同消息只解析一次）；上次已解析的条目直接沿用 started 记录中的结果"""
+        parsed, to_parse = [], {}
+        for item in items:
+            record = previous.get(item["id"], {})
+            if record.get("goal"):
+                parsed.append({**item, "goal": record["goal"], "context": record.get("context", ""),
+                               "project_id": record.get("project_id")})
+            else:
+                to_parse.setdefault(" ".join(item["message"].split()), []).append(item)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-parse") as executor:
+            futures = {executor.submit(self.parse, group[0]["message"]): group for group in to_parse.values()}
+            for future in as_completed(futures):
+                group = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    for item in group:
+                        self._emit({"id": item["id"], "status": "failed", "stage": "parse", "error": str(e)})
+                    continue
+                for item in group:
+                    if not result.get("should_execute"):
+                        self._emit({"id": item["id"], "status": "skipped", "reason": "not a project request"})
+                    else:
+                        parsed.append({**item, "goal": result["user_goal"], "context": result.get("user_context", ""),
+                                       "project_id": None})
+        return parsed
+
+    def _deduplicate(self, parsed: List[Dict[str, Any]], canonical: Dict[str, Dict[str, Any]]):
+        """相同目标只执行一次：返回 (待执行条目, [(重复条目, 去重键)])"""
+        jobs, duplicates, seen = [], [], set(canonical)
+        # 已有项目的条目优先作为代表，续跑时沿用其检查点
+        for item in sorted(parsed, key=lambda i: i.get("project_id") is None):
+            key = goal_key(item["goal"], item["context"])
+            if key in seen:
+                duplicates.append((item, key))
+            else:
+                seen.add(key)
+                item["key"] = key
+                jobs.append(item)
+        return jobs, duplicates
+
+    def _create_missing_projects(self, jobs: List[Dict[str, Any]]):
+        """为尚无项目的条目分批创建项目，每批一个事务，并写出 started 记录"""
+        missing = [job for job in jobs if not job.get("project_id")]
+        for start in range(0, len(missing), self.db_batch_size):
+            chunk = missing[start:start + self.db_batch_size]
+            project_ids = self.create([(job["goal"], job["context"]) for job in chunk])
+            for job, project_id in zip(chunk, project_ids):
+                job["project_id"] = project_id
+                self._writer.write({"id": job["id"], "status": "started", "project_id": project_id,
+                                    "goal": job["goal"], "context": job["context"]})
+
+    def _execute_all(self, jobs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """并发执行工作流，每完成一个立即写出结果；返回 去重键 -> 结果记录"""
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-workflow") as executor:
+            futures = {
+                executor.submit(self.execute, job["goal"], job["context"], job["project_id"],
+                                reuse_similar=self.reuse_similar, engine=self.engine): job
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                job = futures[future]
+                record = {"id": job["id"], "project_id": job["project_id"], "goal": job["goal"], "context": job["context"]}
+                try:
+                    result = future.result()
+                    record.update(status="completed", workflow_result=result.get("workflow_result"),
+                                  reused_from=result.get("reused_from"))
+                except Exception as e:
+                    record.update(status="failed", stage="workflow", error=str(e))
+                results[job["key"]] = record
+                self._emit(record)
+        return results
+
+    def _emit_duplicates(self, duplicates: List[Tuple[Dict[str, Any], str]], results: Dict[str, Dict[str, Any]]):
+        """写出重复条目的记录；results 包含本次执行及之前运行中已完成的代表条目"""
+        for item, key in duplicates:
+            source = results[key]
+            record = {"id": item["id"], "duplicate_of": source["id"], "goal": item["goal"], "context": item["context"]}
+            if source["status"] == "completed":
+                record.update(status="duplicate", project_id=source.get("project_id"),
+                              workflow_result=source.get("workflow_result"))
+            else:
+                # 代表条目失败时重复条目也记为失败，下次续跑会重新处理
+                record.update(status="failed", stage="workflow", error=source.get("error"))
+            self._emit(record)
@@ -1,9 +1,44 @@
 from crewai import Agent, Task, Crew, Process
-from typing import Dict, List, Any
-from agents.agent_factory import AgentFactory
-from models.project import Project, Task as ProjectTask, AgentOutput
+from typing import Dict, List, Any, Optional, Tuple
+from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+from ai_thinktank_mvp.models.project import Project, Task as ProjectTask, AgentOutput
+from ai_thinktank_mvp.models.write_queue import get_write_queue
+from ai_thinktank_mvp.models import search, task_tree
+from ai_thinktank_mvp.workflows.dag import DAGScheduler, WorkflowStage
+from ai_thinktank_mvp.workflows.stage_inputs import StageInputBuilder
+from ai_thinktank_mvp.utils.similarity import GoalSimilarityIndex, context_key, is_reusable_goal
+from ai_thinktank_mvp.utils.intent_detector import get_intent_detector
 from sqlalchemy.orm import Session
+import asyncio
 import json
+import os
+import sys
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from llm_tokens import get_token_ledger, record_usage, track_project
+from llm_structured import extract_json
+
+# 工作流阶段 -> (执行的Agent, 阶段说明)
+WORKFLOW_STAGES = {
+    "requirements": ("chiefmind", "需求分析"),
+    "task_plan": ("taskplanner", "任务规划"),
+    "market_research": ("researcher", "市场调研"),
+    "prd": ("prdwriter", "PRD撰写"),
+    "tool_selection": ("toolfinder", "工具选型"),
+    "evaluation": ("chiefmind", "结果评估"),
+}
+
+# 同步工作流执行引擎：crewai（Crew.kickoff）或 direct（直接调用各Agent的方法，无ReAct开销）
+WORKFLOW_ENGINES = ("crewai", "direct")
+WORKFLOW_ENGINE = os.getenv("WORKFLOW_ENGINE", "crewai").lower()
+
+# 近重复需求复用：目标相似度超过阈值且用户背景相同时直接复用历史项目的工作流结果（默认关闭）
+SIMILARITY_REUSE_ENABLED = os.getenv("SIMILARITY_REUSE_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.85"))
+
+# 进程内共享的历史项目目标索引，首次使用时从数据库加载
+_goal_index = None
+_goal_index_lock = threading.Lock()
 
 class AIThinkTankWorkflow:
     """AI参谋团工作流管理器"""
@@ -11,10 +46,12 @@ class AIThinkTankWorkflow:
     def __init__(self, agent_factory: AgentFactory, db_session: Session):
         self.agent_factory = agent_factory
         self.db_session = db_session
+        # 各阶段只接收所需字段，上游长文本按预算压缩
+        self.stage_inputs = StageInputBuilder.from_env()
         
     # 创建需求分析任务
-    def create_requirement_analysis_task(self, user_goal: str, user_context: str = "") -> Task:
-        chiefmind = self.agent_factory.get_agent("chiefmind")
+    def create_requirement_analysis_task(self, user_goal: str, user_context: str = "", agent: Agent = None) -> Task:
+        chiefmind = agent or self.agent_factory.get_agent("chiefmind")
         
         return Task(
             description=f"""
@@ -35,9 +72,9 @@ class AIThinkTankWorkflow:
         )
     
     # 创建任务计划任务
-    def create_task_planning_task(self, requirements: str) -> Task:
+    def create_task_planning_task(self, requirements: str, agent: Agent = None) -> Task:
         
-        taskplanner = self.agent_factory.get_agent("taskplanner")
+        taskplanner = agent or self.agent_factory.get_agent("taskplanner")
         
         return Task(
             description=f"""
@@ -52,9 +89,9 @@ class AIThinkTankWorkflow:
         )
     
     # 创建市场分析任务
-    def create_market_research_task(self, project_scope: str, target_market: str = "") -> Task:
+    def create_market_research_task(self, project_scope: str, target_market: str = "", agent: Agent = None) -> Task:
         """创建市场调研任务"""
-        researcher = self.agent_factory.get_agent("researcher")
+        researcher = agent or self.agent_factory.get_agent("researcher")
         
         return Task(
             description=f"""
@@ -70,9 +107,9 @@ class AIThinkTankWorkflow:
         )
     
     # 创建撰写PRD任务
-    def create_prd_writing_task(self, requirements: str, market_report: str) -> Task:
+    def create_prd_writing_task(self, requirements: str, market_report: str, agent: Agent = None) -> Task:
         """创建PRD撰写任务"""
-        prdwriter = self.agent_factory.get_agent("prdwriter")
+        prdwriter = agent or self.agent_factory.get_agent("prdwriter")
         
         return Task(
             description=f"""
@@ -88,9 +125,9 @@ class AIThinkTankWorkflow:
         )
     
     # 创建工具选择任务
-    def create_tool_selection_task(self, project_scope: str, feature_specs: str) -> Task:
+    def create_tool_selection_task(self, project_scope: str, feature_specs: str, agent: Agent = None) -> Task:
         """创建工具选型任务"""
-        toolfinder = self.agent_factory.get_agent("toolfinder")
+        toolfinder = agent or self.agent_factory.get_agent("toolfinder")
         
         return Task(
             description=f"""
@@ -106,16 +143,19 @@ class AIThinkTankWorkflow:
         )
     
     # 创建结果评估任务
-    def create_result_evaluation_task(self, all_outputs: Dict[str, str], project_goals: str) -> Task:
+    def create_result_evaluation_task(self, all_outputs: Dict[str, str], project_goals: str, agent: Agent = None) -> Task:
         """创建结果评估任务"""
-        chiefmind = self.agent_factory.get_agent("chiefmind")
+        chiefmind = agent or self.agent_factory.get_agent("chiefmind")
+        # 按阶段分节列出产出，不使用带缩进的JSON以免prompt膨胀
+        stage_outputs = "\n\n".join(f"### {name}\n{output}" for name, output in all_outputs.items())
         
         return Task(
             description=f"""
             请使用你的专业能力，评估以下项目的完成情况：
             
             项目目标：{project_goals}
-            各任务产出：{json.dumps(all_outputs, ensure_ascii=False, indent=2)}
+            各任务产出：
+            {stage_outputs}
             
             输出格式：Markdown格式的评估报告
             """,
@@ -126,30 +166,12 @@ class AIThinkTankWorkflow:
     # 智能判断是否应该执行完整工作流
     def should_execute_workflow(self, user_message: str) -> bool:
         """判断用户消息是否包含项目需求"""
-        # 扩展的关键词检测
-        project_keywords = [
-            "开发", "设计", "创建", "构建", "制作", "建立", "实现",
-            "项目", "应用", "系统", "平台", "网站", "软件", "程序",
-            "功能", "需求", "想要", "需要", "希望", "计划",
-            "游戏", "app", "应用", "工具", "服务", "产品"
-        ]
-        
-        # 检查是否包含项目相关关键词
-        has_project_keywords = any(keyword in user_message for keyword in project_keywords)
-        
-        # 检查消息长度（降低要求，只要超过5个字符即可）
-        is_long_enough = len(user_message.strip()) > 5
-        
-        # 调试信息
-        print(f"DEBUG: 消息='{user_message}', 长度={len(user_message.strip())}, 包含关键词={has_project_keywords}, 足够长={is_long_enough}")
-        
-        return has_project_keywords and is_long_enough
+        # 意图检测器内部会以结构化日志记录得分和命中的关键词
+        return get_intent_detector().detect(user_message)["should_execute"]
     
     # 执行简单对话
     def execute_simple_chat(self, user_message: str) -> Dict[str, Any]:
-        """执行简单对话，不启动完整工作流"""
-        chiefmind = self.agent_factory.get_agent("chiefmind")
-        
+        """执行简单对话，不启动完整工作流（固定回复，无需构建Agent）"""
         # 构建简单的回复
         if "你好" in user_message or "hello" in user_message.lower():
             response = """你好！我是AI参谋团的首席指挥官。我可以帮助您：
@@ -184,53 +206,313 @@ class AIThinkTankWorkflow:
             }
         }
     
+    # 单独执行一个阶段的crewai任务
+    def _run_crew_task(self, task: Task, agent_type: str = None) -> str:
+        """以单任务Crew执行一个阶段，返回原始文本输出"""
+        crew = Crew(
+            agents=[task.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=True
+        )
+        result = crew.kickoff()
+        
+        # crewai经由自身的LLM客户端调用，用量从CrewOutput中记录
+        usage = getattr(result, "token_usage", None)
+        if usage is not None:
+            record_usage(agent_type, usage.prompt_tokens or 0, usage.completion_tokens or 0)
+        
+        # 将CrewOutput转换为字符串
+        if hasattr(result, 'raw'):
+            return result.raw
+        return str(result)
+    
+    # 借出独占的Agent实例执行一个crewai阶段
+    def _run_crew_stage(self, agent_type: str, build_task) -> str:
+        """build_task 接收借出的Agent并返回Task；Crew执行期间该Agent不会被其他请求使用"""
+        with self.agent_factory.acquire(agent_type) as agent:
+            return self._run_crew_task(build_task(agent), agent_type)
+    
+    # 构建阶段依赖图
+    def build_workflow_stages(self, user_goal: str, user_context: str = "") -> List[WorkflowStage]:
+        """构建工作流DAG：每个阶段只依赖它真正需要的上游产出"""
+        return [
+            # 1. 需求分析
+            WorkflowStage(
+                "requirements",
+                lambda inputs: self._run_crew_stage(
+                    "chiefmind",
+                    lambda agent: self.create_requirement_analysis_task(user_goal, user_context, agent=agent)
+                )
+            ),
+            # 2. 任务规划 - 只依赖需求分析
+            WorkflowStage(
+                "task_plan",
+                lambda inputs: self._run_crew_stage(
+                    "taskplanner",
+                    lambda agent: self.create_task_planning_task(self.stage_inputs.task_plan(inputs), agent=agent)
+                ),
+                depends_on=["requirements"]
+            ),
+            # 3. 市场调研 - 只依赖需求分析，与任务规划并行
+            WorkflowStage(
+                "market_research",
+                lambda inputs: self._run_crew_stage(
+                    "researcher",
+                    lambda agent: self.create_market_research_task(
+                        self.stage_inputs.market_research(inputs), user_context, agent=agent
+                    )
+                ),
+                depends_on=["requirements"]
+            ),
+            # 4. PRD撰写 - 依赖需求分析和市场调研
+            WorkflowStage(
+                "prd",
+                lambda inputs: self._run_crew_stage(
+                    "prdwriter",
+                    lambda agent: self.create_prd_writing_task(*self.stage_inputs.prd(inputs), agent=agent)
+                ),
+                depends_on=["requirements", "market_research"]
+            ),
+            # 5. 工具选型 - 依赖需求分析和任务规划，与PRD撰写并行
+            WorkflowStage(
+                "tool_selection",
+                lambda inputs: self._run_crew_stage(
+                    "toolfinder",
+                    lambda agent: self.create_tool_selection_task(*self.stage_inputs.tool_selection(inputs), agent=agent)
+                ),
+                depends_on=["requirements", "task_plan"]
+            ),
+            # 6. 结果评估 - 汇合所有阶段
+            WorkflowStage(
+                "evaluation",
+                lambda inputs: self._run_crew_stage(
+                    "chiefmind",
+                    lambda agent: self.create_result_evaluation_task(
+                        self.stage_inputs.evaluation(inputs), user_goal, agent=agent
+                    )
+                ),
+                depends_on=["requirements", "task_plan", "market_research", "prd", "tool_selection"]
+            ),
+        ]
+    
+    # 构建直接调用Agent方法的阶段依赖图（不经过crewai）
+    def build_direct_workflow_stages(self, user_goal: str, user_context: str = "") -> List[WorkflowStage]:
+        """构建direct引擎的工作流DAG：阶段及依赖关系与 build_workflow_stages 相同，
+        每个阶段只调用一次对应Agent的prompt构建方法和LLM"""
+        chiefmind = self.agent_factory.get_agent("chiefmind")
+        taskplanner = self.agent_factory.get_agent("taskplanner")
+        researcher = self.agent_factory.get_agent("researcher")
+        prdwriter = self.agent_factory.get_agent("prdwriter")
+        toolfinder = self.agent_factory.get_agent("toolfinder")
+        stage_inputs = self.stage_inputs
+        
+        return [
+            WorkflowStage(
+                "requirements",
+                lambda inputs: chiefmind.analyze_requirements(user_goal, user_context)
+            ),
+            WorkflowStage(
+                "task_plan",
+                lambda inputs: taskplanner.plan_tasks(stage_inputs.task_plan(inputs)),
+                depends_on=["requirements"]
+            ),
+            WorkflowStage(
+                "market_research",
+                lambda inputs: researcher.conduct_market_research(stage_inputs.market_research(inputs), user_context),
+                depends_on=["requirements"]
+            ),
+            WorkflowStage(
+                "prd",
+                lambda inputs: prdwriter.write_prd(*stage_inputs.prd(inputs)),
+                depends_on=["requirements", "market_research"]
+            ),
+            WorkflowStage(
+                "tool_selection",
+                lambda inputs: toolfinder.select_tools(*stage_inputs.tool_selection(inputs)),
+                depends_on=["requirements", "task_plan"]
+            ),
+            WorkflowStage(
+                "evaluation",
+                lambda inputs: chiefmind.evaluate_project(user_goal, stage_inputs.evaluation(inputs)),
+                depends_on=["requirements", "task_plan", "market_research", "prd", "tool_selection"]
+            ),
+        ]
+    
     # 执行完整的工作流
-    def execute_full_workflow(self, user_goal: str, user_context: str = "") -> Dict[str, Any]:
-        """执行完整的工作流"""
+    def execute_full_workflow(self, user_goal: str, user_context: str = "", project_id: int = None,
+                              reuse_similar: bool = True, engine: str = None) -> Dict[str, Any]:
+        """执行完整的工作流，相互独立的阶段并发执行；各阶段状态实时写入数据库。
+        engine 为 crewai 或 direct，默认取 WORKFLOW_ENGINE 配置，两者返回结构相同"""
+        engine = (engine or WORKFLOW_ENGINE).lower()
+        if engine not in WORKFLOW_ENGINES:
+            raise ValueError(f"Unknown workflow engine: {engine}")
         
-        # 1. 需求分析
-        req_task = self.create_requirement_analysis_task(user_goal, user_context)
+        if reuse_similar:
+            similar = self.find_similar_result(user_goal, user_context)
+            if similar is not None:
+                return self.reuse_result(user_goal, similar, project_id, user_context)
         
-        # 2. 任务规划 - 使用占位符，实际执行时会被替换
-        planning_task = self.create_task_planning_task("待执行")
+        if project_id is None:
+            project_id = self.create_project(user_goal, user_context)
+        on_start, on_finish = self._progress_hooks(project_id)
+        if engine == "direct":
+            stages = self.build_direct_workflow_stages(user_goal, user_context)
+        else:
+            stages = self.build_workflow_stages(user_goal, user_context)
+        scheduler = DAGScheduler(
+            stages,
+            on_stage_start=on_start,
+            on_stage_finish=on_finish
+        )
         
-        # 3. 市场调研 - 使用占位符
-        research_task = self.create_market_research_task("待执行", "待执行")
+        self._set_project_status(project_id, "running")
+        try:
+            # 已有检查点的阶段直接使用保存的产出，不再重新执行
+            with track_project(project_id):
+                outputs = scheduler.run(initial=self.load_checkpoints(project_id))
+        except Exception:
+            # 失败状态与token用量在同一个事务中写入
+            self._set_project_status(project_id, "failed", before=self._token_usage_update(project_id))
+            raise
+        except BaseException:
+            # 被取消时仍记录已消耗的token
+            self._save_token_usage(project_id)
+            raise
         
-        # 4. PRD撰写 - 使用占位符
-        prd_task = self.create_prd_writing_task("待执行", "待执行")
+        # 最终结果为评估阶段的产出
+        result_str = self._format_output(outputs["evaluation"])
         
-        # 5. 工具选型 - 使用占位符
-        tool_task = self.create_tool_selection_task("待执行", "待执行")
+        # 结果、完成状态与token用量在同一个事务中写入
+        self._save_to_database(project_id, result_str, before=self._token_usage_update(project_id))
         
-        # 6. 结果评估 - 使用占位符
-        evaluation_task = self.create_result_evaluation_task({
-            "requirements": "待执行",
-            "task_plan": "待执行", 
-            "market_research": "待执行",
-            "prd": "待执行",
-            "tool_selection": "待执行"
-        }, user_goal)
+        return {
+            "project_id": project_id,
+            "workflow_result": result_str,
+            "individual_outputs": {
+                "chiefmind": "需求分析完成",
+                "taskplanner": "任务规划完成", 
+                "researcher": "市场调研完成",
+                "prdwriter": "PRD撰写完成",
+                "toolfinder": "工具选型完成"
+            }
+        }
+    
+    # 将阶段产出统一转换为文本，供下游prompt使用
+    def _format_output(self, output: Any) -> str:
+        if isinstance(output, (dict, list)):
+            return json.dumps(output, ensure_ascii=False, indent=2)
+        return str(output)
+    
+    # 构建异步阶段依赖图：直接 await 各Agent的异步方法
+    def build_async_workflow_stages(self, user_goal: str, user_context: str = "", on_event=None) -> List[WorkflowStage]:
+        """构建异步工作流DAG，阶段依赖关系与 build_workflow_stages 相同。
+        传入 on_event 时各阶段以流式方式调用LLM，并将增量文本作为 token 事件转发"""
+        chiefmind = self.agent_factory.get_agent("chiefmind")
+        taskplanner = self.agent_factory.get_agent("taskplanner")
+        researcher = self.agent_factory.get_agent("researcher")
+        prdwriter = self.agent_factory.get_agent("prdwriter")
+        toolfinder = self.agent_factory.get_agent("toolfinder")
+        stage_inputs = self.stage_inputs
         
-        # 创建Crew并执行
-        crew = Crew(
-            agents=[req_task.agent, planning_task.agent, research_task.agent, 
-                   prd_task.agent, tool_task.agent, evaluation_task.agent],
-            tasks=[req_task, planning_task, research_task, prd_task, tool_task, evaluation_task],
-            process=Process.sequential,
-            verbose=True
+        def tokens(stage: str):
+            if on_event is None:
+                return None
+            agent = WORKFLOW_STAGES[stage][0]
+            return lambda token: on_event({"type": "token", "stage": stage, "agent": agent, "content": token})
+        
+        async def requirements(inputs):
+            return await chiefmind.analyze_requirements_async(
+                user_goal, user_context, on_token=tokens("requirements")
+            )
+        
+        async def task_plan(inputs):
+            return await taskplanner.plan_tasks_async(
+                stage_inputs.task_plan(inputs), on_token=tokens("task_plan")
+            )
+        
+        async def market_research(inputs):
+            return await researcher.conduct_market_research_async(
+                stage_inputs.market_research(inputs), user_context, on_token=tokens("market_research")
+            )
+        
+        async def prd(inputs):
+            return await prdwriter.write_prd_async(*stage_inputs.prd(inputs), on_token=tokens("prd"))
+        
+        async def tool_selection(inputs):
+            return await toolfinder.select_tools_async(
+                *stage_inputs.tool_selection(inputs), on_token=tokens("tool_selection")
+            )
+        
+        async def evaluation(inputs):
+            return await chiefmind.evaluate_project_async(
+                user_goal, stage_inputs.evaluation(inputs), on_token=tokens("evaluation")
+            )
+        
+        return [
+            WorkflowStage("requirements", requirements),
+            WorkflowStage("task_plan", task_plan, depends_on=["requirements"]),
+            WorkflowStage("market_research", market_research, depends_on=["requirements"]),
+            WorkflowStage("prd", prd, depends_on=["requirements", "market_research"]),
+            WorkflowStage("tool_selection", tool_selection, depends_on=["requirements", "task_plan"]),
+            WorkflowStage(
+                "evaluation", evaluation,
+                depends_on=["requirements", "task_plan", "market_research", "prd", "tool_selection"]
+            ),
+        ]
+    
+    # 异步执行完整的工作流
+    async def execute_full_workflow_async(self, user_goal: str, user_context: str = "", project_id: int = None,
+                                          on_event=None, reuse_similar: bool = True) -> Dict[str, Any]:
+        """异步执行完整的工作流，不阻塞事件循环（数据库读写均在线程中执行）；
+        on_event 接收阶段开始/结束及token事件"""
+        if reuse_similar:
+            similar = await asyncio.to_thread(self.find_similar_result, user_goal, user_context)
+            if similar is not None:
+                result = await asyncio.to_thread(self.reuse_result, user_goal, similar, project_id, user_context)
+                if on_event is not None:
+                    on_event({"type": "project", "project_id": result["project_id"]})
+                    on_event({
+                        "type": "result",
+                        "content": result["workflow_result"],
+                        "reused_from": result["reused_from"],
+                        "similarity": result["similarity"]
+                    })
+                return result
+        
+        if project_id is None:
+            project_id = await asyncio.to_thread(self.create_project, user_goal, user_context)
+        if on_event is not None:
+            on_event({"type": "project", "project_id": project_id})
+        on_start, on_finish = await asyncio.to_thread(self._progress_hooks, project_id, on_event, True)
+        scheduler = DAGScheduler(
+            self.build_async_workflow_stages(user_goal, user_context, on_event),
+            on_stage_start=on_start,
+            on_stage_finish=on_finish
         )
         
-        result = crew.kickoff()
+        await asyncio.to_thread(self._set_project_status, project_id, "running")
+        try:
+            with track_project(project_id):
+                checkpoints = await asyncio.to_thread(self.load_checkpoints, project_id)
+                outputs = await scheduler.run_async(initial=checkpoints)
+        except Exception:
+            # 失败状态与token用量在同一个事务中写入
+            await asyncio.to_thread(
+                self._set_project_status, project_id, "failed", self._token_usage_update(project_id)
+            )
+            raise
+        except BaseException:
+            # 被取消时仍记录已消耗的token
+            await asyncio.to_thread(self._save_token_usage, project_id)
+            raise
         
-        # 将CrewOutput转换为字符串
-        if hasattr(result, 'raw'):
-            result_str = result.raw
-        else:
-            result_str = str(result)
+        result_str = self._format_output(outputs["evaluation"])
         
-        # 保存到数据库
-        project_id = self._save_to_database(user_goal, result_str)
+        # 结果、完成状态与token用量在同一个事务中写入
+        await asyncio.to_thread(
+            self._save_to_database, project_id, result_str, self._token_usage_update(project_id)
+        )
         
         return {
             "project_id": project_id,
@@ -244,24 +526,309 @@ class AIThinkTankWorkflow:
             }
         }
     
-    # 保存到数据库
-    def _save_to_database(self, user_goal: str, workflow_result: str):
-        """保存工作流结果到数据库"""
-        # 创建项目记录
+    # 断点续跑
+    def resume_workflow(self, project_id: int, engine: str = None) -> Dict[str, Any]:
+        """继续执行未完成的项目：已完成阶段直接使用检查点，只重新执行缺失或失败的阶段"""
+        project = self._resumable_project(project_id)
+        return self.execute_full_workflow(
+            project.description or "", project.user_context or "", project_id=project_id,
+            reuse_similar=False, engine=engine
+        )
+    
+    # 断点续跑（异步）
+    async def resume_workflow_async(self, project_id: int, on_event=None) -> Dict[str, Any]:
+        """异步继续执行未完成的项目，语义与 resume_workflow 相同"""
+        project = await asyncio.to_thread(self._resumable_project, project_id)
+        return await self.execute_full_workflow_async(
+            project.description or "", project.user_context or "", project_id=project_id,
+            on_event=on_event, reuse_similar=False
+        )
+    
+    def _resumable_project(self, project_id: int) -> Project:
+        project = self.db_session.get(Project, project_id)
+        if project is None:
+            raise ValueError(f"Project {project_id} not found")
+        if project.status == "completed":
+            raise ValueError(f"Project {project_id} is already completed")
+        return project
+    
+    # 读取各阶段检查点
+    def load_checkpoints(self, project_id: int) -> Dict[str, Any]:
+        """返回已完成阶段的 阶段名 -> 产出，JSON类型的产出会还原为dict/list"""
+        return {
+            name: self._load_output(task.output)
+            for name, task in self._stage_tasks(project_id).items()
+            if task.status in ("completed", "reused") and task.output is not None
+        }
+    
+    # 将阶段产出保存为AgentOutput并关联到阶段任务
+    def _attach_output(self, task: ProjectTask, output: Any, output_type: str = None):
+        if output_type is None:
+            output_type = "json" if isinstance(output, (dict, list)) else "text"
+        task.output = AgentOutput(type=output_type, content=self._format_output(output))
+    
+    def _load_output(self, output: AgentOutput) -> Any:
+        if output.type == "json":
+            try:
+                return json.loads(output.content)
+            except (TypeError, ValueError):
+                pass
+        return output.content
+    
+    # 历史项目目标索引
+    def _goal_index(self) -> GoalSimilarityIndex:
+        global _goal_index
+        with _goal_index_lock:
+            if _goal_index is None:
+                index = GoalSimilarityIndex(threshold=SIMILARITY_THRESHOLD)
+                completed = self.db_session.query(Project.id, Project.description, Project.user_context).filter(
+                    Project.status == "completed"
+                )
+                for project_id, description, user_context in completed:
+                    index.add(project_id, description or "", group=context_key(user_context))
+                _goal_index = index
+        return _goal_index
+    
+    # 查找近重复的历史项目结果
+    def find_similar_result(self, user_goal: str, user_context: str = "") -> Optional[Dict[str, Any]]:
+        """返回用户背景相同、目标相似度超过阈值的历史项目结果，没有则返回None"""
+        if not SIMILARITY_REUSE_ENABLED or not is_reusable_goal(user_goal):
+            return None
+        match = self._goal_index().query(user_goal, group=context_key(user_context))
+        if match is None:
+            return None
+        
+        similar_id, similarity = match
+        stage_tasks = self._stage_tasks(similar_id)
+        evaluation_task = stage_tasks.get("evaluation")
+        if evaluation_task is None or evaluation_task.output is None:
+            return None
+        return {
+            "project_id": similar_id,
+            "similarity": similarity,
+            "workflow_result": evaluation_task.output.content,
+            # 复制时只引用内容哈希，不解压也不重复存储
+            "stage_outputs": {
+                name: (task.output.type, task.output.content_hash, task.output.legacy_content)
+                for name, task in stage_tasks.items() if task.output is not None
+            }
+        }
+    
+    # 复用历史项目结果
+    def reuse_result(self, user_goal: str, similar: Dict[str, Any], project_id: int = None,
+                     user_context: str = "") -> Dict[str, Any]:
+        """以历史项目的结果完成当前项目，不再调用任何Agent"""
+        if project_id is None:
+            project_id = self.create_project(user_goal, user_context)
+        stage_outputs = similar.get("stage_outputs", {})
+        
+        def mark_reused(session):
+            for name, task in self._stage_tasks(project_id, session).items():
+                task.status = "reused"
+                # 复制各阶段产出，使复用的项目同样具备完整的检查点
+                if name in stage_outputs:
+                    output_type, digest, legacy_content = stage_outputs[name]
+                    task.output = AgentOutput(type=output_type, content_hash=digest, legacy_content=legacy_content)
+        
+        self._save_to_database(project_id, similar["workflow_result"], before=mark_reused)
+        
+        reused_note = f"复用相似项目 #{similar['project_id']} 的结果"
+        return {
+            "project_id": project_id,
+            "workflow_result": similar["workflow_result"],
+            "reused_from": similar["project_id"],
+            "similarity": similar["similarity"],
+            "individual_outputs": {
+                "chiefmind": reused_note,
+                "taskplanner": reused_note,
+                "researcher": reused_note,
+                "prdwriter": reused_note,
+                "toolfinder": reused_note
+            }
+        }
+    
+    # 构建项目及各阶段任务记录（未写入数据库）
+    def _new_project(self, user_goal: str, user_context: str = "", status: str = "queued") -> Project:
         project = Project(
             name=f"AI参谋团项目 - {user_goal[:50]}...",
             description=user_goal,
-            status="completed"
+            user_context=user_context,
+            status=status
         )
-        self.db_session.add(project)
-        self.db_session.commit()
+        project.tasks = [
+            ProjectTask(name=stage, description=label, agent=agent, status="pending")
+            for stage, (agent, label) in WORKFLOW_STAGES.items()
+        ]
+        return project
+    
+    # 创建项目及各阶段任务记录
+    def create_project(self, user_goal: str, user_context: str = "", status: str = "queued") -> int:
+        """创建项目记录，并为每个工作流阶段创建一条待执行的任务记录"""
+        return self.create_projects([(user_goal, user_context)], status)[0]
+    
+    # 批量创建项目
+    def create_projects(self, goals: List[Tuple[str, str]], status: str = "queued") -> List[int]:
+        """批量创建项目及各阶段任务记录，在一个事务中写入；goals 为 (user_goal, user_context) 列表"""
+        projects = [self._new_project(goal, context, status) for goal, context in goals]
         
-        # 保存最终结果
-        output = AgentOutput(
-            type="crew",
-            content=workflow_result
-        )
-        self.db_session.add(output)
-        self.db_session.commit()
+        def insert(session):
+            session.add_all(projects)
+            session.flush()
+            for project in projects:
+                search.index_project(session, project.id, project.name, project.description)
+            return [project.id for project in projects]
+        
+        return self._write(insert)
+    
+    # 执行写操作
+    def _write(self, op):
+        """执行写操作 op(session)：启用单写入队列时交给写线程与其他写操作合并为一个事务提交，
+        否则在当前会话中执行并提交。返回 op 的返回值"""
+        write_queue = get_write_queue()
+        if write_queue is None:
+            result = op(self.db_session)
+            self.db_session.commit()
+            return result
+        result = write_queue.write(op)
+        # 写线程已提交，让当前会话重新读取最新数据
+        self.db_session.expire_all()
+        return result
+    
+    # 更新项目状态
+    def _set_project_status(self, project_id: int, status: str, before=None):
+        def update(session):
+            if before is not None:
+                before(session)
+            project = session.get(Project, project_id)
+            if project is not None:
+                project.status = status
+        
+        self._write(update)
+    
+    # 将本次执行累计的token用量写入项目记录（断点续跑时累加）
+    def _save_token_usage(self, project_id: int):
+        self._write(self._token_usage_update(project_id))
+    
+    def _token_usage_update(self, project_id: int):
+        """取出本次执行累计的token用量，返回把它累加到项目记录的写操作"""
+        usage = get_token_ledger().pop_project(project_id)
+        
+        def update(session):
+            project = session.get(Project, project_id)
+            if project is not None and usage["calls"]:
+                project.prompt_tokens = (project.prompt_tokens or 0) + usage["prompt_tokens"]
+                project.completion_tokens = (project.completion_tokens or 0) + usage["completion_tokens"]
+        
+        return update
+    
+    # 获取项目下各阶段的任务记录
+    def _stage_tasks(self, project_id: int, session: Session = None) -> Dict[str, ProjectTask]:
+        tasks = (session or self.db_session).query(ProjectTask).filter(
+            ProjectTask.project_id == project_id,
+            ProjectTask.parent_id.is_(None)
+        ).all()
+        return {task.name: task for task in tasks if task.name in WORKFLOW_STAGES}
+    
+    # 构建阶段进度回调，将阶段状态及产出（检查点）写入Task表
+    def _progress_hooks(self, project_id: int, on_event=None, in_thread: bool = False):
+        """返回 (on_start, on_finish)。in_thread 为True时返回协程回调（供 run_async 使用），
+        数据库写入在线程中执行，事件仍在事件循环中发出"""
+        task_ids = {name: task.id for name, task in self._stage_tasks(project_id).items()}
+        
+        def emit(event_type: str, stage: str, status: str):
+            if on_event is not None:
+                on_event({"type": event_type, "stage": stage, "agent": WORKFLOW_STAGES[stage][0], "status": status})
+        
+        def update_task(stage: str, status: str, output: Any = None, has_output: bool = False):
+            if stage not in task_ids:
+                return
+            
+            def update(session):
+                task = session.get(ProjectTask, task_ids[stage])
+                task.status = status
+                if has_output:
+                    self._attach_output(task, output)
+                    # 任务规划结果同时展开为任务树节点，与检查点在同一事务中写入
+                    if stage == "task_plan":
+                        plan = self._parse_plan(output)
+                        if plan is not None:
+                            task_tree.replace_plan(session, project_id, task.id, plan)
+            
+            self._write(update)
+        
+        def on_start(stage: str):
+            update_task(stage, "running")
+            emit("stage_start", stage, "running")
+        
+        def on_finish(stage: str, result: Any, error: BaseException = None):
+            status = "failed" if error else "completed"
+            update_task(stage, status, result, has_output=error is None)
+            emit("stage_finish", stage, status)
+        
+        async def on_start_async(stage: str):
+            await asyncio.to_thread(update_task, stage, "running")
+            emit("stage_start", stage, "running")
+        
+        async def on_finish_async(stage: str, result: Any, error: BaseException = None):
+            status = "failed" if error else "completed"
+            await asyncio.to_thread(update_task, stage, status, result, error is None)
+            emit("stage_finish", stage, status)
+        
+        if in_thread:
+            return on_start_async, on_finish_async
+        return on_start, on_finish
+    
+    @staticmethod
+    def _parse_plan(output: Any) -> Optional[Any]:
+        """任务规划产出中的JSON任务树（crewai引擎产出为文本），无法解析或为错误结果时返回None"""
+        plan = extract_json(output)
+        if not isinstance(plan, (dict, list)) or (isinstance(plan, dict) and set(plan) == {"error"}):
+            return None
+        return plan
+    
+    # 读取任务树
+    def load_task_tree(self, project_id: int, root_path: str = None) -> List[Dict[str, Any]]:
+        """返回项目的嵌套任务树（root_path 指定时只返回该子树）。
+        没有持久化节点的项目（如复用历史结果的项目）从任务规划检查点即时展开"""
+        tree = task_tree.load_task_tree(self.db_session, project_id, root_path)
+        if tree or root_path:
+            return tree
+        plan_task = self._stage_tasks(project_id).get("task_plan")
+        if plan_task is None or plan_task.output is None:
+            return []
+        plan = self._parse_plan(self._load_output(plan_task.output))
+        if plan is None:
+            return []
+        return task_tree.build_tree(task_tree.flatten_plan(plan))
+    
+    # 更新项目的全文检索文档（名称、目标及各阶段产出）
+    def _index_outputs(self, session: Session, project: Project):
+        session.flush()
+        outputs = [
+            task.output.content or ""
+            for task in self._stage_tasks(project.id, session).values() if task.output is not None
+        ]
+        search.index_project(session, project.id, project.name, project.description, "\n\n".join(outputs))
+    
+    # 保存到数据库
+    def _save_to_database(self, project_id: int, workflow_result: str, before=None):
+        """保存工作流结果到数据库，关联到评估阶段的任务记录；before(session) 在同一事务中先执行"""
+        def save(session):
+            if before is not None:
+                before(session)
+            project = session.get(Project, project_id)
+            # 评估阶段的检查点即最终结果，缺失时才补写
+            evaluation_task = self._stage_tasks(project_id, session).get("evaluation")
+            if evaluation_task is not None and evaluation_task.output is None:
+                self._attach_output(evaluation_task, workflow_result, output_type="crew")
+            project.status = "completed"
+            self._index_outputs(session, project)
+            return project.description or "", project.user_context
+        
+        description, user_context = self._write(save)
+        
+        # 加入近重复索引，供后续相似需求复用
+        if _goal_index is not None:
+            _goal_index.add(project_id, description, group=context_key(user_context))
         
-        return project.id 
\ No newline at end of file
+        return project_id
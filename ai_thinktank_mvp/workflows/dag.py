@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import inspect
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class WorkflowStage:
+    """工作流中的一个阶段：名称、执行函数及其真实依赖的上游阶段"""
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], depends_on: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class DAGScheduler:
+    """按依赖关系调度阶段，依赖满足的阶段并发执行。
+
+    每个阶段的执行函数只会收到它所依赖的上游结果（dict: 阶段名 -> 结果）。
+    阶段开始/结束的回调在调用 run() 的线程中执行，方便在回调里安全地使用数据库会话。
+    run_async() 在事件循环中调度，协程阶段直接 await，普通函数阶段放到线程中执行；
+    回调也可以是协程函数（如把数据库写入放到线程中执行），会被依次 await，不会并发执行。
+    """
+
+    def __init__(
+        self,
+        stages: List[WorkflowStage],
+        max_workers: Optional[int] = None,
+        on_stage_start: Optional[Callable[[str], None]] = None,
+        on_stage_finish: Optional[Callable[[str, Any, Optional[BaseException]], None]] = None,
+    ):
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names in workflow")
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self._check_acyclic()
+        self.max_workers = max_workers or len(stages) or 1
+        self.on_stage_start = on_stage_start
+        self.on_stage_finish = on_stage_finish
+
+    def _check_acyclic(self):
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Cycle detected at stage '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _ready_stages(self, results: Dict[str, Any], started: set) -> List[WorkflowStage]:
+        return [
+            stage for name, stage in self.stages.items()
+            if name not in started and all(dep in results for dep in stage.depends_on)
+        ]
+
+    def _inputs_for(self, stage: WorkflowStage, results: Dict[str, Any]) -> Dict[str, Any]:
+        return {dep: results[dep] for dep in stage.depends_on}
+
+    def run(self, initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """执行所有阶段，返回 阶段名 -> 结果。initial 中已有结果的阶段不会重新执行。
+
+        某个阶段失败后不再启动新阶段，但会等待已在执行的阶段结束并回调 on_stage_finish
+        （便于保存其结果），然后抛出第一个异常。
+        """
+        results: Dict[str, Any] = dict(initial or {})
+        started = set(results)
+        running = {}
+        first_error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(results) < len(self.stages):
+                if first_error is None:
+                    for stage in self._ready_stages(results, started):
+                        started.add(stage.name)
+                        if self.on_stage_start:
+                            self.on_stage_start(stage.name)
+                        # 在调用方的contextvars上下文中执行（如当前项目ID），与 asyncio.to_thread 行为一致
+                        future = executor.submit(
+                            contextvars.copy_context().run, stage.func, self._inputs_for(stage, results)
+                        )
+                        running[future] = stage.name
+
+                if not running:
+                    if first_error is not None:
+                        raise first_error
+                    raise RuntimeError("Workflow DAG stalled: no runnable stages")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if self.on_stage_finish:
+                        self.on_stage_finish(name, None if error else future.result(), error)
+                    if error:
+                        first_error = first_error or error
+                    else:
+                        results[name] = future.result()
+
+        return results
+
+    async def _call_async(self, stage: WorkflowStage, inputs: Dict[str, Any]) -> Any:
+        if inspect.iscoroutinefunction(stage.func):
+            return await stage.func(inputs)
+        result = await asyncio.to_thread(stage.func, inputs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    @staticmethod
+    async def _call_hook(hook, *args):
+        result = hook(*args)
+        if inspect.isawaitable(result):
+            await result
+
+    async def run_async(self, initial: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """异步执行所有阶段，语义与 run() 相同；自身被取消时会取消所有执行中的阶段"""
+        results: Dict[str, Any] = dict(initial or {})
+        started = set(results)
+        running = {}
+        first_error = None
+
+        try:
+            while len(results) < len(self.stages):
+                if first_error is None:
+                    for stage in self._ready_stages(results, started):
+                        started.add(stage.name)
+                        if self.on_stage_start:
+                            await self._call_hook(self.on_stage_start, stage.name)
+                        task = asyncio.ensure_future(self._call_async(stage, self._inputs_for(stage, results)))
+                        running[task] = stage.name
+
+                if not running:
+                    if first_error is not None:
+                        raise first_error
+                    raise RuntimeError("Workflow DAG stalled: no runnable stages")
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    error = task.exception()
+                    if self.on_stage_finish:
+                        await self._call_hook(self.on_stage_finish, name, None if error else task.result(), error)
+                    if error:
+                        first_error = first_error or error
+                    else:
+                        results[name] = task.result()
+        except asyncio.CancelledError:
+            for pending in running:
+                pending.cancel()
+            raise
+
+        return results
@@ -0,0 +1,81 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable
+import threading
+
+
+class QueueFullError(Exception):
+    """工作流队列已满，调用方应返回429让客户端稍后重试"""
+
+
+def run_workflow_job(project_id: int, user_goal: str, user_context: str = "", reuse_similar: bool = True,
+                     engine: str = None):
+    """在后台worker中执行一个已创建项目的完整工作流（线程/进程均可调用）"""
+    from ai_thinktank_mvp.agents.agent_factory import AgentFactory
+    from ai_thinktank_mvp.models.database import SessionLocal
+    from ai_thinktank_mvp.workflows.crewai_workflow import AIThinkTankWorkflow
+
+    db = SessionLocal()
+    workflow = AIThinkTankWorkflow(AgentFactory.shared(), db)
+    try:
+        workflow.execute_full_workflow(
+            user_goal, user_context, project_id=project_id, reuse_similar=reuse_similar, engine=engine
+        )
+    except Exception:
+        # 保证失败的项目被标记为failed，且worker不会因异常退出
+        db.rollback()
+        workflow._set_project_status(project_id, "failed")
+    finally:
+        db.close()
+
+
+class WorkflowJobQueue:
+    """有界的后台工作流队列。
+
+    最多同时容纳 workers + queue_size 个任务（执行中 + 排队中），超出时 submit 抛出 QueueFullError，
+    从而限制对上游LLM的并发压力。mode 为 "thread" 或 "process"。
+    """
+
+    def __init__(self, workers: int = 4, queue_size: int = 32, mode: str = "thread"):
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        elif mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="workflow")
+        else:
+            raise ValueError(f"Unknown worker mode: {mode}")
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.mode = mode
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """执行中和排队中的任务数"""
+        return self._pending
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def submit(self, create_project: Callable[[], int], user_goal: str, user_context: str = "",
+               reuse_similar: bool = True, engine: str = None) -> int:
+        """占用一个队列位置，创建项目并提交后台执行，返回项目ID"""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError(f"Workflow queue is full ({self.capacity} jobs)")
+        with self._lock:
+            self._pending += 1
+        try:
+            project_id = create_project()
+            future = self._executor.submit(
+                run_workflow_job, project_id, user_goal, user_context, reuse_similar, engine
+            )
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return project_id
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,186 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import os
+import re
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from llm_tokens import count_tokens
+from llm_structured import extract_json
+
+# 各类输入的字符预算：field 为需求JSON中单个字段，requirements 为无法按字段解析时的整段需求，
+# 其余为整段上游产出（evaluation 为每个阶段产出）
+DEFAULT_BUDGETS = {
+    "field": 800,
+    "requirements": 2000,
+    "task_plan": 2000,
+    "market_research": 3000,
+    "evaluation": 1200,
+}
+
+# 各阶段输入的token预算（0或缺省表示不限制），超出时按比例缩小上面的字符预算
+DEFAULT_TOKEN_BUDGETS = {
+    "prd": 3000,
+    "tool_selection": 2000,
+    "evaluation": 4000,
+}
+
+# 超出预算时的压缩方式：truncate 保留开头；summarize 保留Markdown标题及每节首句
+COMPACTION_MODES = ("truncate", "summarize")
+
+# 各阶段需要的需求分析字段
+STAGE_REQUIREMENT_FIELDS = {
+    "task_plan": ["refined_requirements", "project_scope", "key_features", "technical_considerations"],
+    "market_research": ["project_scope", "key_features", "user_persona"],
+    "prd": ["refined_requirements", "user_persona", "project_scope", "key_features", "success_metrics"],
+    "tool_selection": ["project_scope", "key_features", "technical_considerations"],
+}
+
+FIELD_LABELS = {
+    "refined_requirements": "细化需求",
+    "user_persona": "目标用户",
+    "project_scope": "项目范围",
+    "key_features": "核心功能",
+    "technical_considerations": "技术考虑",
+    "risk_assessment": "风险评估",
+    "success_metrics": "成功指标",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[。！？.!?])")
+
+
+def parse_requirements(output: Any) -> Dict[str, Any]:
+    """将需求分析阶段的产出（dict、JSON文本或带代码块的文本）解析为dict，无法解析时整体作为细化需求"""
+    if isinstance(output, dict):
+        return output
+    text = str(output or "")
+    parsed = extract_json(text)
+    if isinstance(parsed, dict):
+        return parsed
+    return {"refined_requirements": text}
+
+
+def truncate(text: str, budget: int) -> str:
+    """保留前 budget 个字符，并标注被截断的长度"""
+    if budget <= 0 or len(text) <= budget:
+        return text
+    return f"{text[:budget]}…（已截断{len(text) - budget}字）"
+
+
+def summarize(text: str, budget: int) -> str:
+    """抽取式摘要：保留Markdown标题和每个段落的首句，仍超出预算时再截断"""
+    if budget <= 0 or len(text) <= budget:
+        return text
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped.startswith("#"):
+            lines.append(stripped)
+        else:
+            first_sentence = _SENTENCE_END.split(stripped, maxsplit=1)[0]
+            lines.append(first_sentence)
+    return truncate("\n".join(lines), budget)
+
+
+def format_value(value: Any) -> str:
+    if isinstance(value, list):
+        return "\n".join(f"- {format_value(item)}" for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+class StageInputBuilder:
+    """为每个工作流阶段构建精简的输入：只传递该阶段需要的需求字段，上游长文本按预算压缩。
+
+    下游prompt大小因此与上游产出长度无关，避免PRD撰写和最终评估阶段的prompt随阶段数增长。
+    """
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, mode: Optional[str] = None,
+                 token_budgets: Optional[Dict[str, int]] = None):
+        self.budgets = dict(DEFAULT_BUDGETS)
+        self.budgets.update(budgets or {})
+        self.token_budgets = dict(DEFAULT_TOKEN_BUDGETS)
+        self.token_budgets.update(token_budgets or {})
+        self.mode = mode or "truncate"
+        if self.mode not in COMPACTION_MODES:
+            raise ValueError(f"Unknown compaction mode: {self.mode}")
+
+    @classmethod
+    def from_env(cls) -> "StageInputBuilder":
+        """STAGE_INPUT_BUDGETS（JSON，覆盖默认字符预算）、STAGE_TOKEN_BUDGETS（JSON，覆盖各阶段token预算）、
+        STAGE_INPUT_COMPACTION（truncate/summarize）"""
+        budgets = json.loads(os.getenv("STAGE_INPUT_BUDGETS", "{}") or "{}")
+        token_budgets = json.loads(os.getenv("STAGE_TOKEN_BUDGETS", "{}") or "{}")
+        return cls(
+            {k: int(v) for k, v in budgets.items()},
+            os.getenv("STAGE_INPUT_COMPACTION", "truncate"),
+            {k: int(v) for k, v in token_budgets.items()},
+        )
+
+    def compact(self, text: Any, budget_key: str, scale: float = 1.0) -> str:
+        text = text if isinstance(text, str) else format_value(text)
+        budget = max(int(self.budgets[budget_key] * scale), 1)
+        return summarize(text, budget) if self.mode == "summarize" else truncate(text, budget)
+
+    def fit(self, stage: str, build: Callable[[float], Any]) -> Any:
+        """build(scale) 以给定的预算缩放比例构建阶段输入；超出该阶段token预算时按比例缩小后重建"""
+        result = build(1.0)
+        budget = self.token_budgets.get(stage)
+        if not budget:
+            return result
+        scale = 1.0
+        for _ in range(3):
+            texts = result.values() if isinstance(result, dict) else result if isinstance(result, tuple) else [result]
+            tokens = sum(count_tokens(text) for text in texts)
+            if tokens <= budget:
+                break
+            # 留10%余量，避免截断标注等导致再次超出
+            scale *= budget / tokens * 0.9
+            result = build(scale)
+        return result
+
+    def requirement_fields(self, requirements: Any, fields: List[str], scale: float = 1.0) -> str:
+        """从需求分析结果中选取指定字段，格式化为 “标签：内容” 文本"""
+        parsed = parse_requirements(requirements)
+        parts = []
+        for field in fields:
+            value = parsed.get(field)
+            if value in (None, "", [], {}):
+                continue
+            parts.append(f"{FIELD_LABELS.get(field, field)}：{self.compact(format_value(value), 'field', scale)}")
+        if not parts:
+            # 需求分析结果缺少结构化字段时退化为整段传递
+            return self.compact(requirements, "requirements", scale)
+        return "\n".join(parts)
+
+    def task_plan(self, inputs: Dict[str, Any]) -> str:
+        return self.fit("task_plan", lambda scale: self.requirement_fields(
+            inputs["requirements"], STAGE_REQUIREMENT_FIELDS["task_plan"], scale
+        ))
+
+    def market_research(self, inputs: Dict[str, Any]) -> str:
+        return self.fit("market_research", lambda scale: self.requirement_fields(
+            inputs["requirements"], STAGE_REQUIREMENT_FIELDS["market_research"], scale
+        ))
+
+    def prd(self, inputs: Dict[str, Any]) -> Tuple[str, str]:
+        """返回 (需求分析, 市场调研)"""
+        return self.fit("prd", lambda scale: (
+            self.requirement_fields(inputs["requirements"], STAGE_REQUIREMENT_FIELDS["prd"], scale),
+            self.compact(inputs["market_research"], "market_research", scale),
+        ))
+
+    def tool_selection(self, inputs: Dict[str, Any]) -> Tuple[str, str]:
+        """返回 (项目范围, 功能规格)"""
+        return self.fit("tool_selection", lambda scale: (
+            self.requirement_fields(inputs["requirements"], STAGE_REQUIREMENT_FIELDS["tool_selection"], scale),
+            self.compact(inputs["task_plan"], "task_plan", scale),
+        ))
+
+    def evaluation(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        """各阶段产出分别压缩到 evaluation 预算内"""
+        return self.fit("evaluation", lambda scale: {
+            name: self.compact(output, "evaluation", scale) for name, output in inputs.items()
+        })
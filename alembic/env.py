@@ -19,6 +19,11 @@ if config.config_file_name is not None:
 from ai_thinktank_mvp.models.database import Base
 target_metadata = Base.metadata
 
+# 与应用一致：设置了 DATABASE_URL 时迁移同一个数据库
+import os
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
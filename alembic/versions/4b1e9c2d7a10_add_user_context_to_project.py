@@ -0,0 +1,28 @@
+"""Add user_context field to Project
+
+Revision ID: 4b1e9c2d7a10
+Revises: 73003c77f9f2
+Create Date: 2026-10-18 10:12:03.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1e9c2d7a10'
+down_revision: Union[str, None] = '73003c77f9f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('projects', sa.Column('user_context', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('projects', 'user_context')
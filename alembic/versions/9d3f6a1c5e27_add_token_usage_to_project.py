@@ -0,0 +1,30 @@
+"""Add token usage fields to Project
+
+Revision ID: 9d3f6a1c5e27
+Revises: 4b1e9c2d7a10
+Create Date: 2026-10-18 14:37:45.902113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3f6a1c5e27'
+down_revision: Union[str, None] = '4b1e9c2d7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('projects', sa.Column('prompt_tokens', sa.Integer(), nullable=True, server_default='0'))
+    op.add_column('projects', sa.Column('completion_tokens', sa.Integer(), nullable=True, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('projects', 'completion_tokens')
+    op.drop_column('projects', 'prompt_tokens')
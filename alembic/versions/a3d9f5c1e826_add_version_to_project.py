@@ -0,0 +1,28 @@
+"""Add version counter to Project for ETag caching
+
+Revision ID: a3d9f5c1e826
+Revises: f2c6a8d4b751
+Create Date: 2026-10-18 18:41:09.552871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9f5c1e826'
+down_revision: Union[str, None] = 'f2c6a8d4b751'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('projects', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('projects', 'version')
@@ -0,0 +1,87 @@
+"""Store AgentOutput content as compressed, content-addressed blobs
+
+Revision ID: c4a8e2f61b93
+Revises: 9d3f6a1c5e27
+Create Date: 2026-10-18 16:05:12.418530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from ai_thinktank_mvp.models.blob_codec import compress, content_hash, decompress
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a8e2f61b93'
+down_revision: Union[str, None] = '9d3f6a1c5e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+blobs = sa.table(
+    'content_blobs',
+    sa.column('hash', sa.String),
+    sa.column('codec', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+)
+outputs = sa.table(
+    'agent_outputs',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.Text),
+    sa.column('content_hash', sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'content_blobs',
+        sa.Column('hash', sa.String(length=64), primary_key=True),
+        sa.Column('codec', sa.String(length=16), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.add_column('agent_outputs', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_agent_outputs_content_hash'), 'agent_outputs', ['content_hash'], unique=False)
+
+    # 将已有的明文内容迁移为去重压缩的blob，分批处理避免一次性读入全部内容
+    bind = op.get_bind()
+    stored = set(row[0] for row in bind.execute(sa.select(blobs.c.hash)))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(outputs.c.id, outputs.c.content)
+            .where(outputs.c.id > last_id, outputs.c.content.isnot(None), outputs.c.content_hash.is_(None))
+            .order_by(outputs.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for output_id, content in rows:
+            digest = content_hash(content)
+            if digest not in stored:
+                codec, data = compress(content)
+                bind.execute(blobs.insert().values(hash=digest, codec=codec, size=len(content.encode("utf-8")), data=data))
+                stored.add(digest)
+            bind.execute(outputs.update().where(outputs.c.id == output_id).values(content_hash=digest, content=None))
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(outputs.c.id, blobs.c.codec, blobs.c.data)
+        .select_from(outputs.join(blobs, outputs.c.content_hash == blobs.c.hash))
+    ).fetchall()
+    for output_id, codec, data in rows:
+        bind.execute(outputs.update().where(outputs.c.id == output_id).values(content=decompress(codec, data)))
+
+    op.drop_index(op.f('ix_agent_outputs_content_hash'), table_name='agent_outputs')
+    op.drop_column('agent_outputs', 'content_hash')
+    op.drop_table('content_blobs')
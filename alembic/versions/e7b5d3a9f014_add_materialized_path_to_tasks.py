@@ -0,0 +1,34 @@
+"""Add materialized path columns for TaskPlanner task trees
+
+Revision ID: e7b5d3a9f014
+Revises: c4a8e2f61b93
+Create Date: 2026-10-18 17:22:40.615307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b5d3a9f014'
+down_revision: Union[str, None] = 'c4a8e2f61b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('path', sa.String(length=255), nullable=True))
+    op.add_column('tasks', sa.Column('depth', sa.Integer(), nullable=True))
+    op.add_column('tasks', sa.Column('position', sa.Integer(), nullable=True))
+    op.create_index('ix_tasks_project_path', 'tasks', ['project_id', 'path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_project_path', table_name='tasks')
+    op.drop_column('tasks', 'position')
+    op.drop_column('tasks', 'depth')
+    op.drop_column('tasks', 'path')
@@ -0,0 +1,96 @@
+"""Add project listing indexes and full-text search index
+
+Revision ID: f2c6a8d4b751
+Revises: e7b5d3a9f014
+Create Date: 2026-10-18 18:04:37.290416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+
+from ai_thinktank_mvp.models.blob_codec import decompress
+from ai_thinktank_mvp.models.search import TABLE, create_statements, index_project
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a8d4b751'
+down_revision: Union[str, None] = 'e7b5d3a9f014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 200
+
+projects = sa.table(
+    'projects',
+    sa.column('id', sa.Integer),
+    sa.column('name', sa.String),
+    sa.column('description', sa.Text),
+)
+tasks = sa.table(
+    'tasks',
+    sa.column('id', sa.Integer),
+    sa.column('project_id', sa.Integer),
+    sa.column('parent_id', sa.Integer),
+    sa.column('output_id', sa.Integer),
+)
+outputs = sa.table(
+    'agent_outputs',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.Text),
+    sa.column('content_hash', sa.String),
+)
+blobs = sa.table(
+    'content_blobs',
+    sa.column('hash', sa.String),
+    sa.column('codec', sa.String),
+    sa.column('data', sa.LargeBinary),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_projects_created_at_id', 'projects', ['created_at', 'id'], unique=False)
+    op.create_index('ix_projects_status_created_at_id', 'projects', ['status', 'created_at', 'id'], unique=False)
+
+    bind = op.get_bind()
+    statements = create_statements(bind.dialect.name)
+    if not statements:
+        return
+    for statement in statements:
+        op.execute(statement)
+
+    # 为已有项目建立检索文档：名称、目标及各阶段产出
+    session = Session(bind=bind)
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(projects.c.id, projects.c.name, projects.c.description)
+            .where(projects.c.id > last_id).order_by(projects.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        texts = {}
+        stage_outputs = bind.execute(
+            sa.select(tasks.c.project_id, outputs.c.content, blobs.c.codec, blobs.c.data)
+            .select_from(
+                tasks.join(outputs, tasks.c.output_id == outputs.c.id)
+                .outerjoin(blobs, outputs.c.content_hash == blobs.c.hash)
+            )
+            .where(tasks.c.project_id.in_([row[0] for row in rows]), tasks.c.parent_id.is_(None))
+            .order_by(tasks.c.project_id, tasks.c.id)
+        )
+        for project_id, content, codec, data in stage_outputs:
+            texts.setdefault(project_id, []).append(decompress(codec, data) if codec else (content or ""))
+        for project_id, name, description in rows:
+            index_project(session, project_id, name, description, "\n\n".join(texts.get(project_id, [])))
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    op.drop_index('ix_projects_status_created_at_id', table_name='projects')
+    op.drop_index('ix_projects_created_at_id', table_name='projects')
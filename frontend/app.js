@@ -48,20 +48,8 @@ class AIThinkTankApp {
         this.isProcessing = true;
         
         try {
-            // 调用API
-            const response = await this.callWorkflowAPI(message);
-            
-            // 隐藏打字指示器
-            this.hideTypingIndicator();
-            
-            // 添加AI响应
-            this.addMessage(response.workflow_result, 'ai');
-            
-            // 更新工作流状态
-            this.updateWorkflowStatus(response.individual_outputs);
-            
-            // 更新项目信息
-            this.updateProjectInfo(response.project_id);
+            // 流式调用API，边执行边展示各阶段输出
+            await this.streamWorkflowAPI(message);
             
         } catch (error) {
             console.error('发送消息失败:', error);
@@ -72,6 +60,88 @@ class AIThinkTankApp {
         }
     }
     
+    // 流式调用工作流API（Server-Sent Events）
+    async streamWorkflowAPI(message) {
+        const response = await fetch(`${this.apiBaseUrl}/workflow/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                message: message
+            })
+        });
+        
+        if (!response.ok) {
+            throw new Error(`API调用失败: ${response.status}`);
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            
+            frames.forEach(frame => {
+                const dataLine = frame.split('\n').find(line => line.startsWith('data: '));
+                if (dataLine) {
+                    this.handleWorkflowEvent(JSON.parse(dataLine.slice(6)));
+                }
+            });
+        }
+    }
+    
+    // 处理工作流流式事件
+    handleWorkflowEvent(event) {
+        const agentNames = {
+            chiefmind: 'ChiefMind',
+            taskplanner: 'TaskPlanner',
+            researcher: 'Researcher',
+            prdwriter: 'PRDWriter',
+            toolfinder: 'ToolFinder'
+        };
+        this.stageOutputs = this.stageOutputs || {};
+        
+        switch (event.type) {
+            case 'project':
+                this.stageOutputs = {};
+                this.updateProjectInfo(event.project_id);
+                break;
+            case 'stage_start':
+                this.hideTypingIndicator();
+                this.updateAgentStatus(agentNames[event.agent], 'active');
+                this.stageOutputs[event.stage] = this.addMessage('', 'ai', 'normal', `【${agentNames[event.agent]}】`);
+                break;
+            case 'token':
+                if (this.stageOutputs[event.stage]) {
+                    this.stageOutputs[event.stage].textContent += event.content;
+                    const chatMessages = document.getElementById('chatMessages');
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                }
+                break;
+            case 'stage_finish':
+                this.updateAgentStatus(agentNames[event.agent], event.status === 'completed' ? 'completed' : 'active');
+                break;
+            case 'result':
+                this.hideTypingIndicator();
+                this.addMessage(event.content, 'ai');
+                break;
+            case 'error':
+                this.hideTypingIndicator();
+                this.addMessage(event.detail, 'ai', 'error');
+                break;
+            case 'done':
+                this.hideTypingIndicator();
+                break;
+        }
+    }
+    
     // 调用工作流API
     async callWorkflowAPI(message) {
         const response = await fetch(`${this.apiBaseUrl}/workflow/chat`, {
@@ -92,7 +162,7 @@ class AIThinkTankApp {
     }
     
     // 添加消息到聊天界面
-    addMessage(content, sender, type = 'normal') {
+    addMessage(content, sender, type = 'normal', title = '') {
         const chatMessages = document.getElementById('chatMessages');
         const messageDiv = document.createElement('div');
         messageDiv.className = 'chat-bubble';
@@ -109,6 +179,7 @@ class AIThinkTankApp {
                 </div>
                 <div class="flex-1">
                     <div class="${bgColor} rounded-lg p-4">
+                        ${title ? `<p class="text-gray-500 text-sm mb-1">${this.escapeHtml(title)}</p>` : ''}
                         <p class="text-gray-800 whitespace-pre-wrap">${this.escapeHtml(content)}</p>
                     </div>
                 </div>
@@ -117,6 +188,9 @@ class AIThinkTankApp {
         
         chatMessages.appendChild(messageDiv);
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        
+        // 返回正文节点，便于流式追加内容
+        return messageDiv.querySelector('.whitespace-pre-wrap');
     }
     
     // 显示打字指示器
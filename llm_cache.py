@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# 不参与缓存键计算的调用参数（不影响生成结果）
+_NON_SAMPLING_PARAMS = {"stream", "timeout", "extra_headers", "extra_query", "user"}
+
+def normalize_messages(messages):
+    """规范化消息：统一换行符、去掉每行行尾空白及首尾空白，避免无意义的格式差异导致缓存未命中"""
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            lines = content.replace("\r\n", "\n").split("\n")
+            content = "\n".join(line.rstrip() for line in lines).strip()
+        normalized.append({**message, "content": content})
+    return normalized
+
+def make_cache_key(model, messages, params):
+    """按 (模型, 规范化消息, 采样参数) 计算内容寻址的缓存键"""
+    payload = {
+        "model": model,
+        "messages": normalize_messages(messages),
+        "params": {k: v for k, v in params.items() if k not in _NON_SAMPLING_PARAMS},
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class LLMCache:
+    """两级LLM响应缓存：内存LRU + 可选的SQLite磁盘缓存，按Agent类型设置TTL"""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, db_path=None,
+                 db_max_entries=100000, default_ttl=3600, agent_ttls=None, cache_sampled=False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.db_max_entries = db_max_entries
+        self.default_ttl = default_ttl
+        self.agent_ttls = agent_ttls or {}
+        self.cache_sampled = cache_sampled
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, agent TEXT, "
+                "expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_created_at ON llm_cache (created_at)")
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量构建缓存；LLM_CACHE_ENABLED=false 时返回 None"""
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("0", "false", "no", "off"):
+            return None
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+            db_path=os.getenv("LLM_CACHE_DB") or None,
+            db_max_entries=int(os.getenv("LLM_CACHE_DB_MAX_ENTRIES", "100000")),
+            default_ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            agent_ttls=json.loads(os.getenv("LLM_CACHE_TTLS", "{}")),
+            cache_sampled=os.getenv("LLM_CACHE_SAMPLED", "false").lower() in ("1", "true", "yes", "on"),
+        )
+
+    def ttl_for(self, agent_type):
+        return float(self.agent_ttls.get(agent_type or "default", self.default_ttl))
+
+    def is_cacheable(self, agent_type, params):
+        """默认只缓存确定性调用（temperature=0），LLM_CACHE_SAMPLED=true 时也缓存采样调用"""
+        if self.ttl_for(agent_type) <= 0:
+            return False
+        return params.get("temperature") == 0 or self.cache_sampled
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                self._evict(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    self._stats["disk_hits"] += 1
+                    self._put_memory(key, row[0], row[1])
+                    return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key, value, agent_type=None):
+        if not isinstance(value, str):
+            return
+        now = time.time()
+        expires_at = now + self.ttl_for(agent_type)
+        with self._lock:
+            self._stats["stores"] += 1
+            self._put_memory(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, agent, expires_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, agent_type, expires_at, now)
+                )
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+                self._db.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.db_max_entries,)
+                )
+                self._db.commit()
+
+    def _put_memory(self, key, value, expires_at):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._memory:
+            self._evict(key)
+        self._memory[key] = (expires_at, value)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+            oldest = next(iter(self._memory))
+            self._evict(oldest)
+            self._stats["evictions"] += 1
+
+    def _evict(self, key):
+        _, value = self._memory.pop(key)
+        self._memory_bytes -= len(value.encode("utf-8"))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
@@ -1,44 +1,385 @@
 import os
+import json
+import asyncio
+import inspect
+import threading
+import weakref
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
+# 先加载 .env：llm_retry、llm_router 在导入时读取配置
 load_dotenv()
 
+from llm_cache import LLMCache, make_cache_key
+from llm_tokens import count_message_tokens, count_tokens, record_usage, get_token_ledger
+from llm_retry import call_with_policy, acall_with_policy, get_retry_stats
+from llm_router import DEFAULT_MODEL, resolve_model, get_router, get_router_stats
+from llm_ratelimit import estimate_request_tokens, get_rate_limiter, get_rate_limit_stats
+
 api_key = os.getenv('OPENAI_API_KEY', 'sk-xxx')
 base_url = os.getenv('OPENAI_API_BASE', 'https://xiaoai.plus/v1')
-model_name = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+model_name = DEFAULT_MODEL
+
+# 连接池配置：每个base_url一个连接池，可按base_url单独覆盖最大连接数
+max_connections = int(os.getenv('LLM_MAX_CONNECTIONS', '100'))
+pool_limits = json.loads(os.getenv('LLM_POOL_LIMITS', '{}'))
+keepalive_expiry = float(os.getenv('LLM_KEEPALIVE_EXPIRY', '30'))
+http2_setting = os.getenv('LLM_HTTP2', 'auto').lower()
+
+def _http2_enabled():
+    """LLM_HTTP2=auto 时仅在安装了h2时启用HTTP/2"""
+    if http2_setting in ('0', 'false', 'no', 'off'):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class ConnectionStats:
+    """统计某个base_url上新建连接与复用连接的次数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(self.requests - self.connections_opened, 0),
+            }
+
+_connection_stats = {}
+_clients = {}
+_clients_lock = threading.Lock()
+# 异步客户端按事件循环区分（httpx连接池绑定在创建它的事件循环上）
+_async_clients = weakref.WeakKeyDictionary()
+_response_cache = None
+_response_cache_loaded = False
+
+def _stats_for(url):
+    with _clients_lock:
+        return _connection_stats.setdefault(url, ConnectionStats())
+
+def _pool_limits(url):
+    limit = int(pool_limits.get(url, max_connections))
+    return httpx.Limits(
+        max_connections=limit,
+        max_keepalive_connections=limit,
+        keepalive_expiry=keepalive_expiry
+    )
+
+def _build_http_client(url):
+    """创建带连接统计的同步httpx客户端"""
+    stats = _stats_for(url)
+
+    def trace(event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            stats.record_connection()
+
+    def on_request(request):
+        stats.record_request()
+        request.extensions["trace"] = trace
+
+    return httpx.Client(
+        limits=_pool_limits(url),
+        http2=_http2_enabled(),
+        event_hooks={"request": [on_request]}
+    )
+
+def _build_async_http_client(url):
+    """创建带连接统计的异步httpx客户端"""
+    stats = _stats_for(url)
+
+    async def trace(event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            stats.record_connection()
+
+    async def on_request(request):
+        stats.record_request()
+        request.extensions["trace"] = trace
+
+    return httpx.AsyncClient(
+        limits=_pool_limits(url),
+        http2=_http2_enabled(),
+        event_hooks={"request": [on_request]}
+    )
+
+def get_llm_client(url=None, key=None):
+    """返回进程内共享的OpenAI客户端实例（按base_url和api_key复用连接池）"""
+    url = url or base_url
+    key = key or api_key
+    with _clients_lock:
+        client = _clients.get((url, key))
+    if client is None:
+        # 重试由 llm_retry 统一负责，关闭SDK自带的重试以免叠加
+        client = OpenAI(base_url=url, api_key=key, http_client=_build_http_client(url), max_retries=0)
+        with _clients_lock:
+            client = _clients.setdefault((url, key), client)
+    return client
+
+def get_async_llm_client(url=None, key=None):
+    """返回当前事件循环共享的AsyncOpenAI客户端（按base_url和api_key复用连接池）"""
+    url = url or base_url
+    key = key or api_key
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.setdefault(loop, {})
+    client = clients.get((url, key))
+    if client is None:
+        client = AsyncOpenAI(base_url=url, api_key=key, http_client=_build_async_http_client(url), max_retries=0)
+        clients[(url, key)] = client
+    return client
+
+def get_connection_stats():
+    """返回各base_url的连接统计：请求数、新建连接数、复用连接数"""
+    with _clients_lock:
+        items = list(_connection_stats.items())
+    return {url: stats.snapshot() for url, stats in items}
+
+def get_response_cache():
+    """返回进程内共享的LLM响应缓存（未启用时为None）"""
+    global _response_cache, _response_cache_loaded
+    if not _response_cache_loaded:
+        with _clients_lock:
+            if not _response_cache_loaded:
+                _response_cache = LLMCache.from_env()
+                _response_cache_loaded = True
+    return _response_cache
+
+def get_cache_stats():
+    """返回LLM响应缓存的命中/未命中统计"""
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+def _cache_lookup(model, messages, kwargs, agent_type):
+    """可缓存时返回 (缓存键, 已缓存内容)；不可缓存时返回 (None, None)"""
+    cache = get_response_cache()
+    if cache is None or not cache.is_cacheable(agent_type, kwargs):
+        return None, None
+    key = make_cache_key(model, messages, kwargs)
+    return key, cache.get(key)
+
+def _cache_store(key, content, agent_type):
+    if key is not None and content is not None:
+        get_response_cache().set(key, content, agent_type)
+
+def _record_tokens(agent_type, model, messages, content, usage=None):
+    """记录token用量：优先使用接口返回的usage，流式调用等无usage时用本地分词器计数"""
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens or 0
+    else:
+        prompt_tokens = count_message_tokens(messages, model)
+        completion_tokens = count_tokens(content or "", model)
+    record_usage(agent_type, prompt_tokens, completion_tokens)
+
+def get_token_stats():
+    """返回各Agent类型累计的prompt/completion token数"""
+    return get_token_ledger().snapshot()
+
+def get_reliability_stats():
+    """返回重试、超时、对冲请求统计及各Agent的延迟分位数"""
+    return get_retry_stats()
+
+def get_routing_stats():
+    """返回各Agent类型使用的模型及各端点的负载与健康状态"""
+    return get_router_stats()
 
-def get_llm_client():
-    """返回OpenAI客户端实例"""
-    return OpenAI(base_url=base_url, api_key=api_key)
+def get_rate_limit_metrics():
+    """返回限流排队等待统计及各令牌桶余量"""
+    return get_rate_limit_stats()
 
-def chat_completion(messages, model=model_name, **kwargs):
+def _usage_tokens(result):
+    usage = getattr(result, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage is not None else None
+
+def _routed(model, create, tokens):
+    """包装一次同步请求：每次尝试都重新选择端点并按其RPM/TPM配额排队，
+    出错的端点进入冷却，重试时自动切换到其他端点"""
+    router = get_router()
+    limiter = get_rate_limiter()
+
+    def request(timeout):
+        endpoint = router.select(model)
+        grant = limiter.acquire(endpoint.name, model, tokens)
+        with router.track(endpoint):
+            result = create(get_llm_client(endpoint.base_url, endpoint.api_key), timeout)
+        grant.settle(_usage_tokens(result))
+        return result
+
+    return request
+
+def _async_routed(model, create, tokens):
+    """_routed 的异步版本"""
+    router = get_router()
+    limiter = get_rate_limiter()
+
+    async def request(timeout):
+        endpoint = router.select(model)
+        grant = await limiter.acquire_async(endpoint.name, model, tokens)
+        with router.track(endpoint):
+            result = await create(get_async_llm_client(endpoint.base_url, endpoint.api_key), timeout)
+        grant.settle(_usage_tokens(result))
+        return result
+
+    return request
+
+def chat_completion(messages, model=None, agent_type=None, **kwargs):
     """
     统一的对话生成接口，返回OpenAI回复内容。
     :param messages: 消息列表
-    :param model: 使用的模型
+    :param model: 使用的模型，默认按 agent_type 由路由器选择
+    :param agent_type: 调用方Agent类型，用于按Agent设置缓存TTL
+    :param kwargs: 其他参数
+    :return: 回复内容
+    """
+    model = model or resolve_model(agent_type)
+    key, cached = _cache_lookup(model, messages, kwargs, agent_type)
+    if cached is not None:
+        return cached
+    # 按Agent类型设置超时，可重试错误指数退避重试，延迟敏感的Agent启用对冲请求
+    completion = call_with_policy(_routed(
+        model,
+        lambda client, timeout: client.chat.completions.create(model=model, messages=messages, **{"timeout": timeout, **kwargs}),
+        estimate_request_tokens(messages, kwargs, model)
+    ), agent_type)
+    content = completion.choices[0].message.content
+    _record_tokens(agent_type, model, messages, content, getattr(completion, "usage", None))
+    _cache_store(key, content, agent_type)
+    return content
+
+async def async_chat_completion(messages, model=None, agent_type=None, **kwargs):
+    """
+    chat_completion 的异步版本，不阻塞事件循环。
+    :param messages: 消息列表
+    :param model: 使用的模型，默认按 agent_type 由路由器选择
+    :param agent_type: 调用方Agent类型，用于按Agent设置缓存TTL
     :param kwargs: 其他参数
     :return: 回复内容
     """
+    model = model or resolve_model(agent_type)
+    key, cached = _cache_lookup(model, messages, kwargs, agent_type)
+    if cached is not None:
+        return cached
+    completion = await acall_with_policy(_async_routed(
+        model,
+        lambda client, timeout: client.chat.completions.create(model=model, messages=messages, **{"timeout": timeout, **kwargs}),
+        estimate_request_tokens(messages, kwargs, model)
+    ), agent_type)
+    content = completion.choices[0].message.content
+    _record_tokens(agent_type, model, messages, content, getattr(completion, "usage", None))
+    _cache_store(key, content, agent_type)
+    return content
+
+def stream_chat_completion(messages, model=None, agent_type=None, **kwargs):
+    """
+    流式对话生成接口，逐个产出增量文本。命中缓存时一次性产出完整内容。
+    :param messages: 消息列表
+    :param model: 使用的模型，默认按 agent_type 由路由器选择
+    :param agent_type: 调用方Agent类型，用于按Agent设置缓存TTL
+    :param kwargs: 其他参数
+    :return: 增量文本生成器
+    """
+    model = model or resolve_model(agent_type)
+    key, cached = _cache_lookup(model, messages, kwargs, agent_type)
+    if cached is not None:
+        yield cached
+        return
+    # 仅对建立流式连接应用重试，已开始输出后出错不再重发（不对冲）
+    stream = call_with_policy(_routed(
+        model,
+        lambda client, timeout: client.chat.completions.create(model=model, messages=messages, stream=True, **{"timeout": timeout, **kwargs}),
+        estimate_request_tokens(messages, kwargs, model)
+    ), agent_type, hedge=False)
+    parts = []
     try:
-        client = get_llm_client()
-        completion = client.chat.completions.create(
-            model=model or model_name,
-            messages=messages,
-            **kwargs
-        )
-        return completion.choices[0].message.content
-    except Exception as e:
-        raise e
-
-def create_llm_function():
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    finally:
+        # 调用方提前结束读取时关闭连接，并按已收到的内容记录用量（不完整的回复不写入缓存）
+        stream.close()
+        _record_tokens(agent_type, model, messages, "".join(parts))
+    _cache_store(key, "".join(parts), agent_type)
+
+async def async_stream_chat_completion(messages, model=None, agent_type=None, **kwargs):
+    """
+    stream_chat_completion 的异步版本。
+    :param messages: 消息列表
+    :param model: 使用的模型，默认按 agent_type 由路由器选择
+    :param agent_type: 调用方Agent类型，用于按Agent设置缓存TTL
+    :param kwargs: 其他参数
+    :return: 增量文本异步生成器
+    """
+    model = model or resolve_model(agent_type)
+    key, cached = _cache_lookup(model, messages, kwargs, agent_type)
+    if cached is not None:
+        yield cached
+        return
+    stream = await acall_with_policy(_async_routed(
+        model,
+        lambda client, timeout: client.chat.completions.create(model=model, messages=messages, stream=True, **{"timeout": timeout, **kwargs}),
+        estimate_request_tokens(messages, kwargs, model)
+    ), agent_type, hedge=False)
+    parts = []
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+    finally:
+        # 调用方提前结束读取时关闭连接，并按已收到的内容记录用量（不完整的回复不写入缓存）
+        await stream.close()
+        _record_tokens(agent_type, model, messages, "".join(parts))
+    _cache_store(key, "".join(parts), agent_type)
+
+def create_llm_function(agent_type=None, **default_kwargs):
     """
     创建一个可调用的LLM函数，用于agent中直接调用
+    :param agent_type: 调用方Agent类型
+    :param default_kwargs: 默认调用参数（如 temperature），可在调用时覆盖
     """
-    def llm_function(prompt_text):
+    def llm_function(prompt_text, **kwargs):
         messages = [{"role": "user", "content": prompt_text}]
-        return chat_completion(messages)
-    
+        return chat_completion(messages, agent_type=agent_type, **{**default_kwargs, **kwargs})
+
     return llm_function
 
- 
+def create_async_llm_function(agent_type=None, **default_kwargs):
+    """
+    创建一个异步LLM函数，用于agent的异步方法中 await 调用。
+    传入 on_token 回调时以流式方式调用，每收到一段增量文本就回调一次，最终仍返回完整文本；
+    on_token 返回 False 时提前结束流式读取，返回已收到的文本。
+    """
+    async def llm_function(prompt_text, on_token=None, **kwargs):
+        messages = [{"role": "user", "content": prompt_text}]
+        params = {**default_kwargs, **kwargs}
+        if on_token is None:
+            return await async_chat_completion(messages, agent_type=agent_type, **params)
+        parts = []
+        stream = async_stream_chat_completion(messages, agent_type=agent_type, **params)
+        try:
+            async for token in stream:
+                parts.append(token)
+                result = on_token(token)
+                if inspect.isawaitable(result):
+                    result = await result
+                if result is False:
+                    break
+        finally:
+            await stream.aclose()
+        return "".join(parts)
+
+    return llm_function
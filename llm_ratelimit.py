@@ -0,0 +1,280 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from llm_tokens import count_message_tokens, current_project
+
+# 每个端点的默认每分钟请求数/token数上限，0 表示不限制
+default_rpm = int(os.getenv('LLM_RPM', '0'))
+default_tpm = int(os.getenv('LLM_TPM', '0'))
+# 按端点或模型单独设置，如 {"endpoint:default": {"rpm": 500, "tpm": 200000}, "model:gpt-4o": {"tpm": 30000}}
+rate_limits = json.loads(os.getenv('LLM_RATE_LIMITS', '{}'))
+# 请求未指定 max_tokens 时预估的回复token数，收到回复后按实际用量修正
+completion_estimate = int(os.getenv('LLM_RATE_COMPLETION_ESTIMATE', '512'))
+
+def estimate_request_tokens(messages, kwargs, model=None):
+    """预估一次请求占用的token数：prompt token + 回复上限"""
+    completion = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or completion_estimate
+    return count_message_tokens(messages, model) + completion
+
+class TokenBucket:
+    """令牌桶：容量为每分钟配额，按秒匀速补充"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """还需等待多少秒才能取出 amount 个令牌（超过容量的请求按容量计算，避免永远等待）"""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta):
+        """按实际用量修正（多用的记为欠账，少用的退回）"""
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+class Grant:
+    """一次获准的请求，收到回复后调用 settle 按实际token数修正TPM令牌桶"""
+
+    def __init__(self, limiter, tpm_buckets, estimate):
+        self._limiter = limiter
+        self._tpm_buckets = tpm_buckets
+        self.estimate = estimate
+
+    def settle(self, actual_tokens):
+        if actual_tokens is None or not self._tpm_buckets:
+            return
+        with self._limiter._lock:
+            for bucket in self._tpm_buckets:
+                bucket.adjust(actual_tokens - self.estimate)
+
+class _Waiter:
+    __slots__ = ("project", "seq", "keys", "buckets", "tokens", "wake")
+
+    def __init__(self, project, seq, keys, buckets, tokens, wake):
+        self.project = project
+        self.seq = seq
+        self.keys = keys
+        # 请求涉及的有上限的令牌桶 (key, kind)，只有共用令牌桶的请求之间才需要排队
+        self.buckets = buckets
+        self.tokens = tokens
+        self.wake = wake
+
+class RateLimiter:
+    """按端点和模型的RPM/TPM令牌桶限流，排队请求在项目之间公平轮转。
+
+    每个项目一个等待队列，最久未被服务的项目优先；按令牌桶分别轮转：一个请求在令牌不足时等待补充，
+    与它共用令牌桶的后续请求不能插队，从而保证一个大型工作流不会饿死其他项目。
+    不共用令牌桶的请求（如发往另一个端点）不受影响，一个端点被限流不会阻塞其他端点。
+    同步与异步调用共用同一套队列。
+    """
+
+    def __init__(self, limits=None, rpm=0, tpm=0):
+        self.limits = limits or {}
+        self.default_rpm = rpm
+        self.default_tpm = tpm
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._queues = {}
+        self._last_served = {}
+        self._seq = 0
+        self._stats = {"requests": 0, "queued": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(rate_limits, default_rpm, default_tpm)
+
+    def _limit(self, key, kind):
+        configured = self.limits.get(key, {})
+        if kind in configured:
+            return int(configured[kind])
+        # 默认配额只作用于端点（每个API key一份），模型配额需显式配置
+        if key.startswith("endpoint:"):
+            return self.default_rpm if kind == "rpm" else self.default_tpm
+        return 0
+
+    def _bucket(self, key, kind):
+        """返回 (key, kind) 对应的令牌桶，未设置上限时返回None（调用时需持有锁）"""
+        if (key, kind) not in self._buckets:
+            limit = self._limit(key, kind)
+            self._buckets[(key, kind)] = TokenBucket(limit) if limit > 0 else None
+        return self._buckets[(key, kind)]
+
+    def _buckets_for(self, keys):
+        rpm = [b for b in (self._bucket(key, "rpm") for key in keys) if b is not None]
+        tpm = [b for b in (self._bucket(key, "tpm") for key in keys) if b is not None]
+        return rpm, tpm
+
+    def _ordered(self):
+        """所有等待中的请求按服务顺序排列：最久未被服务的项目优先，项目内先进先出"""
+        return sorted(
+            (waiter for queue in self._queues.values() for waiter in queue),
+            key=lambda w: (self._last_served.get(w.project, self._queues[w.project][0].seq), w.seq)
+        )
+
+    def _heads(self):
+        """轮到的请求：排在它前面的请求都不与它共用令牌桶（每个令牌桶各有一个队首）"""
+        heads, claimed = [], set()
+        for waiter in self._ordered():
+            if not waiter.buckets & claimed:
+                heads.append(waiter)
+            claimed |= waiter.buckets
+        return heads
+
+    def _wake_heads(self, heads, skip=None):
+        for head in heads:
+            if head is not skip:
+                head.wake()
+
+    def _enqueue(self, keys, tokens, wake):
+        with self._lock:
+            self._seq += 1
+            rpm = [(key, "rpm") for key in keys if self._bucket(key, "rpm") is not None]
+            tpm = [(key, "tpm") for key in keys if self._bucket(key, "tpm") is not None]
+            waiter = _Waiter(current_project.get(), self._seq, keys, frozenset(rpm + tpm), tokens, wake)
+            self._queues.setdefault(waiter.project, deque()).append(waiter)
+            self._stats["requests"] += 1
+            heads = self._heads()
+        self._wake_heads(heads, skip=waiter)
+        return waiter
+
+    def _try_acquire(self, waiter):
+        """尝试为 waiter 取令牌：成功返回 (0, Grant)；未轮到返回 (None, None)；令牌不足返回 (等待秒数, None)"""
+        with self._lock:
+            if waiter not in self._heads():
+                return None, None
+            rpm, tpm = self._buckets_for(waiter.keys)
+            now = time.monotonic()
+            delay = max([b.wait_time(1, now) for b in rpm] + [b.wait_time(waiter.tokens, now) for b in tpm] + [0.0])
+            if delay > 0:
+                return delay, None
+            for bucket in rpm:
+                bucket.take(1)
+            for bucket in tpm:
+                bucket.take(waiter.tokens)
+            self._remove(waiter)
+            self._seq += 1
+            self._last_served[waiter.project] = self._seq
+            grant = Grant(self, tpm, waiter.tokens)
+            heads = self._heads()
+        self._wake_heads(heads)
+        return 0.0, grant
+
+    def _remove(self, waiter):
+        queue = self._queues.get(waiter.project)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._queues[waiter.project]
+                self._last_served.pop(waiter.project, None)
+
+    def _cancel(self, waiter):
+        with self._lock:
+            self._remove(waiter)
+            heads = self._heads()
+        self._wake_heads(heads)
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self._stats["total_wait"] += waited
+            if waited > 0.001:
+                self._stats["queued"] += 1
+            self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+
+    def _unlimited(self, keys):
+        with self._lock:
+            rpm, tpm = self._buckets_for(keys)
+        return not rpm and not tpm
+
+    def acquire(self, endpoint, model, tokens):
+        """阻塞直到该端点/模型的配额允许发出一次约 tokens 个token的请求"""
+        keys = (f"endpoint:{endpoint}", f"model:{model}")
+        if self._unlimited(keys):
+            return Grant(self, [], tokens)
+        event = threading.Event()
+        waiter = self._enqueue(keys, tokens, event.set)
+        started = time.monotonic()
+        try:
+            while True:
+                delay, grant = self._try_acquire(waiter)
+                if grant is not None:
+                    return grant
+                event.wait(delay)
+                event.clear()
+        except BaseException:
+            self._cancel(waiter)
+            raise
+        finally:
+            self._record_wait(time.monotonic() - started)
+
+    async def acquire_async(self, endpoint, model, tokens):
+        """acquire 的异步版本，等待期间不阻塞事件循环"""
+        keys = (f"endpoint:{endpoint}", f"model:{model}")
+        if self._unlimited(keys):
+            return Grant(self, [], tokens)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = self._enqueue(keys, tokens, lambda: loop.call_soon_threadsafe(event.set))
+        started = time.monotonic()
+        try:
+            while True:
+                delay, grant = self._try_acquire(waiter)
+                if grant is not None:
+                    return grant
+                # 不用 wait_for：它在被唤醒的同时被取消时可能吞掉取消（Python 3.11及以前）
+                wakeup = asyncio.ensure_future(event.wait())
+                try:
+                    await asyncio.wait((wakeup,), timeout=delay)
+                finally:
+                    wakeup.cancel()
+                event.clear()
+        except BaseException:
+            self._cancel(waiter)
+            raise
+        finally:
+            self._record_wait(time.monotonic() - started)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            waiting = {str(project): len(queue) for project, queue in self._queues.items()}
+            buckets = {}
+            for (key, kind), bucket in self._buckets.items():
+                if bucket is not None:
+                    bucket._refill(now)
+                    buckets.setdefault(key, {})[kind] = {"limit": int(bucket.capacity), "available": int(bucket.tokens)}
+        stats["avg_wait"] = round(stats["total_wait"] / stats["requests"], 4) if stats["requests"] else 0.0
+        stats["total_wait"] = round(stats["total_wait"], 3)
+        stats["max_wait"] = round(stats["max_wait"], 3)
+        stats["waiting"] = waiting
+        stats["buckets"] = buckets
+        return stats
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """返回进程内共享的限流器"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter.from_env()
+    return _limiter
+
+def get_rate_limit_stats():
+    """返回限流排队统计（排队次数、平均/最大等待秒数、各项目等待数）及各令牌桶余量"""
+    return get_rate_limiter().snapshot()
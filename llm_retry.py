@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# 超时：默认值及按Agent类型覆盖（秒）
+default_timeout = float(os.getenv('LLM_TIMEOUT', '60'))
+agent_timeouts = {k: float(v) for k, v in json.loads(os.getenv('LLM_TIMEOUTS', '{}')).items()}
+# 重试：最多尝试次数（含首次）及指数退避参数
+max_attempts = int(os.getenv('LLM_MAX_ATTEMPTS', '3'))
+backoff_base = float(os.getenv('LLM_BACKOFF_BASE', '0.5'))
+backoff_max = float(os.getenv('LLM_BACKOFF_MAX', '8'))
+# 对冲请求：对列出的Agent类型，首个请求超过其p95延迟仍未返回时再发一个相同请求，取先返回者
+hedge_agents = {a.strip() for a in os.getenv('LLM_HEDGE_AGENTS', 'parser').split(',') if a.strip()}
+hedge_min_delay = float(os.getenv('LLM_HEDGE_MIN_DELAY', '0.2'))
+hedge_default_delay = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '2.0'))
+hedge_min_samples = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+                    "TimeoutException", "ConnectError", "ReadTimeout", "TimeoutError"}
+
+def timeout_for(agent_type):
+    return agent_timeouts.get(agent_type, default_timeout)
+
+def is_retryable(error):
+    """超时、连接错误、429及5xx可重试；参数错误等4xx直接抛出"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    return type(error).__name__ in _RETRYABLE_NAMES or isinstance(error, (TimeoutError, ConnectionError))
+
+def _retry_after(error):
+    """读取429/503响应中的Retry-After秒数"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, error=None):
+    """第 attempt 次重试前的等待秒数：full jitter 指数退避，服务端给出 Retry-After 时以其为下限"""
+    delay = random.uniform(0, min(backoff_max, backoff_base * (2 ** attempt)))
+    retry_after = _retry_after(error) if error is not None else None
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, backoff_max))
+    return delay
+
+class LatencyTracker:
+    """按Agent类型保留最近的成功调用延迟，用于计算对冲延迟"""
+
+    def __init__(self, window=200):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.window = window
+
+    def record(self, agent_type, seconds):
+        with self._lock:
+            self._samples.setdefault(agent_type, deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, agent_type, q):
+        with self._lock:
+            samples = sorted(self._samples.get(agent_type, ()))
+        if not samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def count(self, agent_type):
+        with self._lock:
+            return len(self._samples.get(agent_type, ()))
+
+_latency = LatencyTracker()
+_stats = {"calls": 0, "retries": 0, "timeouts": 0, "failures": 0, "hedges_fired": 0, "hedge_wins": 0}
+_stats_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=int(os.getenv('LLM_HEDGE_WORKERS', '16')), thread_name_prefix="llm-hedge")
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def hedge_delay(agent_type):
+    """对冲延迟：样本充足时取该Agent的p95延迟，否则使用默认值"""
+    if _latency.count(agent_type) < hedge_min_samples:
+        return hedge_default_delay
+    return max(_latency.quantile(agent_type, 0.95), hedge_min_delay)
+
+def get_retry_stats():
+    """返回重试/超时/对冲统计及各Agent的p50、p95延迟"""
+    with _stats_lock:
+        stats = dict(_stats)
+    with _latency._lock:
+        agents = list(_latency._samples)
+    stats["latency"] = {
+        agent or "default": {"p50": _latency.quantile(agent, 0.5), "p95": _latency.quantile(agent, 0.95)}
+        for agent in agents
+    }
+    return stats
+
+def _timed(request, agent_type, timeout):
+    started = time.monotonic()
+    result = request(timeout)
+    _latency.record(agent_type, time.monotonic() - started)
+    return result
+
+def _hedged(request, agent_type, timeout):
+    """先发一个请求，超过对冲延迟仍未返回时再发一个，返回先成功的结果"""
+    # 请求在线程池中执行，复制当前上下文以保留项目归属等上下文变量
+    primary = _hedge_executor.submit(contextvars.copy_context().run, _timed, request, agent_type, timeout)
+    done, _ = wait([primary], timeout=hedge_delay(agent_type))
+    if done:
+        return primary.result()
+    _count("hedges_fired")
+    hedge = _hedge_executor.submit(contextvars.copy_context().run, _timed, request, agent_type, timeout)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    _count("hedge_wins")
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+def call_with_policy(request, agent_type=None, hedge=None):
+    """按超时、重试和对冲策略执行一次LLM请求。
+
+    :param request: request(timeout) 发起一次请求并返回结果
+    :param hedge: 是否对冲，默认按 LLM_HEDGE_AGENTS 判断
+    """
+    timeout = timeout_for(agent_type)
+    hedge = agent_type in hedge_agents if hedge is None else hedge
+    _count("calls")
+    for attempt in range(max_attempts):
+        try:
+            if hedge:
+                return _hedged(request, agent_type, timeout)
+            return _timed(request, agent_type, timeout)
+        except Exception as e:
+            if type(e).__name__ in ("APITimeoutError", "TimeoutException", "ReadTimeout", "TimeoutError"):
+                _count("timeouts")
+            if attempt + 1 >= max_attempts or not is_retryable(e):
+                _count("failures")
+                raise
+            _count("retries")
+            time.sleep(backoff_delay(attempt, e))
+
+async def _atimed(request, agent_type, timeout):
+    started = time.monotonic()
+    result = await request(timeout)
+    _latency.record(agent_type, time.monotonic() - started)
+    return result
+
+async def _ahedged(request, agent_type, timeout):
+    primary = asyncio.ensure_future(_atimed(request, agent_type, timeout))
+    done, _ = await asyncio.wait([primary], timeout=hedge_delay(agent_type))
+    if done:
+        return primary.result()
+    _count("hedges_fired")
+    hedge = asyncio.ensure_future(_atimed(request, agent_type, timeout))
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _count("hedge_wins")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        # 取消仍在进行的另一个请求
+        for task in pending:
+            task.cancel()
+
+async def acall_with_policy(request, agent_type=None, hedge=None):
+    """call_with_policy 的异步版本，request(timeout) 返回可等待对象"""
+    timeout = timeout_for(agent_type)
+    hedge = agent_type in hedge_agents if hedge is None else hedge
+    _count("calls")
+    for attempt in range(max_attempts):
+        try:
+            if hedge:
+                return await _ahedged(request, agent_type, timeout)
+            return await _atimed(request, agent_type, timeout)
+        except Exception as e:
+            if type(e).__name__ in ("APITimeoutError", "TimeoutException", "ReadTimeout", "TimeoutError"):
+                _count("timeouts")
+            if attempt + 1 >= max_attempts or not is_retryable(e):
+                _count("failures")
+                raise
+            _count("retries")
+            await asyncio.sleep(backoff_delay(attempt, e))
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from llm_retry import _retry_after
+
+# 全局默认模型（llm_module、api/config、BaseAgent 统一从这里读取）
+DEFAULT_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+# 模型档位：fast 用于解析/规划等结构化小任务，strong 用于长文档撰写；未配置时都使用默认模型
+MODEL_TIERS = {
+    "fast": os.getenv('LLM_FAST_MODEL', DEFAULT_MODEL),
+    "strong": os.getenv('LLM_STRONG_MODEL', DEFAULT_MODEL),
+}
+AGENT_TIERS = {
+    "parser": "fast",
+    "taskplanner": "fast",
+    "prdwriter": "strong",
+}
+# 按Agent类型直接指定模型，优先级高于档位，如 {"researcher": "gpt-4o"}
+agent_models = json.loads(os.getenv('LLM_AGENT_MODELS', '{}'))
+# 端点被限流或超时后暂停分配的秒数（响应带 Retry-After 时以其为准）
+endpoint_cooldown = float(os.getenv('LLM_ENDPOINT_COOLDOWN', '30'))
+# 请求耗时超过该秒数视为端点变慢，按冷却时间的一半暂停分配
+slow_threshold = float(os.getenv('LLM_SLOW_THRESHOLD', '30'))
+
+def resolve_model(agent_type=None):
+    """返回某个Agent类型应使用的模型"""
+    if agent_type in agent_models:
+        return agent_models[agent_type]
+    tier = AGENT_TIERS.get(agent_type)
+    return MODEL_TIERS.get(tier, DEFAULT_MODEL) if tier else DEFAULT_MODEL
+
+class Endpoint:
+    """一个上游端点（base_url + api_key），带权重、可服务的模型列表和健康状态"""
+
+    def __init__(self, name, base_url, api_key, weight=1, models=None):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.weight = max(float(weight), 0)
+        self.models = set(models) if models else None
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.failovers = 0
+        self.latency = None
+
+    def serves(self, model):
+        return self.models is None or model in self.models
+
+    def available(self, now):
+        return self.cooldown_until <= now
+
+    def snapshot(self, now):
+        return {
+            "base_url": self.base_url,
+            "weight": self.weight,
+            "models": sorted(self.models) if self.models else "*",
+            "requests": self.requests,
+            "failures": self.failures,
+            "cooling_down": max(self.cooldown_until - now, 0),
+            "failovers": self.failovers,
+            "avg_latency": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+def _is_rate_limited(error):
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+def _is_unhealthy(error):
+    """限流、超时、连接失败、5xx 说明端点本身有问题，应切换到其他端点"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in ("APITimeoutError", "APIConnectionError", "TimeoutException", "ConnectError",
+                                    "ReadTimeout") or isinstance(error, (TimeoutError, ConnectionError))
+
+class LLMRouter:
+    """按权重在多个端点间分配请求，被限流/变慢/出错的端点暂时移出候选，实现故障切换。
+
+    每次重试都会重新选择端点，配合 llm_retry 的重试即可切换到健康的端点。
+    """
+
+    def __init__(self, endpoints):
+        if not endpoints:
+            raise ValueError("LLMRouter requires at least one endpoint")
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """从 LLM_ENDPOINTS 读取端点列表，未配置时使用 OPENAI_API_BASE/OPENAI_API_KEY 单端点"""
+        configured = json.loads(os.getenv('LLM_ENDPOINTS', '[]'))
+        if not configured:
+            configured = [{
+                "name": "default",
+                "base_url": os.getenv('OPENAI_API_BASE', 'https://xiaoai.plus/v1'),
+                "api_key": os.getenv('OPENAI_API_KEY', 'sk-xxx'),
+            }]
+        endpoints = [
+            Endpoint(
+                name=item.get("name") or f"endpoint-{i}",
+                base_url=item["base_url"],
+                # 支持 api_key_env 从其他环境变量读取密钥，避免把密钥写进JSON
+                api_key=item.get("api_key") or os.getenv(item.get("api_key_env", ""), "") or os.getenv('OPENAI_API_KEY', 'sk-xxx'),
+                weight=item.get("weight", 1),
+                models=item.get("models"),
+            )
+            for i, item in enumerate(configured)
+        ]
+        return cls(endpoints)
+
+    def select(self, model):
+        """按权重随机选择一个可服务该模型且未在冷却中的端点；都在冷却时选最早恢复的"""
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.serves(model)] or self.endpoints
+            healthy = [e for e in candidates if e.available(now) and e.weight > 0]
+            if not healthy:
+                return min(candidates, key=lambda e: e.cooldown_until)
+            total = sum(e.weight for e in healthy)
+            point = random.uniform(0, total)
+            for endpoint in healthy:
+                point -= endpoint.weight
+                if point <= 0:
+                    return endpoint
+            return healthy[-1]
+
+    def record_success(self, endpoint, seconds):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.latency = seconds if endpoint.latency is None else 0.8 * endpoint.latency + 0.2 * seconds
+            if seconds > slow_threshold and len(self.endpoints) > 1:
+                endpoint.cooldown_until = time.monotonic() + endpoint_cooldown / 2
+
+    def record_failure(self, endpoint, error):
+        with self._lock:
+            endpoint.requests += 1
+            endpoint.failures += 1
+            if not _is_unhealthy(error) or len(self.endpoints) == 1:
+                return
+            cooldown = endpoint_cooldown
+            if _is_rate_limited(error):
+                cooldown = _retry_after(error) or cooldown
+            endpoint.cooldown_until = time.monotonic() + cooldown
+            endpoint.failovers += 1
+
+    @contextmanager
+    def track(self, endpoint):
+        """记录在该端点上的一次请求结果"""
+        started = time.monotonic()
+        try:
+            yield endpoint
+        except Exception as e:
+            self.record_failure(endpoint, e)
+            raise
+        self.record_success(endpoint, time.monotonic() - started)
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return {e.name: e.snapshot(now) for e in self.endpoints}
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_router():
+    """返回进程内共享的路由器"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter.from_env()
+    return _router
+
+def get_router_stats():
+    """返回各Agent类型使用的模型及各端点的请求数、失败数、冷却状态和平均延迟"""
+    agents = set(AGENT_TIERS) | set(agent_models)
+    return {
+        "models": {agent: resolve_model(agent) for agent in sorted(agents)},
+        "default_model": DEFAULT_MODEL,
+        "endpoints": get_router().snapshot(),
+    }
@@ -0,0 +1,197 @@
+import os
+import re
+import json
+import inspect
+import threading
+
+# JSON模式：auto 请求 response_format=json_object，后端不支持（返回400）时自动关闭；on 始终请求；off 不请求
+json_mode_setting = os.getenv('LLM_JSON_MODE', 'auto').lower()
+# 修复重试时最多回传的原始输出字符数
+repair_max_chars = int(os.getenv('LLM_JSON_REPAIR_MAX_CHARS', '6000'))
+
+_CODE_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+_json_mode_supported = True
+_stats = {"direct": 0, "extracted": 0, "repaired": 0, "failed": 0, "json_mode_fallbacks": 0}
+_stats_lock = threading.Lock()
+
+class StructuredOutputError(ValueError):
+    """LLM输出（含一次修复重试）中没有可解析的JSON"""
+
+    def __init__(self, message, raw=""):
+        super().__init__(message)
+        self.raw = raw
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+def get_structured_stats():
+    """返回JSON解析结果统计：直接解析、从文本中提取、修复重试后成功、失败次数"""
+    with _stats_lock:
+        return dict(_stats, json_mode=json_mode_setting if _json_mode_supported else "unsupported")
+
+class JSONStreamExtractor:
+    """增量JSON提取器：逐段喂入文本，第一个括号平衡的JSON对象/数组闭合时即可取得结果。
+
+    会跳过JSON之前的说明文字和代码块标记，并正确处理字符串中的括号和转义字符。
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+        self.done = False
+        self.result = None
+
+    def feed(self, chunk):
+        """喂入一段文本；已提取到完整JSON时返回True"""
+        if self.done:
+            return True
+        for char in chunk:
+            if not self._started:
+                if char not in "{[":
+                    continue
+                self._started = True
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    candidate = "".join(self._buffer)
+                    parsed = _loads(candidate)
+                    if parsed is not None:
+                        self.done = True
+                        self.result = parsed
+                        return True
+                    # 括号平衡但不是合法JSON（如说明文字中的 [注]），丢弃后继续寻找
+                    self._reset()
+        return False
+
+    def _reset(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._started = False
+
+def _loads(text):
+    """宽松解析：允许对象/数组末尾多余的逗号，失败返回None"""
+    for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(parsed, (dict, list)):
+            return parsed
+    return None
+
+def extract_json(text):
+    """从LLM输出中提取第一个JSON对象/数组（容忍代码块、前后说明文字），失败返回None"""
+    if not isinstance(text, str):
+        return text if isinstance(text, (dict, list)) else None
+    parsed = _loads(text.strip())
+    if parsed is not None:
+        return parsed
+    for block in _CODE_FENCE.findall(text):
+        parsed = _loads(block.strip())
+        if parsed is not None:
+            return parsed
+    extractor = JSONStreamExtractor()
+    extractor.feed(text)
+    return extractor.result
+
+def json_mode_kwargs():
+    """需要请求JSON模式时返回对应的调用参数"""
+    if json_mode_setting == "off" or (json_mode_setting == "auto" and not _json_mode_supported):
+        return {}
+    return {"response_format": {"type": "json_object"}}
+
+def _is_json_mode_rejected(error):
+    """后端以400拒绝response_format参数"""
+    return getattr(error, "status_code", None) == 400 and "response_format" in str(error)
+
+def _disable_json_mode():
+    global _json_mode_supported
+    _json_mode_supported = False
+    _record("json_mode_fallbacks")
+
+def build_repair_prompt(raw):
+    return (
+        "下面的内容应当是一个JSON，但无法被解析。请修复它，只输出修复后的JSON，不要任何说明或代码块标记：\n"
+        f"{raw[:repair_max_chars]}"
+    )
+
+def _finish(parsed, raw, outcome):
+    if parsed is None:
+        _record("failed")
+        raise StructuredOutputError(f"LLM response is not valid JSON: {str(raw)[:200]}...", raw)
+    _record(outcome)
+    return parsed
+
+def _first_outcome(raw):
+    """整体即为合法JSON记为 direct，需要从说明文字/代码块中提取记为 extracted"""
+    return "direct" if isinstance(raw, str) and _loads(raw.strip()) is not None else "extracted"
+
+def complete_json(llm_function, prompt, **kwargs):
+    """调用LLM并解析JSON：优先使用JSON模式，解析失败时进行一次修复重试，仍失败抛出 StructuredOutputError"""
+    params = {**json_mode_kwargs(), **kwargs}
+    try:
+        raw = llm_function(prompt, **params)
+    except Exception as e:
+        if "response_format" not in params or not _is_json_mode_rejected(e):
+            raise
+        _disable_json_mode()
+        params.pop("response_format")
+        raw = llm_function(prompt, **params)
+
+    parsed = extract_json(raw)
+    if parsed is not None:
+        return _finish(parsed, raw, _first_outcome(raw))
+
+    repaired = llm_function(build_repair_prompt(str(raw)), **{**params, "temperature": 0})
+    return _finish(extract_json(repaired), raw, "repaired")
+
+async def complete_json_async(llm_function, prompt, on_token=None, **kwargs):
+    """complete_json 的异步版本。传入 on_token 时以流式调用，JSON一闭合即停止接收后续文本"""
+    params = {**json_mode_kwargs(), **kwargs}
+    extractor = JSONStreamExtractor()
+
+    async def stream_handler(token):
+        result = on_token(token)
+        if inspect.isawaitable(result):
+            await result
+        # 返回False通知 llm_function 提前结束流式读取（JSON之后的说明文字无需再等）
+        return not extractor.feed(token)
+
+    handler = stream_handler if on_token is not None else None
+    try:
+        raw = await llm_function(prompt, on_token=handler, **params)
+    except Exception as e:
+        if "response_format" not in params or not _is_json_mode_rejected(e):
+            raise
+        _disable_json_mode()
+        params.pop("response_format")
+        extractor = JSONStreamExtractor()
+        raw = await llm_function(prompt, on_token=handler, **params)
+
+    parsed = extractor.result if extractor.done else extract_json(raw)
+    if parsed is not None:
+        return _finish(parsed, raw, _first_outcome(raw))
+
+    repaired = await llm_function(build_repair_prompt(str(raw)), **{**params, "temperature": 0})
+    return _finish(extract_json(repaired), raw, "repaired")
@@ -0,0 +1,118 @@
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# 可选依赖：安装tiktoken时使用BPE分词器精确计数，否则使用启发式估算。
+# tiktoken 首次使用某个编码时会下载BPE文件（缓存到 TIKTOKEN_CACHE_DIR）；离线部署需预先放好缓存，
+# 加载失败时记录下来，之后该模型一直使用启发式估算，不再重复尝试下载
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_encodings = {}
+_encodings_lock = threading.Lock()
+# 编码加载失败的标记
+_UNAVAILABLE = object()
+
+# 当前调用所属的项目ID，由 track_project 设置（DAG阶段在线程池/asyncio任务中执行时会继承）
+current_project = ContextVar("llm_current_project", default=None)
+
+def _load_encoding(model):
+    if not model:
+        return tiktoken.get_encoding("cl100k_base")
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # 未知模型使用通用编码
+        return _encoding_for(None)
+
+def _encoding_for(model):
+    """返回模型的编码，不可用时返回None。加载（可能下载）在锁外进行，锁只保护缓存字典"""
+    encoding = _encodings.get(model)
+    if encoding is None:
+        try:
+            loaded = _load_encoding(model)
+        except Exception:
+            loaded = None
+        with _encodings_lock:
+            encoding = _encodings.setdefault(model, _UNAVAILABLE if loaded is None else loaded)
+    return None if encoding is _UNAVAILABLE else encoding
+
+def count_tokens(text, model=None):
+    """统计文本的token数：tiktoken可用时精确计数，否则中日韩字符按每字1个token，其余按每4个字符1个token估算"""
+    if not text:
+        return 0
+    encoding = _encoding_for(model) if tiktoken is not None else None
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def count_message_tokens(messages, model=None):
+    """统计对话消息的prompt token数（每条消息另计4个格式token，回复起始另计2个）"""
+    total = 2
+    for message in messages:
+        content = message.get("content")
+        total += 4 + count_tokens(content if isinstance(content, str) else str(content or ""), model)
+    return total
+
+class TokenLedger:
+    """按Agent类型和项目累计prompt/completion token数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._agents = {}
+        self._projects = {}
+
+    @staticmethod
+    def _add(totals, key, prompt_tokens, completion_tokens):
+        entry = totals.setdefault(key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += prompt_tokens
+        entry["completion_tokens"] += completion_tokens
+
+    def record(self, agent_type, prompt_tokens, completion_tokens, project_id=None):
+        with self._lock:
+            self._add(self._agents, agent_type or "default", prompt_tokens, completion_tokens)
+            if project_id is not None:
+                self._add(self._projects, project_id, prompt_tokens, completion_tokens)
+
+    def project_usage(self, project_id):
+        with self._lock:
+            return dict(self._projects.get(project_id, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}))
+
+    def pop_project(self, project_id):
+        """取出并清除某个项目的累计用量（写入数据库后调用，避免内存增长）"""
+        with self._lock:
+            return self._projects.pop(project_id, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+
+    def snapshot(self):
+        with self._lock:
+            agents = {agent: dict(usage) for agent, usage in self._agents.items()}
+            active_projects = len(self._projects)
+        return {
+            "tokenizer": "tiktoken" if tiktoken is not None else "heuristic",
+            "agents": agents,
+            "active_projects": active_projects,
+        }
+
+_ledger = TokenLedger()
+
+def get_token_ledger():
+    return _ledger
+
+def record_usage(agent_type, prompt_tokens, completion_tokens):
+    """记录一次LLM调用的token用量，归属到当前Agent类型和当前项目"""
+    _ledger.record(agent_type, prompt_tokens, completion_tokens, current_project.get())
+
+@contextmanager
+def track_project(project_id):
+    """在该上下文中发起的LLM调用都计入 project_id"""
+    token = current_project.set(project_id)
+    try:
+        yield
+    finally:
+        current_project.reset(token)
@@ -0,0 +1,59 @@
+"""离线批量运行AI参谋团工作流。
+
+从JSONL（每行 {"id": ..., "message": ...}）或CSV（含 id、message 列）读取消息，
+经 MessageParser 解析后并发执行完整工作流，相同目标只执行一次，结果逐条追加写入JSONL。
+中断后以相同参数重新运行即可续跑：已完成的条目被跳过，未完成的条目沿用原项目和已完成阶段的检查点。
+
+用法：
+    python scripts/batch_workflows.py goals.jsonl                          # 结果写入 goals.results.jsonl
+    python scripts/batch_workflows.py goals.csv -o results.jsonl --workers 8 --engine direct
+    python scripts/batch_workflows.py goals.jsonl --restart                # 忽略已有结果，从头开始
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+from ai_thinktank_mvp.workflows.batch import BatchRunner, read_items  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量运行AI参谋团工作流")
+    parser.add_argument("input", help="输入文件（.jsonl 或 .csv）")
+    parser.add_argument("-o", "--output", help="结果JSONL文件，默认为 <输入文件名>.results.jsonl")
+    parser.add_argument("--format", choices=["auto", "jsonl", "csv"], default="auto", help="输入格式")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKFLOW_WORKERS", "4")), help="并发执行的工作流数")
+    parser.add_argument("--engine", choices=["crewai", "direct"], help="执行引擎，默认取 WORKFLOW_ENGINE 配置")
+    parser.add_argument("--no-reuse", action="store_true", help="不复用近重复历史需求的结果")
+    parser.add_argument("--db-batch-size", type=int, default=200, help="每个事务批量创建的项目数")
+    parser.add_argument("--restart", action="store_true", help="清空已有结果文件，从头开始")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    items = read_items(args.input, args.format)
+    print(f"读取 {len(items)} 条消息，结果写入 {output}")
+
+    started = time.monotonic()
+
+    def report(record):
+        print(f"[{record['status']}] {record['id']}" + (f" -> 项目 #{record['project_id']}" if record.get("project_id") else ""))
+
+    runner = BatchRunner(
+        output,
+        workers=args.workers,
+        engine=args.engine,
+        reuse_similar=not args.no_reuse,
+        db_batch_size=args.db_batch_size,
+        restart=args.restart,
+        on_record=report
+    )
+    summary = runner.run(items)
+    print(f"\n完成，用时 {time.monotonic() - started:.1f}s：" + "，".join(f"{k}={v}" for k, v in summary.items()))
+    return 1 if summary.get("failed") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
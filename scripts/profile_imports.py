@@ -0,0 +1,83 @@
+"""API进程冷启动导入耗时分析。
+
+在子进程中以 ``python -X importtime`` 导入目标模块，汇总各模块的累计导入耗时，
+用于确认重量级依赖（crewai、litellm等）没有在启动阶段被导入。
+
+用法：
+    python scripts/profile_imports.py                                  # 分析 ai_thinktank_mvp.api.main
+    python scripts/profile_imports.py -m ai_thinktank_mvp.workflows.crewai_workflow --top 30
+    python scripts/profile_imports.py --raw importtime.log             # 同时保存原始输出
+"""
+from typing import List, Tuple
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# 启动阶段不应出现的重量级模块
+HEAVY_MODULES = ["crewai", "litellm", "openai", "ai_thinktank_mvp.agents", "ai_thinktank_mvp.workflows.crewai_workflow"]
+
+_LINE_PATTERN = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_importtime(module: str) -> Tuple[str, List[Tuple[str, int, int, int]]]:
+    """返回 (原始stderr, [(模块名, 自身耗时us, 累计耗时us, 嵌套层级)])"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [ROOT_DIR, os.path.join(ROOT_DIR, "ai_thinktank_mvp"), env.get("PYTHONPATH", "")]
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _LINE_PATTERN.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    if proc.returncode != 0:
+        # 导入失败时也输出已收集的耗时，便于定位
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))
+        print(f"导入 {module} 失败：\n{tail}", file=sys.stderr)
+    return proc.stderr, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分析模块导入耗时（-X importtime）")
+    parser.add_argument("-m", "--module", default="ai_thinktank_mvp.api.main", help="要导入的模块")
+    parser.add_argument("--top", type=int, default=20, help="显示累计耗时最高的前N个模块")
+    parser.add_argument("--raw", help="将原始 -X importtime 输出保存到该文件")
+    args = parser.parse_args()
+
+    raw, entries = run_importtime(args.module)
+    if args.raw:
+        with open(args.raw, "w", encoding="utf-8") as f:
+            f.write(raw)
+    if not entries:
+        print("没有采集到导入耗时数据")
+        return 1
+
+    total_us = sum(self_us for _, self_us, _, _ in entries)
+    print(f"模块: {args.module}")
+    print(f"导入模块数: {len(entries)}，总导入耗时: {total_us / 1000:.1f} ms\n")
+
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for name, self_us, cumulative_us, _ in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {name}")
+
+    imported = {name for name, _, _, _ in entries}
+    heavy = [m for m in HEAVY_MODULES if any(n == m or n.startswith(m + ".") for n in imported)]
+    print()
+    if heavy:
+        print("⚠️ 启动阶段导入了重量级模块: " + ", ".join(heavy))
+    else:
+        print("✅ 启动阶段未导入重量级模块")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import sys
+import os
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.workflows.batch import BatchRunner, ResultWriter, load_results, read_items
+
+def fake_parse(message):
+    if message == "你好":
+        return {"should_execute": False}
+    return {"should_execute": True, "user_goal": message.replace("我想", ""), "user_context": ""}
+
+class FakeStore:
+    def __init__(self, fail=()):
+        self.next_id = 0
+        self.batches = []
+        self.executed = []
+        self.fail = set(fail)
+
+    def create(self, goals):
+        self.batches.append(len(goals))
+        ids = list(range(self.next_id + 1, self.next_id + len(goals) + 1))
+        self.next_id += len(goals)
+        return ids
+
+    def execute(self, goal, context, project_id, reuse_similar=True, engine=None):
+        self.executed.append((goal, project_id))
+        if goal in self.fail:
+            raise RuntimeError("upstream error")
+        return {"project_id": project_id, "workflow_result": f"报告：{goal}"}
+
+def test_read_items_supports_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "goals.jsonl"
+    jsonl.write_text('{"id": "a", "message": "开发电商网站"}\n\n"在线教育平台"\n', encoding="utf-8")
+    csv_file = tmp_path / "goals.csv"
+    csv_file.write_text("id,message\nx,开发电商网站\ny,\n", encoding="utf-8")
+    assert read_items(str(jsonl)) == [{"id": "a", "message": "开发电商网站"}, {"id": "2", "message": "在线教育平台"}]
+    assert read_items(str(csv_file)) == [{"id": "x", "message": "开发电商网站"}]
+
+def test_batch_deduplicates_and_bulk_creates(tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    items = [
+        {"id": "1", "message": "我想开发电商网站"},
+        {"id": "2", "message": "开发电商网站"},
+        {"id": "3", "message": "在线教育平台"},
+        {"id": "4", "message": "你好"},
+    ]
+    store = FakeStore()
+    summary = BatchRunner(output, workers=2, db_batch_size=10, parse=fake_parse,
+                          create=store.create, execute=store.execute).run(items)
+    assert summary["completed"] == 2 and summary["duplicate"] == 1 and summary["skipped"] == 1
+    assert store.batches == [2]
+    results = load_results(output)
+    assert {results["1"].get("duplicate_of"), results["2"].get("duplicate_of")} in ({None, "1"}, {None, "2"})
+
+def test_batch_does_not_merge_goals_differing_in_inner_words(tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    items = [{"id": "1", "message": "开发一个UI设计工具"}, {"id": "2", "message": "开发一个UI工具"}]
+    store = FakeStore()
+    summary = BatchRunner(output, parse=fake_parse, create=store.create, execute=store.execute).run(items)
+    assert summary["completed"] == 2 and summary.get("duplicate", 0) == 0
+
+def test_batch_resumes_failed_items_in_existing_project(tmp_path):
+    output = str(tmp_path / "out.jsonl")
+    items = [{"id": "1", "message": "电商网站"}, {"id": "2", "message": "在线教育平台"}]
+    first = FakeStore(fail={"在线教育平台"})
+    assert BatchRunner(output, parse=fake_parse, create=first.create, execute=first.execute).run(items)["failed"] == 1
+    failed_project = load_results(output)["2"]["project_id"]
+    # 模拟中断：最后一行写了一半
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"id": "2", "sta')
+
+    second = FakeStore()
+    summary = BatchRunner(output, parse=fake_parse, create=second.create, execute=second.execute).run(items)
+    assert summary["resumed_done"] == 1 and summary["completed"] == 1
+    assert second.batches == [] and second.executed == [("在线教育平台", failed_project)]
+    with open(output, encoding="utf-8") as f:
+        assert json.loads(f.readlines()[-1])["status"] == "completed"
+
+def test_result_writer_drops_truncated_non_ascii_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    complete = json.dumps({"id": "1", "status": "completed", "goal": "中文目标"}, ensure_ascii=False) + "\n"
+    # 中断在多字节字符中间："中" 的UTF-8编码只写入了前两个字节
+    output.write_bytes(complete.encode("utf-8") + '{"id": "2", "goal": "中'.encode("utf-8")[:-1])
+
+    writer = ResultWriter(str(output))
+    writer.write({"id": "2", "status": "completed", "goal": "中文"})
+    writer.close()
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == ["1", "2"]
+
+    # 最后一条记录完整、只缺换行时保留并补上换行
+    output.write_text(complete + json.dumps({"id": "3", "status": "started"}), encoding="utf-8")
+    ResultWriter(str(output)).close()
+    assert set(load_results(str(output))) == {"1", "3"}
+    assert output.read_text(encoding="utf-8").endswith("\n")
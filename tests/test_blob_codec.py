@@ -0,0 +1,51 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from ai_thinktank_mvp.models import blob_codec
+from ai_thinktank_mvp.models.blob_codec import compress, content_hash, decompress
+
+REPORT = "# PRD文档\n\n## 1. 产品概述\n" + "在线教育平台的核心功能包括课程学习、作业提交与学习报告。\n" * 80
+
+def test_content_hash_is_stable_and_content_addressed():
+    assert content_hash(REPORT) == content_hash(str(REPORT))
+    assert content_hash(REPORT) != content_hash(REPORT + " ")
+    assert len(content_hash("")) == 64
+
+def test_round_trip_compresses_large_content():
+    codec, data = compress(REPORT)
+    assert codec in ("zlib", "zstd")
+    assert len(data) < len(REPORT.encode("utf-8")) / 5
+    assert decompress(codec, data) == REPORT
+
+def test_small_content_and_zlib_setting(monkeypatch):
+    assert compress("短文本") == ("raw", "短文本".encode("utf-8"))
+    monkeypatch.setattr(blob_codec, "OUTPUT_COMPRESSION", "zlib")
+    codec, data = compress(REPORT)
+    assert codec == "zlib" and decompress(codec, data) == REPORT
+    with pytest.raises(ValueError):
+        decompress("lz4", data)
+
+def test_concurrent_identical_blobs_do_not_conflict(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from sqlalchemy.orm import sessionmaker
+    from ai_thinktank_mvp.models import database
+    from ai_thinktank_mvp.models.project import AgentOutput, ContentBlob, _insert_blob
+
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    database.init_db(engine)
+    Session = sessionmaker(bind=engine)
+    first, second = Session(), Session()
+    try:
+        # 两个会话都检查到blob不存在后再写入（并发写入相同内容）
+        _insert_blob(first, content_hash(REPORT), REPORT)
+        first.commit()
+        _insert_blob(second, content_hash(REPORT), REPORT)
+        second.add(AgentOutput(type="text", content=REPORT))
+        second.commit()
+
+        assert second.query(ContentBlob).count() == 1
+        assert second.query(AgentOutput).one().content == REPORT
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,29 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+
+from ai_thinktank_mvp.models import database
+
+TABLES = {"projects", "tasks", "agent_outputs", "content_blobs", "project_search"}
+
+def test_init_db_creates_all_tables_on_empty_database(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    database.init_db(engine)
+    assert TABLES <= set(sqlalchemy.inspect(engine).get_table_names())
+    # 重复执行不报错
+    database.init_db(engine)
+
+def test_api_startup_creates_tables(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("dotenv")
+    from fastapi.testclient import TestClient
+    from ai_thinktank_mvp.api.main import app
+
+    engine = database.create_db_engine(f"sqlite:///{tmp_path / 'startup.db'}")
+    monkeypatch.setattr(database, "engine", engine)
+    with TestClient(app) as client:
+        assert client.get("/ping").json() == {"status": "ok"}
+    assert TABLES <= set(sqlalchemy.inspect(engine).get_table_names())
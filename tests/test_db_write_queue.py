@@ -0,0 +1,65 @@
+import sys
+import os
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from ai_thinktank_mvp.models.write_queue import DBWriteQueue
+
+class FakeSession:
+    """记录已提交的写入，模拟事务提交/回滚"""
+    committed = []
+    commits = 0
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.pending = []
+
+    def add(self, value):
+        self.pending.append(value)
+
+    def flush(self):
+        pass
+
+    def commit(self):
+        with FakeSession.lock:
+            FakeSession.committed.extend(self.pending)
+            FakeSession.commits += 1
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def reset_session():
+    FakeSession.committed = []
+    FakeSession.commits = 0
+
+def test_writes_are_batched_into_one_transaction():
+    write_queue = DBWriteQueue(FakeSession, batch_size=50, batch_delay=0.2)
+    futures = [write_queue.submit(lambda session, i=i: session.add(i) or i) for i in range(20)]
+    assert [future.result(2) for future in futures] == list(range(20))
+    write_queue.close()
+    assert FakeSession.committed == list(range(20))
+    assert FakeSession.commits < 20
+    assert write_queue.stats()["ops"] == 20
+
+def test_failed_op_does_not_discard_others():
+    write_queue = DBWriteQueue(FakeSession, batch_size=50, batch_delay=0.2)
+
+    def broken(session):
+        session.add("broken")
+        raise ValueError("bad row")
+
+    ok_before = write_queue.submit(lambda session: session.add("a"))
+    bad = write_queue.submit(broken)
+    ok_after = write_queue.submit(lambda session: session.add("b"))
+    ok_before.result(2)
+    ok_after.result(2)
+    with pytest.raises(ValueError):
+        bad.result(2)
+    write_queue.close()
+    assert FakeSession.committed == ["a", "b"]
+    assert write_queue.stats()["failed_ops"] == 1
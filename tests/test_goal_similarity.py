@@ -0,0 +1,55 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.utils.similarity import GoalSimilarityIndex, context_key, is_reusable_goal, normalize_goal
+
+def test_normalize_goal_strips_filler_phrases():
+    assert normalize_goal("我想做个AI写作助手！") == normalize_goal("开发一个AI写作助手")
+
+def test_filler_phrases_are_only_stripped_from_the_start():
+    assert normalize_goal("我想做一个请假申请系统") == "请假申请系统"
+    assert normalize_goal("开发一个UI设计工具") == "ui设计工具"
+    assert normalize_goal("构建一个数据构建平台") == "数据构建平台"
+    # 动作词只去掉一次，"设计工具"中的"设计"是目标本身
+    assert normalize_goal("我想做一个设计工具") == "设计工具"
+    assert normalize_goal("请帮我设计一个Logo生成器") == "logo生成器"
+
+def test_goals_differing_in_inner_words_do_not_match():
+    index = GoalSimilarityIndex(threshold=0.8)
+    index.add(1, "开发一个UI设计工具")
+    assert index.query("开发一个UI工具") is None
+    index.add(2, "做一个请假申请系统")
+    assert index.query("做一个申请系统") is None
+
+def test_near_duplicate_goals_match():
+    index = GoalSimilarityIndex(threshold=0.8)
+    index.add(1, "开发一个AI写作助手")
+    index.add(2, "开发一个在线教育平台")
+    assert index.query("我想做个AI写作助手") == (1, 1.0)
+    assert index.query("我要开发一个智能客服系统") is None
+
+def test_threshold_can_be_overridden_per_query():
+    index = GoalSimilarityIndex(threshold=0.95)
+    index.add(7, "开发一个在线教育平台")
+    assert index.query("做一个在线教育平台网站") is None
+    doc_id, similarity = index.query("做一个在线教育平台网站", threshold=0.5)
+    assert doc_id == 7 and 0.5 <= similarity < 0.95
+
+def test_filler_only_and_short_goals_are_not_reused():
+    assert normalize_goal("我想开发一个") == ""
+    assert not is_reusable_goal("我想开发一个")
+    assert not is_reusable_goal("做个AI")
+    assert is_reusable_goal("开发一个AI写作助手")
+
+    index = GoalSimilarityIndex(threshold=0.8)
+    index.add(1, "帮我做一个")
+    assert len(index) == 0
+    index.add(2, "开发一个AI写作助手")
+    assert index.query("我想开发一个") is None
+
+def test_matches_are_limited_to_the_same_user_context():
+    index = GoalSimilarityIndex(threshold=0.8)
+    index.add(1, "开发一个AI写作助手", group=context_key("预算10万，3个月上线"))
+    assert index.query("做个AI写作助手", group=context_key("预算10万, 3个月上线")) == (1, 1.0)
+    assert index.query("做个AI写作助手", group=context_key("预算50万，团队5人")) is None
+    assert index.query("做个AI写作助手") is None
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import gzip
+from ai_thinktank_mvp.api.compression import CompressionMiddleware, choose_encoding
+from ai_thinktank_mvp.api.http_cache import etag_matches, make_etag
+
+REPORT = ("# 评估报告\n" + "项目可行性较高，建议先完成MVP验证核心需求。\n" * 200).encode("utf-8")
+
+def make_app(body_chunks, content_type=b"application/json", extra_headers=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type), (b"content-length", str(sum(map(len, body_chunks))).encode()),
+                                *extra_headers]})
+        for index, chunk in enumerate(body_chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(body_chunks) - 1})
+    return app
+
+def run(app, accept_encoding=b"gzip", raw_headers=False):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressionMiddleware(app, minimum_size=1024, brotli_enabled=False)(scope, None, send))
+    headers = sent[0]["headers"] if raw_headers else dict(sent[0]["headers"])
+    return headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+def test_compresses_large_single_body_responses():
+    headers, body = run(make_app([REPORT]))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(body) < len(REPORT)
+    assert gzip.decompress(body) == REPORT
+
+def test_skips_small_streaming_and_unaccepted_responses():
+    headers, body = run(make_app([b'{"status": "ok"}']))
+    assert b"content-encoding" not in headers and body == b'{"status": "ok"}'
+
+    events = [b"data: " + REPORT + b"\n\n", b"data: done\n\n"]
+    headers, body = run(make_app(events, b"text/event-stream"))
+    assert b"content-encoding" not in headers and body == b"".join(events)
+
+    headers, body = run(make_app([REPORT]), accept_encoding=b"identity")
+    assert b"content-encoding" not in headers and body == REPORT
+
+    assert choose_encoding("gzip;q=0, deflate", brotli_enabled=False) == ""
+    assert choose_encoding("*", brotli_enabled=False) == "gzip"
+
+def test_vary_is_merged_only_into_compressed_responses():
+    headers, _ = run(make_app([REPORT], extra_headers=[(b"vary", b"Origin")]), raw_headers=True)
+    assert [v for k, v in headers if k == b"vary"] == [b"Origin, Accept-Encoding"]
+
+    headers, _ = run(make_app([REPORT], extra_headers=[(b"vary", b"accept-encoding")]), raw_headers=True)
+    assert [v for k, v in headers if k == b"vary"] == [b"accept-encoding"]
+
+    # 未压缩（低于阈值或SSE）的响应原样透传
+    headers, _ = run(make_app([b'{"status": "ok"}'], extra_headers=[(b"vary", b"Origin")]), raw_headers=True)
+    assert [v for k, v in headers if k == b"vary"] == [b"Origin"]
+    headers, _ = run(make_app([REPORT], b"text/event-stream"))
+    assert b"vary" not in headers
+
+def test_etag_matching_is_weak_and_handles_lists():
+    etag = make_etag("status", 7, 12)
+    assert etag == 'W/"status-7-12"'
+    assert etag_matches('"status-7-12"', etag)
+    assert etag_matches('W/"status-7-11", W/"status-7-12"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('W/"status-7-11"', etag)
+    assert not etag_matches(None, etag)
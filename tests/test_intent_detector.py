@@ -0,0 +1,34 @@
+import sys
+import os
+import json
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.utils.intent_detector import AhoCorasick, IntentDetector
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    matches = sorted(automaton.iter_matches("ushers"))
+    assert matches == [(3, "he"), (3, "she"), (5, "hers")]
+
+def test_project_messages_are_detected():
+    detector = IntentDetector()
+    assert detector.detect("我想开发一个在线教育平台")["should_execute"]
+    assert detector.detect("帮我做个APP，要有聊天功能")["should_execute"]
+    assert not detector.detect("你好")["should_execute"]
+
+def test_weak_and_negative_keywords():
+    detector = IntentDetector()
+    assert not detector.detect("我需要休息一下了")["should_execute"]
+    result = detector.detect("算了，不需要开发这个系统了")
+    assert not result["should_execute"]
+    assert "算了" in result["negatives"]
+
+def test_config_file_overrides_defaults(tmp_path):
+    config = tmp_path / "intent.json"
+    config.write_text(json.dumps({"keywords": {"方案": 2.0}, "negative_keywords": {}, "threshold": 2.0}), encoding="utf-8")
+    detector = IntentDetector.from_config(str(config))
+    assert detector.detect("给我一个营销方案吧")["should_execute"]
+    assert not detector.detect("我想开发一个网站")["should_execute"]
+
+def test_detect_many():
+    results = IntentDetector().detect_many(["你好", "开发一个智能客服系统"])
+    assert [r["should_execute"] for r in results] == [False, True]
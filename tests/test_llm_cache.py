@@ -0,0 +1,41 @@
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm_cache import LLMCache, make_cache_key
+
+def test_cache_key_ignores_formatting_noise():
+    a = make_cache_key("gpt-4o-mini", [{"role": "user", "content": "  你好  \r\n世界 "}], {"temperature": 0})
+    b = make_cache_key("gpt-4o-mini", [{"role": "user", "content": "你好\n世界"}], {"temperature": 0, "stream": True})
+    c = make_cache_key("gpt-4o-mini", [{"role": "user", "content": "你好\n世界"}], {"temperature": 0.7})
+    assert a == b
+    assert a != c
+
+def test_only_deterministic_calls_are_cacheable_by_default():
+    cache = LLMCache(agent_ttls={"prdwriter": 0})
+    assert cache.is_cacheable("parser", {"temperature": 0})
+    assert not cache.is_cacheable("parser", {})
+    assert not cache.is_cacheable("prdwriter", {"temperature": 0})
+    assert LLMCache(cache_sampled=True).is_cacheable("researcher", {})
+
+def test_lru_eviction_and_ttl():
+    cache = LLMCache(max_entries=2, agent_ttls={"short": 0.01})
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    cache.set("d", "4", agent_type="short")
+    time.sleep(0.02)
+    assert cache.get("d") is None
+    stats = cache.stats()
+    assert stats["evictions"] >= 1
+    assert stats["memory_hits"] == 2
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    LLMCache(db_path=db_path).set("k", "持久化内容")
+    cache = LLMCache(db_path=db_path)
+    assert cache.get("k") == "持久化内容"
+    assert cache.stats()["disk_hits"] == 1
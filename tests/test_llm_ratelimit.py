@@ -0,0 +1,83 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from llm_ratelimit import RateLimiter, TokenBucket
+from llm_tokens import track_project
+
+def test_token_bucket_waits_and_settles():
+    bucket = TokenBucket(600)
+    now = bucket.updated
+    assert bucket.wait_time(100, now) == 0
+    bucket.take(600)
+    assert abs(bucket.wait_time(10, now) - 1.0) < 1e-6
+    bucket.adjust(-50)
+    assert abs(bucket.tokens - 50) < 1e-6
+
+def test_unlimited_limiter_does_not_queue():
+    limiter = RateLimiter()
+    grant = limiter.acquire("default", "m", 100)
+    grant.settle(80)
+    assert limiter.snapshot()["requests"] == 0
+
+def test_queue_is_fair_across_projects():
+    limiter = RateLimiter(rpm=1200)
+    limiter.acquire("default", "m", 1)
+    with limiter._lock:
+        limiter._bucket("endpoint:default", "rpm").tokens = 0
+    order = []
+
+    def worker(project):
+        with track_project(project):
+            limiter.acquire("default", "m", 1)
+        order.append(project)
+
+    threads = []
+    for project in ["big"] * 5 + ["small"]:
+        thread = threading.Thread(target=worker, args=(project,))
+        thread.start()
+        threads.append(thread)
+        while sum(len(q) for q in limiter._queues.values()) < len(threads) and len(order) == 0:
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(5)
+    assert sorted(order) == ["big"] * 5 + ["small"]
+    # 小项目不必等大项目的全部请求完成
+    assert order.index("small") <= 2
+
+def test_async_acquire_waits_for_tokens():
+    limiter = RateLimiter(tpm=1200)
+
+    async def run():
+        await limiter.acquire_async("default", "m", 1200)
+        started = time.monotonic()
+        await limiter.acquire_async("default", "m", 2)
+        return time.monotonic() - started
+
+    waited = asyncio.run(run())
+    assert 0.05 < waited < 1.0
+    assert limiter.snapshot()["queued"] >= 1
+
+def test_throttled_endpoint_does_not_block_other_endpoints():
+    limiter = RateLimiter(tpm=600)
+
+    async def run():
+        await limiter.acquire_async("a", "m", 600)
+        # 端点a的TPM已用完，该请求需等待约一分钟
+        blocked = asyncio.ensure_future(limiter.acquire_async("a", "m", 600))
+        await asyncio.sleep(0.02)
+        started = time.monotonic()
+        await asyncio.wait_for(limiter.acquire_async("b", "m", 100), 1.0)
+        waited = time.monotonic() - started
+        assert not blocked.done()
+        blocked.cancel()
+        try:
+            await blocked
+        except asyncio.CancelledError:
+            pass
+        return waited
+
+    assert asyncio.run(run()) < 0.1
+    assert limiter.snapshot()["waiting"] == {}
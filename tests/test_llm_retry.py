@@ -0,0 +1,79 @@
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+import llm_retry
+from llm_retry import call_with_policy, acall_with_policy, is_retryable, backoff_delay
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_retry, "backoff_base", 0.001)
+    monkeypatch.setattr(llm_retry, "backoff_max", 0.01)
+    monkeypatch.setattr(llm_retry, "max_attempts", 3)
+
+def test_retryable_errors_are_retried_with_timeout():
+    calls = []
+
+    def request(timeout):
+        calls.append(timeout)
+        if len(calls) < 3:
+            raise StatusError(429)
+        return "ok"
+
+    assert call_with_policy(request, "researcher", hedge=False) == "ok"
+    assert calls == [llm_retry.timeout_for("researcher")] * 3
+
+def test_non_retryable_errors_raise_immediately():
+    calls = []
+
+    def request(timeout):
+        calls.append(timeout)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        call_with_policy(request, "researcher", hedge=False)
+    assert len(calls) == 1
+    assert is_retryable(StatusError(503)) and is_retryable(TimeoutError())
+    assert not is_retryable(ValueError())
+
+def test_backoff_is_capped():
+    assert all(0 <= backoff_delay(attempt) <= llm_retry.backoff_max for attempt in range(10))
+
+def test_hedged_request_returns_first_response(monkeypatch):
+    monkeypatch.setattr(llm_retry, "hedge_default_delay", 0.05)
+    calls = []
+
+    def request(timeout):
+        calls.append(timeout)
+        # 第一个请求卡住，对冲请求很快返回
+        time.sleep(1.0 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    started = time.monotonic()
+    assert call_with_policy(request, "hedge-test", hedge=True) == 2
+    assert time.monotonic() - started < 0.8
+    assert llm_retry.get_retry_stats()["hedge_wins"] >= 1
+
+def test_async_hedge_cancels_slower_request(monkeypatch):
+    monkeypatch.setattr(llm_retry, "hedge_default_delay", 0.05)
+    cancelled = []
+
+    async def request(timeout):
+        first = not cancelled
+        cancelled.append(False)
+        try:
+            await asyncio.sleep(1.0 if first else 0.01)
+        except asyncio.CancelledError:
+            cancelled[0] = True
+            raise
+        return "hedge"
+
+    assert asyncio.run(acall_with_policy(request, "hedge-test", hedge=True)) == "hedge"
+    assert cancelled[0] is True
@@ -0,0 +1,44 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+import llm_router
+from llm_router import Endpoint, LLMRouter, resolve_model
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+def test_agents_map_to_model_tiers(monkeypatch):
+    monkeypatch.setattr(llm_router, "MODEL_TIERS", {"fast": "small", "strong": "large"})
+    monkeypatch.setattr(llm_router, "agent_models", {"researcher": "search-model"})
+    assert resolve_model("parser") == "small"
+    assert resolve_model("taskplanner") == "small"
+    assert resolve_model("prdwriter") == "large"
+    assert resolve_model("researcher") == "search-model"
+    assert resolve_model("chiefmind") == llm_router.DEFAULT_MODEL
+
+def test_select_respects_weights_and_models():
+    heavy = Endpoint("heavy", "https://a", "k1", weight=3)
+    light = Endpoint("light", "https://b", "k2", weight=1)
+    special = Endpoint("special", "https://c", "k3", weight=100, models=["large"])
+    router = LLMRouter([heavy, light, special])
+    picks = [router.select("small").name for _ in range(2000)]
+    assert "special" not in picks
+    assert 0.65 < picks.count("heavy") / len(picks) < 0.85
+    assert router.select("large").name in ("heavy", "light", "special")
+
+def test_rate_limited_endpoint_fails_over():
+    primary = Endpoint("primary", "https://a", "k1", weight=1000)
+    backup = Endpoint("backup", "https://b", "k2", weight=1)
+    router = LLMRouter([primary, backup])
+    with pytest.raises(StatusError):
+        with router.track(primary):
+            raise StatusError(429)
+    assert all(router.select("m") is backup for _ in range(50))
+    # 参数错误不影响端点健康
+    with pytest.raises(StatusError):
+        with router.track(backup):
+            raise StatusError(400)
+    assert backup.available(float("inf")) and backup.failures == 1 and backup.failovers == 0
@@ -0,0 +1,65 @@
+import sys
+import os
+import asyncio
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+import llm_structured
+from llm_structured import JSONStreamExtractor, StructuredOutputError, complete_json, complete_json_async, extract_json
+
+def test_extract_json_tolerates_prose_and_code_fences():
+    assert extract_json('{"a": 1}') == {"a": 1}
+    assert extract_json('好的，结果如下：\n```json\n{"a": [1, 2],}\n```\n希望有帮助') == {"a": [1, 2]}
+    assert extract_json('说明[注] 然后 {"goal": "含有}括号的\\"字符串"} 以及 {"b": 2}') == {"goal": '含有}括号的"字符串'}
+    assert extract_json("没有JSON") is None
+
+def test_stream_extractor_completes_as_tokens_arrive():
+    extractor = JSONStreamExtractor()
+    chunks = ["以下是结果：", '{"tasks": [{"name"', ': "设计"}', "]}", "后面的说明"]
+    done_at = [extractor.feed(chunk) for chunk in chunks]
+    assert done_at == [False, False, False, True, True]
+    assert extractor.result == {"tasks": [{"name": "设计"}]}
+
+def test_complete_json_repairs_once(monkeypatch):
+    monkeypatch.setattr(llm_structured, "json_mode_setting", "off")
+    calls = []
+
+    def llm(prompt, **kwargs):
+        calls.append(kwargs)
+        return "{'a': 1" if len(calls) == 1 else '{"a": 1}'
+
+    assert complete_json(llm, "prompt") == {"a": 1}
+    assert len(calls) == 2 and calls[1]["temperature"] == 0
+
+    with pytest.raises(StructuredOutputError):
+        complete_json(lambda prompt, **kwargs: "still broken", "prompt")
+
+def test_complete_json_falls_back_when_json_mode_rejected(monkeypatch):
+    monkeypatch.setattr(llm_structured, "json_mode_setting", "auto")
+    monkeypatch.setattr(llm_structured, "_json_mode_supported", True)
+
+    class BadRequest(Exception):
+        status_code = 400
+
+    def llm(prompt, **kwargs):
+        if "response_format" in kwargs:
+            raise BadRequest("response_format is not supported")
+        return '{"ok": true}'
+
+    assert complete_json(llm, "prompt") == {"ok": True}
+    assert llm_structured.json_mode_kwargs() == {}
+
+def test_async_stream_stops_after_json_closes(monkeypatch):
+    monkeypatch.setattr(llm_structured, "json_mode_setting", "off")
+    received = []
+
+    async def llm(prompt, on_token=None, **kwargs):
+        parts = []
+        for token in ['{"a":', ' 1}', " 之后的说明", "不应被读取"]:
+            parts.append(token)
+            if await on_token(token) is False:
+                break
+        return "".join(parts)
+
+    result = asyncio.run(complete_json_async(llm, "prompt", on_token=received.append))
+    assert result == {"a": 1}
+    assert received == ['{"a":', ' 1}']
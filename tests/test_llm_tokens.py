@@ -0,0 +1,47 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import llm_tokens
+from llm_tokens import TokenLedger, count_message_tokens, count_tokens, current_project, track_project
+
+def test_count_tokens_is_local_and_monotonic():
+    assert count_tokens("") == 0
+    assert count_tokens("开发一个AI写作助手") > 0
+    assert count_tokens("需求" * 100) > count_tokens("需求" * 10)
+    assert count_message_tokens([{"role": "user", "content": "你好"}]) > count_tokens("你好")
+
+def test_heuristic_counts_cjk_per_character(monkeypatch):
+    monkeypatch.setattr(llm_tokens, "tiktoken", None)
+    assert count_tokens("写作助手") == 4
+    assert count_tokens("abcdefgh") == 2
+
+def test_failed_encoding_download_is_cached(monkeypatch):
+    calls = []
+
+    class OfflineTiktoken:
+        @staticmethod
+        def get_encoding(name):
+            calls.append(name)
+            raise OSError("network unreachable")
+
+        @staticmethod
+        def encoding_for_model(model):
+            raise KeyError(model)
+
+    monkeypatch.setattr(llm_tokens, "tiktoken", OfflineTiktoken)
+    monkeypatch.setattr(llm_tokens, "_encodings", {})
+    # 下载失败后使用启发式估算，且之后不再重复尝试
+    assert count_tokens("写作助手") == 4
+    assert count_tokens("abcdefgh", model="unknown-model") == 2
+    assert count_tokens("写作助手") == 4
+    assert calls == ["cl100k_base"]
+
+def test_ledger_attributes_usage_to_agent_and_project():
+    ledger = TokenLedger()
+    with track_project(7):
+        ledger.record("prdwriter", 100, 20, current_project.get())
+    ledger.record("prdwriter", 50, 5, current_project.get())
+    assert current_project.get() is None
+    assert ledger.snapshot()["agents"]["prdwriter"] == {"calls": 2, "prompt_tokens": 150, "completion_tokens": 25}
+    assert ledger.pop_project(7) == {"calls": 1, "prompt_tokens": 100, "completion_tokens": 20}
+    assert ledger.project_usage(7)["calls"] == 0
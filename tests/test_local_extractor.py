@@ -0,0 +1,26 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.utils.local_extractor import LocalMessageExtractor
+
+def test_greeting_is_not_a_project():
+    result = LocalMessageExtractor().extract("你好")
+    assert result["should_execute"] is False
+    assert result["confidence"] >= 0.8
+
+def test_goal_and_context_are_extracted_locally():
+    result = LocalMessageExtractor().extract("我想做个AI写作助手，我是程序员，预算10万，3个月上线")
+    assert result["should_execute"] is True
+    assert result["user_goal"] == "开发一个AI写作助手"
+    assert result["user_context"] == "用户是程序员，预算10万，希望3个月上线"
+    assert result["confidence"] >= 0.8
+
+def test_team_and_timeline_context():
+    result = LocalMessageExtractor().extract("我要开发一个智能客服系统，团队有3人，计划半年内完成")
+    assert result["user_goal"] == "开发一个智能客服系统"
+    assert result["user_context"] == "团队有3人，计划半年内完成"
+
+def test_irregular_project_message_has_low_confidence():
+    result = LocalMessageExtractor().extract("最近在考虑能不能把我们的CRM系统升级一下，感觉不太好用")
+    assert result["should_execute"] is True
+    assert result["confidence"] < 0.8
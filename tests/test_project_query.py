@@ -0,0 +1,28 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import datetime
+import pytest
+from ai_thinktank_mvp.models.project_query import DEFAULT_FIELDS, decode_cursor, encode_cursor, parse_fields
+from ai_thinktank_mvp.models.search import fts5_match, split_terms
+
+def test_cursor_round_trip():
+    created_at = datetime.datetime(2026, 10, 18, 9, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_parse_fields_always_includes_id():
+    assert parse_fields(None) == list(DEFAULT_FIELDS)
+    assert parse_fields("name, status,name") == ["id", "name", "status"]
+    assert parse_fields("stages,id") == ["id", "stages"]
+    with pytest.raises(ValueError):
+        parse_fields("name,content")
+
+def test_fts5_match_quotes_terms_and_skips_short_ones():
+    terms = split_terms('  AI写作助手  "电商" 教育 ')
+    assert terms == ["AI写作助手", '"电商"', "教育"]
+    assert fts5_match(terms) == '"AI写作助手" """电商"""'
+    assert fts5_match(["教育"]) is None
@@ -0,0 +1,62 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.workflows.stage_inputs import StageInputBuilder, parse_requirements, summarize, truncate
+from llm_tokens import count_tokens
+
+REQUIREMENTS = {
+    "refined_requirements": "面向中小学生的在线编程教育平台",
+    "user_persona": "8-15岁学生及其家长",
+    "project_scope": "Web端课程学习与作业提交",
+    "key_features": ["图形化编程", "在线评测", "学习报告"],
+    "technical_considerations": "浏览器内代码沙箱",
+    "risk_assessment": "内容合规" * 200,
+}
+
+def test_parse_requirements_from_fenced_json():
+    text = "分析如下：\n```json\n{\"project_scope\": \"Web端\"}\n```"
+    assert parse_requirements(text) == {"project_scope": "Web端"}
+    assert parse_requirements("不是JSON") == {"refined_requirements": "不是JSON"}
+
+def test_parse_requirements_from_surrounding_text():
+    text = '需求如下 {"key_features": ["评测"], "note": "含}括号"} 以上'
+    assert parse_requirements(text) == {"key_features": ["评测"], "note": "含}括号"}
+    # JSON数组不是需求字段，整体作为细化需求
+    assert parse_requirements('["a", "b"]') == {"refined_requirements": '["a", "b"]'}
+
+def test_stage_receives_only_needed_fields():
+    builder = StageInputBuilder()
+    text = builder.market_research({"requirements": REQUIREMENTS})
+    assert "项目范围：Web端课程学习与作业提交" in text
+    assert "- 在线评测" in text
+    # 市场调研不需要技术考虑和风险评估
+    assert "浏览器内代码沙箱" not in text
+    assert "内容合规" not in text
+
+def test_downstream_outputs_are_compacted_to_budget():
+    builder = StageInputBuilder({"market_research": 100, "evaluation": 50})
+    inputs = {"requirements": REQUIREMENTS, "market_research": "市场" * 500}
+    _, market_report = builder.prd(inputs)
+    assert market_report.startswith("市场" * 50)
+    assert "已截断900字" in market_report
+
+    evaluation = builder.evaluation(inputs)
+    assert all(len(text) < 80 for text in evaluation.values())
+
+def test_unstructured_requirements_fall_back_to_whole_text():
+    builder = StageInputBuilder({"requirements": 10})
+    assert builder.task_plan({"requirements": {"error": "x" * 50}}).startswith('{"error": ')
+
+def test_summarize_keeps_headings_and_first_sentences():
+    text = "# 竞品分析\n竞品A占据主导。其余份额分散。\n\n## 趋势\nAI辅导快速增长。家长付费意愿提升。"
+    summary = summarize(text, 40)
+    assert "# 竞品分析" in summary and "## 趋势" in summary
+    assert "其余份额分散" not in summary
+    assert truncate("短文本", 10) == "短文本"
+
+def test_stage_token_budget_scales_down_inputs():
+    inputs = {name: "长文本" * 1000 for name in ["requirements", "task_plan", "market_research", "prd", "tool_selection"]}
+    unlimited = StageInputBuilder(token_budgets={"evaluation": 0}).evaluation(inputs)
+    limited = StageInputBuilder(token_budgets={"evaluation": 1000}).evaluation(inputs)
+    assert sum(count_tokens(text) for text in unlimited.values()) > 1000
+    assert sum(count_tokens(text) for text in limited.values()) <= 1000
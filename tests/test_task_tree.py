@@ -0,0 +1,55 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.models.task_tree import (
+    ancestor_paths, build_tree, flatten_plan, parent_path, subtree_bounds
+)
+
+PLAN = {
+    "project": "AI写作助手",
+    "stages": [
+        {"name": "需求分析", "description": "明确目标用户", "tasks": [
+            {"name": "用户调研", "subtasks": ["访谈", "问卷"]},
+            {"name": "竞品分析"},
+        ]},
+        {"name": "开发", "tasks": [{"title": "后端API"}]},
+    ]
+}
+
+def test_flatten_plan_assigns_preorder_paths():
+    nodes = flatten_plan(PLAN)
+    assert [(n["path"], n["name"]) for n in nodes] == [
+        ("0001", "需求分析"),
+        ("0001.0001", "用户调研"),
+        ("0001.0001.0001", "访谈"),
+        ("0001.0001.0002", "问卷"),
+        ("0001.0002", "竞品分析"),
+        ("0002", "开发"),
+        ("0002.0001", "后端API"),
+    ]
+    assert nodes[0]["description"] == "明确目标用户"
+    assert [n["depth"] for n in nodes] == [1, 2, 3, 3, 2, 1, 2]
+    # 路径的字符串顺序即先序遍历顺序
+    assert sorted(n["path"] for n in nodes) == [n["path"] for n in nodes]
+
+def test_flatten_plan_accepts_name_keyed_dicts():
+    nodes = flatten_plan({"阶段一：准备": ["搭建环境", "准备数据"], "阶段二：上线": "部署到生产环境"})
+    assert [(n["path"], n["name"]) for n in nodes] == [
+        ("0001", "阶段一：准备"), ("0001.0001", "搭建环境"), ("0001.0002", "准备数据"), ("0002", "阶段二：上线")
+    ]
+    assert nodes[-1]["description"] == "部署到生产环境"
+    assert flatten_plan({"error": "LLM function is not available"}) == []
+
+def test_build_tree_and_path_helpers():
+    tree = build_tree(flatten_plan(PLAN))
+    assert [node["name"] for node in tree] == ["需求分析", "开发"]
+    assert [child["name"] for child in tree[0]["children"][0]["children"]] == ["访谈", "问卷"]
+
+    # 子树：父节点不在结果中的节点作为根
+    lower, upper = subtree_bounds("0001")
+    subtree = [n for n in flatten_plan(PLAN) if n["path"] == "0001" or lower < n["path"] < upper]
+    assert [n["path"] for n in subtree] == ["0001", "0001.0001", "0001.0001.0001", "0001.0001.0002", "0001.0002"]
+    assert len(build_tree(subtree[1:])) == 2
+
+    assert ancestor_paths("0001.0002.0003") == ["0001.0002", "0001"]
+    assert parent_path("0001") is None
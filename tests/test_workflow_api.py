@@ -0,0 +1,61 @@
+import sys
+import os
+import types
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from ai_thinktank_mvp.api import workflow_api
+
+class FakeParser:
+    async def parse_message_async(self, message):
+        return {"should_execute": True, "user_goal": message, "user_context": ""}
+
+class FakeWorkflow:
+    def __init__(self):
+        self.calls = []
+
+    def execute_full_workflow(self, user_goal, user_context="", reuse_similar=True, engine=None):
+        self.calls.append(("sync", engine))
+        return {"project_id": 1, "workflow_result": "crewai", "individual_outputs": {}}
+
+    async def execute_full_workflow_async(self, user_goal, user_context="", reuse_similar=True):
+        self.calls.append(("async", None))
+        return {"project_id": 2, "workflow_result": "direct", "individual_outputs": {}}
+
+@pytest.fixture
+def chat(monkeypatch):
+    workflow = FakeWorkflow()
+    # message_parser 依赖 openai，测试中替换为固定的解析结果
+    monkeypatch.setitem(sys.modules, "ai_thinktank_mvp.utils.message_parser",
+                        types.SimpleNamespace(MessageParser=FakeParser))
+    monkeypatch.setattr(workflow_api, "get_workflow", lambda db: workflow)
+    app = FastAPI()
+    app.include_router(workflow_api.router)
+    app.dependency_overrides[workflow_api.get_db] = lambda: None
+
+    def post(**body):
+        response = TestClient(app).post("/workflow/chat", json={"message": "开发一个AI写作助手", **body})
+        assert response.status_code == 200
+        return response.json()["workflow_result"], workflow.calls.pop()
+
+    return post
+
+@pytest.mark.parametrize("configured, expected", [
+    ("crewai", ("crewai", ("sync", "crewai"))),
+    ("direct", ("direct", ("async", None))),
+])
+def test_chat_without_engine_uses_configured_engine(chat, monkeypatch, configured, expected):
+    monkeypatch.setattr(workflow_api, "WORKFLOW_ENGINE", configured)
+    assert chat() == expected
+
+def test_chat_engine_overrides_config(chat, monkeypatch):
+    monkeypatch.setattr(workflow_api, "WORKFLOW_ENGINE", "crewai")
+    assert chat(engine="direct") == ("direct", ("async", None))
+    monkeypatch.setattr(workflow_api, "WORKFLOW_ENGINE", "direct")
+    assert chat(engine="crewai") == ("crewai", ("sync", "crewai"))
@@ -0,0 +1,176 @@
+import sys
+import os
+import contextvars
+import threading
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from ai_thinktank_mvp.workflows.dag import DAGScheduler, WorkflowStage
+
+def test_independent_stages_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def branch(name):
+        def run(inputs):
+            # 两个分支必须同时到达栅栏，串行执行会超时
+            barrier.wait()
+            return f"{name}({inputs['root']})"
+        return run
+
+    scheduler = DAGScheduler([
+        WorkflowStage("root", lambda inputs: "r"),
+        WorkflowStage("a", branch("a"), depends_on=["root"]),
+        WorkflowStage("b", branch("b"), depends_on=["root"]),
+        WorkflowStage("join", lambda inputs: sorted(inputs), depends_on=["a", "b"]),
+    ])
+    results = scheduler.run()
+    assert results["a"] == "a(r)"
+    assert results["b"] == "b(r)"
+    assert results["join"] == ["a", "b"]
+
+def test_stage_receives_only_its_dependencies():
+    seen = {}
+
+    def record(inputs):
+        seen.update(inputs)
+        return "done"
+
+    DAGScheduler([
+        WorkflowStage("x", lambda inputs: 1),
+        WorkflowStage("y", lambda inputs: 2),
+        WorkflowStage("z", record, depends_on=["y"]),
+    ]).run()
+    assert seen == {"y": 2}
+
+def test_initial_results_are_not_recomputed():
+    calls = []
+    scheduler = DAGScheduler([
+        WorkflowStage("x", lambda inputs: calls.append("x") or 1),
+        WorkflowStage("y", lambda inputs: inputs["x"] + 1, depends_on=["x"]),
+    ])
+    assert scheduler.run(initial={"x": 10})["y"] == 11
+    assert calls == []
+
+def test_failure_is_reported_and_raised():
+    finished = []
+
+    def boom(inputs):
+        time.sleep(0.01)
+        raise RuntimeError("boom")
+
+    scheduler = DAGScheduler(
+        [
+            WorkflowStage("x", boom),
+            WorkflowStage("y", lambda inputs: 1, depends_on=["x"]),
+        ],
+        on_stage_finish=lambda name, result, error: finished.append((name, type(error).__name__)),
+    )
+    try:
+        scheduler.run()
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    assert finished == [("x", "RuntimeError")]
+
+def test_cycles_are_rejected():
+    try:
+        DAGScheduler([
+            WorkflowStage("x", lambda inputs: 1, depends_on=["y"]),
+            WorkflowStage("y", lambda inputs: 1, depends_on=["x"]),
+        ])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+def test_run_async_overlaps_coroutine_stages():
+    import asyncio
+
+    async def branch(inputs):
+        await asyncio.sleep(0.1)
+        return inputs["root"] + 1
+
+    scheduler = DAGScheduler([
+        WorkflowStage("root", lambda inputs: 1),
+        WorkflowStage("a", branch, depends_on=["root"]),
+        WorkflowStage("b", branch, depends_on=["root"]),
+        WorkflowStage("join", lambda inputs: inputs["a"] + inputs["b"], depends_on=["a", "b"]),
+    ])
+    start = time.perf_counter()
+    results = asyncio.run(scheduler.run_async())
+    assert results["join"] == 4
+    assert time.perf_counter() - start < 0.18
+
+def test_running_stages_finish_after_a_failure():
+    finished = []
+
+    def boom(inputs):
+        raise RuntimeError("boom")
+
+    def slow(inputs):
+        time.sleep(0.05)
+        return "slow"
+
+    scheduler = DAGScheduler(
+        [
+            WorkflowStage("root", lambda inputs: 1),
+            WorkflowStage("bad", boom, depends_on=["root"]),
+            WorkflowStage("slow", slow, depends_on=["root"]),
+            WorkflowStage("join", lambda inputs: 1, depends_on=["bad", "slow"]),
+        ],
+        on_stage_finish=lambda name, result, error: finished.append((name, result)),
+    )
+    try:
+        scheduler.run()
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    # 失败阶段之外已在执行的阶段仍会完成并回调，便于保存检查点
+    assert ("slow", "slow") in finished
+    assert "join" not in [name for name, _ in finished]
+
+def test_stages_inherit_caller_context():
+    current = contextvars.ContextVar("current", default=None)
+    current.set("project-1")
+    scheduler = DAGScheduler([
+        WorkflowStage("a", lambda inputs: current.get()),
+        WorkflowStage("b", lambda inputs: current.get(), depends_on=["a"]),
+    ])
+    assert scheduler.run() == {"a": "project-1", "b": "project-1"}
+
+def test_run_async_awaits_coroutine_hooks_without_blocking_the_loop():
+    import asyncio
+
+    events, ticks = [], []
+
+    async def on_start(name):
+        # 模拟在线程中执行的数据库写入
+        await asyncio.to_thread(time.sleep, 0.05)
+        events.append(("start", name))
+
+    async def on_finish(name, result, error):
+        await asyncio.to_thread(time.sleep, 0.05)
+        events.append(("finish", name))
+
+    async def main():
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0.01)
+
+        tick_task = asyncio.create_task(ticker())
+        scheduler = DAGScheduler(
+            [
+                WorkflowStage("a", lambda inputs: 1),
+                WorkflowStage("b", lambda inputs: inputs["a"] + 1, depends_on=["a"]),
+            ],
+            on_stage_start=on_start,
+            on_stage_finish=on_finish,
+        )
+        try:
+            return await scheduler.run_async()
+        finally:
+            tick_task.cancel()
+
+    assert asyncio.run(main()) == {"a": 1, "b": 2}
+    assert events == [("start", "a"), ("finish", "a"), ("start", "b"), ("finish", "b")]
+    # 回调期间事件循环仍在运行
+    assert len(ticks) >= 10